@@ -0,0 +1,297 @@
+"""Time of the library's hot paths, without hardware.
+
+The cameras are emulated with the fake v4l2 devices and the synthetic backend,
+configured to deliver frames as fast as possible, so that the timings reflect the
+library code rather than frame pacing. Every case is timed in samples of at least
+`--min-time` seconds, the median time per call over the samples is reported.
+
+Results can be written to JSON and compared against a baseline written the same
+way before, e.g. on the main branch. The benchmark fails if a case got slower than
+its baseline by more than `--tolerance`.
+
+    python benchmarks/hot_paths.py --output baseline.json
+    python benchmarks/hot_paths.py --baseline baseline.json
+"""
+
+import argparse
+import json
+import platform
+import queue
+import statistics
+import sys
+import threading
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from pupil_labs.neon_usb import uvc_utils
+from pupil_labs.neon_usb.cameras.backend import V4l2Backend
+from pupil_labs.neon_usb.cameras.eye import (
+    NEON_EYE_CAMERA_SPEC,
+    Exposure_Time,
+    EyeCameraSynthetic,
+)
+from pupil_labs.neon_usb.cameras.scene import NEON_SCENE_CAMERA_SPEC
+from pupil_labs.neon_usb.frame import Frame
+from pupil_labs.neon_usb.pyrav4l2 import v4l2
+from pupil_labs.neon_usb.pyrav4l2.syscalls import open_device
+from pupil_labs.neon_usb.queue_utils import get_all_items, image_receiver
+from pupil_labs.neon_usb.testing.fake_usb import make_calibration_blob
+from pupil_labs.neon_usb.testing.fake_v4l2 import (
+    FakeFormat,
+    FakeV4l2Device,
+    FakeV4l2Provider,
+)
+
+UNPACED_FPS = 1_000_000
+"""Frame rate of the fake cameras, high enough that frames are always due"""
+
+
+class Case(NamedTuple):
+    name: str
+    setup: Callable[[ExitStack], Callable[[], object]]
+    """Prepare the case and return the operation to time, resources that need to
+    be released are registered with the stack"""
+
+
+class Result(NamedTuple):
+    name: str
+    median: float
+    """Median seconds per call over the samples"""
+    min: float
+    max: float
+    calls: int
+    """Calls per sample"""
+    samples: int
+
+
+def _v4l2_backend(stack: ExitStack, fmt: FakeFormat, card: str) -> V4l2Backend:
+    device = FakeV4l2Device("/dev/video0", card, [fmt])
+    stack.enter_context(FakeV4l2Provider([device]).installed())
+    spec = NEON_EYE_CAMERA_SPEC._replace(
+        name=card, width=fmt.width, height=fmt.height, fps=UNPACED_FPS
+    )
+    backend = V4l2Backend(spec, use_cache=False)
+    stack.callback(backend.close)
+    return backend
+
+
+def v4l2_grey(stack: ExitStack) -> Callable[[], object]:
+    fmt = FakeFormat(
+        v4l2.V4L2_PIX_FMT_GREY,
+        "8-bit Greyscale",
+        NEON_EYE_CAMERA_SPEC.width,
+        NEON_EYE_CAMERA_SPEC.height,
+        (UNPACED_FPS,),
+    )
+    return _v4l2_backend(stack, fmt, NEON_EYE_CAMERA_SPEC.name).get_frame
+
+
+def v4l2_mjpeg(stack: ExitStack) -> Callable[[], object]:
+    fmt = FakeFormat(
+        v4l2.V4L2_PIX_FMT_MJPEG,
+        "Motion-JPEG",
+        NEON_SCENE_CAMERA_SPEC.width,
+        NEON_SCENE_CAMERA_SPEC.height,
+        (UNPACED_FPS,),
+    )
+    return _v4l2_backend(stack, fmt, NEON_SCENE_CAMERA_SPEC.name).get_frame
+
+
+def exposure_auto(stack: ExitStack) -> Callable[[], object]:
+    algorithm = Exposure_Time(max_ET=28, frame_rate=200, mode="auto")
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, (192, 384), dtype=np.uint8)
+    timestamps = iter(range(1 << 62))
+
+    def calculate() -> object:
+        # a second apart, so that every call recalculates
+        return algorithm.calculate_based_on_frame(float(next(timestamps)), image)
+
+    return calculate
+
+
+def frame_gray(stack: ExitStack) -> Callable[[], object]:
+    rng = np.random.default_rng(0)
+    frame = Frame(rng.integers(0, 255, (1200, 1600, 3), dtype=np.uint8), 0.0, 0)
+    return lambda: frame.gray
+
+
+def frame_bgr(stack: ExitStack) -> Callable[[], object]:
+    rng = np.random.default_rng(0)
+    frame = Frame(rng.integers(0, 255, (192, 384), dtype=np.uint8), 0.0, 0)
+    return lambda: frame.bgr
+
+
+def get_all_items_100(stack: ExitStack) -> Callable[[], object]:
+    q: queue.Queue[int] = queue.Queue()
+
+    def fill_and_drain() -> object:
+        for i in range(100):
+            q.put_nowait(i)
+        return get_all_items(q)
+
+    return fill_and_drain
+
+
+def receiver_eye(stack: ExitStack) -> Callable[[], object]:
+    def camera() -> EyeCameraSynthetic:
+        cam = EyeCameraSynthetic(fps=0)
+        cam.exposure_algorithm = None
+        return cam
+
+    q: queue.Queue[Frame] = queue.Queue(maxsize=100)
+    started, stop = threading.Event(), threading.Event()
+    thread = threading.Thread(
+        target=image_receiver, args=(camera, q, started, stop), daemon=True
+    )
+    thread.start()
+    started.wait()
+
+    def shutdown() -> None:
+        stop.set()
+        thread.join()
+
+    stack.callback(shutdown)
+    # time per frame passing through the receiver and the queue
+    return q.get
+
+
+def _fake_eye_fd(stack: ExitStack) -> Any:
+    device = FakeV4l2Device.neon_eye()
+    stack.enter_context(FakeV4l2Provider([device]).installed())
+    return stack.enter_context(open_device(device.path))
+
+
+def xu_set_exposure(stack: ExitStack) -> Callable[[], object]:
+    fd = _fake_eye_fd(stack)
+    return lambda: uvc_utils.set_eye_exposure(fd, 0, 100)
+
+
+def xu_get_exposure(stack: ExitStack) -> Callable[[], object]:
+    fd = _fake_eye_fd(stack)
+    return lambda: uvc_utils.get_eye_exposure(fd, 0)
+
+
+def calibration_parse(stack: ExitStack) -> Callable[[], object]:
+    from pupil_labs.neon_recording.calib import Calibration
+
+    data = make_calibration_blob()[: Calibration.dtype.itemsize]
+    return lambda: Calibration.from_buffer(data)
+
+
+CASES = (
+    Case("v4l2_backend.get_frame.grey", v4l2_grey),
+    Case("v4l2_backend.get_frame.mjpeg", v4l2_mjpeg),
+    Case("exposure_time.calculate.auto", exposure_auto),
+    Case("frame.gray.scene", frame_gray),
+    Case("frame.bgr.eye", frame_bgr),
+    Case("queue_utils.get_all_items.100", get_all_items_100),
+    Case("queue_utils.image_receiver.eye", receiver_eye),
+    Case("uvc_utils.set_eye_exposure", xu_set_exposure),
+    Case("uvc_utils.get_eye_exposure", xu_get_exposure),
+    Case("calibration.parse", calibration_parse),
+)
+
+
+def run_case(case: Case, min_time: float, samples: int) -> Result:
+    """Time a case, calling its operation often enough for each sample."""
+    with ExitStack() as stack:
+        operation = case.setup(stack)
+        # warm up and find the calls per sample
+        calls = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(calls):
+                operation()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+            calls = max(calls * 2, int(calls * min_time / max(elapsed, 1e-9)))
+
+        times = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            for _ in range(calls):
+                operation()
+            times.append((time.perf_counter() - start) / calls)
+
+    return Result(
+        case.name, statistics.median(times), min(times), max(times), calls, samples
+    )
+
+
+def compare(
+    results: list[Result], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Return the names of the cases that got slower than the baseline allows."""
+    baseline_results = {r["name"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        reference = baseline_results.get(result.name)
+        if reference is None:
+            continue
+        if result.median > reference["median"] * (1 + tolerance):
+            regressions.append(result.name)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, help="write the results to this file")
+    parser.add_argument("--baseline", type=Path, help="compare with these results")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="allowed relative slowdown"
+    )
+    parser.add_argument("--filter", default="", help="only run cases containing this")
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds/sample")
+    parser.add_argument("--samples", type=int, default=7, help="samples per case")
+    args = parser.parse_args()
+
+    baseline: dict[str, Any] = {}
+    if args.baseline is not None:
+        if not args.baseline.exists():
+            # a comparison against nothing would pass silently
+            parser.error(
+                f"no baseline at {args.baseline}, create one with --output, "
+                "e.g. with 'make bench-baseline'"
+            )
+        baseline = json.loads(args.baseline.read_text())
+    baseline_medians = {r["name"]: r["median"] for r in baseline.get("results", [])}
+
+    results = []
+    for case in CASES:
+        if args.filter not in case.name:
+            continue
+        result = run_case(case, args.min_time, args.samples)
+        results.append(result)
+        line = (
+            f"{result.name:34} median {result.median * 1e6:10.2f} us  "
+            f"min {result.min * 1e6:10.2f} us"
+        )
+        if result.name in baseline_medians:
+            line += f"  x{result.median / baseline_medians[result.name]:5.2f}"
+        print(line)
+
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.time(),
+            "results": [r._asdict() for r in results],
+        }
+        args.output.write_text(json.dumps(data, indent=2))
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name in regressions:
+        print(f"FAIL: {name} is more than {args.tolerance:.0%} slower than baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Import time of the package and its light entry points.
+
+Every import is measured in a fresh interpreter with `python -X importtime`. The
+benchmark fails if an import loads one of the heavy dependencies it is supposed to
+defer, or if its median import time exceeds its budget. The budgets are generous,
+scale them with `--scale` on slow machines.
+
+    python benchmarks/import_time.py --repeat 10
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import NamedTuple
+
+HEAVY_MODULES = ("cv2", "uvc", "usb", "pandas", "av", "pupil_labs.neon_recording")
+
+
+class Target(NamedTuple):
+    module: str
+    budget: float
+    """Max median import time in seconds"""
+    forbidden: tuple[str, ...]
+    """Modules that must not be loaded by importing `module`"""
+
+
+TARGETS = (
+    Target("pupil_labs.neon_usb", 0.05, (*HEAVY_MODULES, "numpy")),
+    Target("pupil_labs.neon_usb.usb_utils", 0.1, HEAVY_MODULES),
+    Target("pupil_labs.neon_usb.cameras.eye", 0.5, ("cv2", "uvc", "pandas", "av")),
+)
+
+
+def measure_import_time(module: str) -> float:
+    """Import `module` in a fresh interpreter and return its import time in seconds."""
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # lines look like "import time:  <self us> | <cumulative us> | <module>"
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        if name.strip() == module:
+            return int(cumulative) / 1e6
+    raise RuntimeError(f"No import time reported for {module}")
+
+
+def loaded_modules(module: str) -> set[str]:
+    """Modules in sys.modules after importing `module` in a fresh interpreter."""
+    code = f"import json, sys, {module}; print(json.dumps(list(sys.modules)))"
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return set(json.loads(result.stdout))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="imports per target")
+    parser.add_argument("--scale", type=float, default=1.0, help="budget factor")
+    args = parser.parse_args()
+
+    failures = []
+    for target in TARGETS:
+        times = [measure_import_time(target.module) for _ in range(args.repeat)]
+        median = statistics.median(times)
+        budget = target.budget * args.scale
+        loaded = loaded_modules(target.module)
+        leaked = sorted(
+            m
+            for m in target.forbidden
+            if any(name == m or name.startswith(m + ".") for name in loaded)
+        )
+
+        print(
+            f"{target.module:40} median {median * 1000:7.1f} ms  "
+            f"min {min(times) * 1000:7.1f} ms  budget {budget * 1000:6.0f} ms"
+        )
+        if median > budget:
+            failures.append(f"{target.module} exceeds its import time budget")
+        if leaked:
+            failures.append(f"{target.module} loads {', '.join(leaked)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
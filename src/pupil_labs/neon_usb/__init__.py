@@ -1,35 +1,147 @@
 """pupil_labs.neon_usb package.
 
 Library for connecting to Neon via USB
+
+The public names are loaded on first access, so that importing the package, or a
+light submodule like `usb_utils`, does not pay for OpenCV, libuvc and the camera
+and recording modules until they are used.
 """
 
 from __future__ import annotations
 
-import importlib.metadata
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from pupil_labs.neon_usb_imu import IMUData
+    from pupil_labs.neon_usb_imu import NeonUsbImu as IMU
+
+    from pupil_labs.neon_usb.cameras.camera import (
+        CameraDisconnectedError,
+        CameraNotFoundError,
+    )
+    from pupil_labs.neon_usb.cameras.eye import (
+        EyeCameraReplay,
+        EyeCameraSynthetic,
+        EyeCameraUVC,
+        EyeCameraV4l2,
+    )
+    from pupil_labs.neon_usb.cameras.projection import CameraModel
+    from pupil_labs.neon_usb.cameras.replay import ReplayBackend
+    from pupil_labs.neon_usb.cameras.scene import SceneCamera
+    from pupil_labs.neon_usb.cameras.synthetic import SyntheticBackend
+    from pupil_labs.neon_usb.cameras.undistort import Undistorter
+    from pupil_labs.neon_usb.clock import ClockAligner, ClockOffsetEstimator
+    from pupil_labs.neon_usb.device import Device
+    from pupil_labs.neon_usb.frame import EncodedFrame, Frame
+    from pupil_labs.neon_usb.queue_utils import (
+        ByteBudgetQueue,
+        ByteBudgetRing,
+        MemoryBudget,
+        SpillQueue,
+        get_all_items,
+        image_receiver,
+    )
+    from pupil_labs.neon_usb.stream_stats import StreamStats
+    from pupil_labs.neon_usb.sync import StreamSynchronizer, SyncedFrames
+    from pupil_labs.neon_usb.watchdog import StreamStalledError, Watchdog
+
+    __version__: str
+
+_LAZY_ATTRIBUTES: dict[str, tuple[str, str]] = {
+    "IMU": ("pupil_labs.neon_usb_imu", "NeonUsbImu"),
+    "ByteBudgetQueue": ("pupil_labs.neon_usb.queue_utils", "ByteBudgetQueue"),
+    "ByteBudgetRing": ("pupil_labs.neon_usb.queue_utils", "ByteBudgetRing"),
+    "CameraDisconnectedError": (
+        "pupil_labs.neon_usb.cameras.camera",
+        "CameraDisconnectedError",
+    ),
+    "CameraModel": ("pupil_labs.neon_usb.cameras.projection", "CameraModel"),
+    "CameraNotFoundError": (
+        "pupil_labs.neon_usb.cameras.camera",
+        "CameraNotFoundError",
+    ),
+    "ClockAligner": ("pupil_labs.neon_usb.clock", "ClockAligner"),
+    "ClockOffsetEstimator": ("pupil_labs.neon_usb.clock", "ClockOffsetEstimator"),
+    "Device": ("pupil_labs.neon_usb.device", "Device"),
+    "EncodedFrame": ("pupil_labs.neon_usb.frame", "EncodedFrame"),
+    "EyeCameraReplay": ("pupil_labs.neon_usb.cameras.eye", "EyeCameraReplay"),
+    "EyeCameraSynthetic": ("pupil_labs.neon_usb.cameras.eye", "EyeCameraSynthetic"),
+    "EyeCameraUVC": ("pupil_labs.neon_usb.cameras.eye", "EyeCameraUVC"),
+    "EyeCameraV4l2": ("pupil_labs.neon_usb.cameras.eye", "EyeCameraV4l2"),
+    "Frame": ("pupil_labs.neon_usb.frame", "Frame"),
+    "IMUData": ("pupil_labs.neon_usb_imu", "IMUData"),
+    "MemoryBudget": ("pupil_labs.neon_usb.queue_utils", "MemoryBudget"),
+    "ReplayBackend": ("pupil_labs.neon_usb.cameras.replay", "ReplayBackend"),
+    "SceneCamera": ("pupil_labs.neon_usb.cameras.scene", "SceneCamera"),
+    "SpillQueue": ("pupil_labs.neon_usb.queue_utils", "SpillQueue"),
+    "StreamStalledError": ("pupil_labs.neon_usb.watchdog", "StreamStalledError"),
+    "StreamStats": ("pupil_labs.neon_usb.stream_stats", "StreamStats"),
+    "StreamSynchronizer": ("pupil_labs.neon_usb.sync", "StreamSynchronizer"),
+    "SyncedFrames": ("pupil_labs.neon_usb.sync", "SyncedFrames"),
+    "SyntheticBackend": ("pupil_labs.neon_usb.cameras.synthetic", "SyntheticBackend"),
+    "Undistorter": ("pupil_labs.neon_usb.cameras.undistort", "Undistorter"),
+    "Watchdog": ("pupil_labs.neon_usb.watchdog", "Watchdog"),
+    "get_all_items": ("pupil_labs.neon_usb.queue_utils", "get_all_items"),
+    "image_receiver": ("pupil_labs.neon_usb.queue_utils", "image_receiver"),
+}
+"""Public name -> (module, attribute) it is loaded from on first access"""
+
+
+def _get_version() -> str:
+    import importlib.metadata
+
+    try:
+        return importlib.metadata.version(__name__)
+    except importlib.metadata.PackageNotFoundError:
+        return "0.0.0"
+
+
+def __getattr__(name: str) -> Any:
+    if name == "__version__":
+        value: Any = _get_version()
+    elif name in _LAZY_ATTRIBUTES:
+        module_name, attribute = _LAZY_ATTRIBUTES[name]
+        value = getattr(importlib.import_module(module_name), attribute)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # cache it, later lookups don't go through __getattr__ anymore
+    globals()[name] = value
+    return value
+
 
-from pupil_labs.neon_usb.cameras.camera import CameraNotFoundError
-from pupil_labs.neon_usb.cameras.eye import EyeCameraUVC, EyeCameraV4l2
-from pupil_labs.neon_usb.cameras.scene import SceneCamera
-from pupil_labs.neon_usb.device import Device
-from pupil_labs.neon_usb.frame import Frame
-from pupil_labs.neon_usb.queue_utils import get_all_items, image_receiver
-from pupil_labs.neon_usb_imu import IMUData
-from pupil_labs.neon_usb_imu import NeonUsbImu as IMU
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
 
-try:
-    __version__ = importlib.metadata.version(__name__)
-except importlib.metadata.PackageNotFoundError:
-    __version__ = "0.0.0"
 
 __all__: list[str] = [
     "IMU",
+    "ByteBudgetQueue",
+    "ByteBudgetRing",
+    "CameraDisconnectedError",
+    "CameraModel",
     "CameraNotFoundError",
+    "ClockAligner",
+    "ClockOffsetEstimator",
     "Device",
+    "EncodedFrame",
+    "EyeCameraReplay",
+    "EyeCameraSynthetic",
     "EyeCameraUVC",
     "EyeCameraV4l2",
     "Frame",
     "IMUData",
+    "MemoryBudget",
+    "ReplayBackend",
     "SceneCamera",
+    "SpillQueue",
+    "StreamStalledError",
+    "StreamStats",
+    "StreamSynchronizer",
+    "SyncedFrames",
+    "SyntheticBackend",
+    "Undistorter",
+    "Watchdog",
     "__version__",
     "get_all_items",
     "image_receiver",
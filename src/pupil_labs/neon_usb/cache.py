@@ -0,0 +1,68 @@
+import contextlib
+import os
+import tempfile
+from pathlib import Path
+
+CACHE_DIR_ENV = "NEON_USB_CACHE_DIR"
+
+
+def get_cache_dir() -> Path:
+    """Directory for data cached across processes and sessions.
+
+    Defaults to `$XDG_CACHE_HOME/pupil_labs/neon_usb` (`~/.cache/...` if unset) and
+    can be overridden with the `NEON_USB_CACHE_DIR` environment variable.
+    """
+    override = os.environ.get(CACHE_DIR_ENV)
+    if override:
+        return Path(override)
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "pupil_labs" / "neon_usb"
+
+
+def read_cache(name: str) -> bytes | None:
+    """Read a cache entry, returns None if it does not exist or is unreadable."""
+    try:
+        return (get_cache_dir() / name).read_bytes()
+    except OSError:
+        return None
+
+
+def write_cache(name: str, data: bytes) -> bool:
+    """Atomically write a cache entry.
+
+    Concurrent readers see either the previous or the new content, never a partial
+    write. Failing to write, e.g. on a read-only file system, is not an error for a
+    cache, so instead of raising, False is returned.
+    """
+    path = get_cache_dir() / name
+    tmp_path = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f".{path.name}.", delete=False
+        ) as f:
+            tmp_path = f.name
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Failed to write cache entry {path}: {e}")
+        if tmp_path is not None:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+        return False
+    return True
+
+
+def list_cache(pattern: str) -> list[Path]:
+    """Cache entries matching a glob pattern, most recently written first."""
+    try:
+        paths = list(get_cache_dir().glob(pattern))
+    except OSError:
+        return []
+    return sorted(paths, key=lambda p: p.stat().st_mtime, reverse=True)
+
+
+def remove_cache(name: str) -> None:
+    """Remove a cache entry, e.g. one found to be stale, if it exists."""
+    with contextlib.suppress(OSError):
+        (get_cache_dir() / name).unlink()
@@ -1,27 +1,67 @@
+import time
 from abc import ABC, abstractmethod
-from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, ClassVar
 
-import cv2
 import numpy as np
-import uvc
 from typing_extensions import Self
 
 from pupil_labs.neon_usb.pyrav4l2 import Device, v4l2
-
-from ..frame import Frame
+from pupil_labs.neon_usb.pyrav4l2.device import ColorFormat, FrameInterval, FrameSize
+from pupil_labs.neon_usb.pyrav4l2.syscalls import (
+    list_devices,
+    open_device,
+    video_device_names,
+)
+
+from .. import latency, sysfs
+from ..frame import EncodedFrame, Frame
 from ..v4lstream import V4lStream
-from .camera import CameraNotFoundError, CameraSpec
+from . import mode_cache
+from .camera import CameraDisconnectedError, CameraNotFoundError, CameraSpec
+
+if TYPE_CHECKING:
+    # libuvc and OpenCV are imported by the backends that use them, so that e.g. the
+    # v4l2 and replay backends don't wait for loading them
+    import uvc
 
 
 class CameraBackend(ABC):
+    supports_reconnect: ClassVar[bool] = False
+    """Whether reads raise `CameraDisconnectedError` when the camera is lost, so
+    that `Camera` can reconnect it"""
+
     def __init__(self, spec: CameraSpec):
         self.spec = spec
+        self.timings: dict[str, float] = {}
+        """Durations in seconds of the phases of opening the camera"""
+        self.mode_source = "device"
+        """Where the camera mode came from, "disk" if taken from the mode cache
+        (see `mode_cache`) instead of enumerating the camera's modes"""
+        self.frame_timeout = 2.0
+        """Seconds to wait for a frame before a read raises TimeoutError"""
+
+    @classmethod
+    def is_present(cls, spec: CameraSpec) -> bool | None:
+        """Cheaply check whether the camera is connected, None if unknown.
+
+        Meant for polling while waiting for a lost camera to come back, so it must
+        not open or enumerate devices through their drivers.
+        """
+        return None
 
     @abstractmethod
     def get_frame(self) -> Frame:
         pass
 
+    def get_encoded_frame(self) -> EncodedFrame:
+        """Return the next frame without decoding it.
+
+        Only available for cameras that deliver compressed (MJPEG) frames.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not provide encoded frames"
+        )
+
     @abstractmethod
     def close(self) -> None:
         pass
@@ -34,9 +74,14 @@ class CameraBackend(ABC):
 
 
 class UVCBackend(CameraBackend):
-    _uvc_capture: uvc.Capture
+    supports_reconnect = True
+    _uvc_capture: "uvc.Capture"
+
+    def __init__(
+        self, spec: CameraSpec, extended_controls: Any = None, use_cache: bool = True
+    ):
+        import uvc
 
-    def __init__(self, spec: CameraSpec, extended_controls: Any = None):
         super().__init__(spec)
 
         self._uvc_capture = None
@@ -44,48 +89,105 @@ class UVCBackend(CameraBackend):
         self.extended_controls = extended_controls
         self.exposure_controls = None
 
+        start = time.perf_counter()
         connected_devices = uvc.device_list()
-        uid = None
+        self.timings["enumerate"] = time.perf_counter() - start
+        matched_device = None
         for device_info in connected_devices:
             if (device_info["idVendor"], device_info["idProduct"]) == (
                 self.spec.vendor_id,
                 self.spec.product_id,
             ):
-                uid = device_info["uid"]
+                matched_device = device_info
                 break
 
-        if uid is None:
+        if matched_device is None:
             raise CameraNotFoundError(self.spec.name)
 
-        capture = uvc.Capture(uid, self.extended_controls)
+        start = time.perf_counter()
+        capture = uvc.Capture(matched_device["uid"], self.extended_controls)
         capture.bandwidth_factor = self.spec.bandwidth_factor
+        self.timings["open"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if not self._set_mode(
+            capture, mode_cache.uvc_identity(spec, matched_device), use_cache
+        ):
+            capture.close()
+            raise OSError(
+                f"None of the available modes matched: {capture.available_modes}!"
+            )
+        self._uvc_capture = capture
+        self.timings["mode"] = time.perf_counter() - start
+
+    def _set_mode(
+        self, capture: "uvc.Capture", identity: dict[str, Any], use_cache: bool
+    ) -> bool:
+        import uvc
+
+        entry = mode_cache.load_mode(identity) if use_cache else None
+        if entry is not None:
+            try:
+                capture.frame_mode = uvc.uvc_bindings.CameraMode(*entry["mode"])
+            except Exception as e:  # noqa: BLE001
+                print(f"Cached mode of {self.spec.name} was rejected: {e}")
+                mode_cache.forget_mode(identity)
+            else:
+                self.mode_source = "disk"
+                return True
 
-        mode_matched = False
         for mode in capture.available_modes:
             if (mode.width, mode.height, mode.fps) == (
                 self.spec.width,
                 self.spec.height,
                 self.spec.fps,
             ):
-                mode_matched = True
                 capture.frame_mode = mode
-                self._uvc_capture = capture
+                if use_cache:
+                    mode_cache.store_mode(identity, {"mode": list(mode)})
+                return True
 
-                break
+        return False
 
-        if not mode_matched:
-            capture.close()
-            raise OSError(
-                f"None of the available modes matched: {capture.available_modes}!"
-            )
+    @classmethod
+    def is_present(cls, spec: CameraSpec) -> bool | None:
+        devices = sysfs.find_usb_devices(spec.vendor_id, spec.product_id)
+        return None if devices is None else bool(devices)
+
+    def _get_uvc_frame(self) -> Any:
+        import uvc
 
-    def get_frame(self) -> Frame:
         if self._uvc_capture is None:
             raise OSError("Camera not initialized!")
 
-        frame = self._uvc_capture.get_frame(timeout=2.0)
+        start = time.perf_counter_ns() if latency.enabled else 0
+        try:
+            frame = self._uvc_capture.get_frame(timeout=self.frame_timeout)
+        except (TimeoutError, uvc.StreamError) as e:
+            # libuvc reports an unplugged camera as a stalled or broken stream
+            if self.is_present(self.spec) is False:
+                raise CameraDisconnectedError(self.spec.name) from e
+            raise
         assert frame is not None
-        return Frame(frame.img, frame.timestamp, frame.index)
+        if start:
+            latency.record("uvc.get_frame", start)
+        return frame
+
+    def get_frame(self) -> Frame:
+        frame = self._get_uvc_frame()
+        start = time.perf_counter_ns() if latency.enabled else 0
+        # pyuvc converts (and for MJPEG decodes) the image on access
+        result = Frame(frame.img, frame.timestamp, frame.index)
+        if start:
+            latency.record("uvc.convert", start)
+        return result
+
+    def get_encoded_frame(self) -> EncodedFrame:
+        frame = self._get_uvc_frame()
+        if not hasattr(frame, "jpeg_buffer"):
+            raise OSError(f"{self.spec.name} does not deliver MJPEG frames!")
+        # the transport buffer is reused by the next get_frame() call
+        return EncodedFrame(bytes(frame.jpeg_buffer), frame.timestamp, frame.index)
 
     def close(self) -> None:
         if self._uvc_capture is not None:
@@ -95,71 +197,197 @@ class UVCBackend(CameraBackend):
 
 
 class V4l2Backend(CameraBackend):
-    def __init__(self, spec: CameraSpec):
+    supports_reconnect = True
+
+    def __init__(self, spec: CameraSpec, use_cache: bool = True):
         super().__init__(spec)
 
         self.camera_reinit_timeout = 3
         self.device = None
         self.frame_counter = -1
+        self._last_sequence: int | None = None
 
-        errors = {}
-        for device_path in Path("/dev/").glob("video*"):
+        start = time.perf_counter()
+        for device_path in list_devices():
             try:
-                device = Device(device_path)
-            except (AttributeError, FileNotFoundError, PermissionError) as e:
-                errors[device_path] = e
+                device = Device(device_path, probe=False)
+            except (AttributeError, FileNotFoundError, PermissionError):
+                continue
+
+            if (
+                self.spec.name not in device.device_name
+                or not device.is_video_capture_capable
+            ):
                 continue
 
-            if self.spec.name in device.device_name and device.is_video_capture_capable:
-                formats = [
-                    (color_format, frame_size, frame_interval)
-                    for color_format, frame_sizes in device.available_formats.items()
-                    for frame_size in frame_sizes
-                    for frame_interval in device.get_available_frame_intervals(
-                        color_format, frame_size
-                    )
-                ]
-                for color_format, frame_size, frame_interval in formats:
-                    fps = frame_interval.denominator / frame_interval.numerator
-                    if (frame_size.width, frame_size.height, fps) == (
-                        self.spec.width,
-                        self.spec.height,
-                        self.spec.fps,
-                    ):
-                        device.set_format(color_format, frame_size)
-                        device.set_frame_interval(frame_interval)
-                        self.device = device
-                        self.stream = V4lStream(self.device)
-                        self.stream.open()
-                        self._fd = open(self.device.path)  # noqa: SIM115
-                        self.color_format, _ = self.device.get_format()
-
-                        break
-
-                else:
-                    raise OSError("None of the available modes matched!")
+            identity = mode_cache.v4l2_identity(self.spec, device)
+            mode = self._load_mode(device, identity) if use_cache else None
+            if mode is not None:
+                self.timings["enumerate"] = time.perf_counter() - start
+                try:
+                    self._set_mode(device, *mode)
+                    self.mode_source = "disk"
+                except (OSError, ValueError) as e:
+                    print(f"Cached mode of {device.path} was rejected: {e}")
+                    mode_cache.forget_mode(identity)
+                    mode = None
+
+            if mode is None:
+                device.probe()
+                mode = self._find_mode(device)
+                self.timings["enumerate"] = time.perf_counter() - start
+                self._set_mode(device, *mode)
+                if use_cache:
+                    self._store_mode(device, identity, *mode)
+
+            start = time.perf_counter()
+            self.device = device
+            self.stream = V4lStream(self.device)
+            self.stream.open()
+            self._fd = open_device(self.device.path)
+            self.color_format, _ = self.device.get_format()
+            self.timings["stream"] = time.perf_counter() - start
+            break
 
         if self.device is None:
             raise CameraNotFoundError(self.spec.name)
 
+    def _find_mode(
+        self, device: Device
+    ) -> tuple[ColorFormat, FrameSize, FrameInterval]:
+        formats = [
+            (color_format, frame_size, frame_interval)
+            for color_format, frame_sizes in device.available_formats.items()
+            for frame_size in frame_sizes
+            for frame_interval in device.get_available_frame_intervals(
+                color_format, frame_size
+            )
+        ]
+        for color_format, frame_size, frame_interval in formats:
+            fps = frame_interval.denominator / frame_interval.numerator
+            if (frame_size.width, frame_size.height, fps) == (
+                self.spec.width,
+                self.spec.height,
+                self.spec.fps,
+            ):
+                return color_format, frame_size, frame_interval
+
+        raise OSError("None of the available modes matched!")
+
+    def _set_mode(
+        self,
+        device: Device,
+        color_format: ColorFormat,
+        frame_size: FrameSize,
+        frame_interval: FrameInterval,
+    ) -> None:
+        start = time.perf_counter()
+        device.set_format(color_format, frame_size)
+        device.set_frame_interval(frame_interval)
+        self.timings["mode"] = time.perf_counter() - start
+
+    def _load_mode(
+        self, device: Device, identity: dict[str, Any]
+    ) -> tuple[ColorFormat, FrameSize, FrameInterval] | None:
+        """Return the mode negotiated last time, if the device is in the mode cache.
+
+        The cached formats and controls are restored into the device, so they aren't
+        enumerated again.
+        """
+        entry = mode_cache.load_mode(identity)
+        if entry is None:
+            return None
+        try:
+            formats = mode_cache.load_formats(entry["formats"])
+            controls = mode_cache.load_controls(entry["controls"])
+            pixelformat, width, height, numerator, denominator = entry["mode"]
+            color_format = next(f for f in formats if f.pixelformat == pixelformat)
+        except (KeyError, TypeError, ValueError, StopIteration):
+            mode_cache.forget_mode(identity)
+            return None
+        device.probe(formats, controls)
+        return (
+            color_format,
+            FrameSize(width, height),
+            FrameInterval(numerator, denominator),
+        )
+
+    def _store_mode(
+        self,
+        device: Device,
+        identity: dict[str, Any],
+        color_format: ColorFormat,
+        frame_size: FrameSize,
+        frame_interval: FrameInterval,
+    ) -> None:
+        mode_cache.store_mode(
+            identity,
+            {
+                "mode": [
+                    color_format.pixelformat,
+                    frame_size.width,
+                    frame_size.height,
+                    frame_interval.numerator,
+                    frame_interval.denominator,
+                ],
+                "formats": mode_cache.dump_formats(device.available_formats),
+                "controls": mode_cache.dump_controls(device.controls),
+            },
+        )
+
+    @classmethod
+    def is_present(cls, spec: CameraSpec) -> bool | None:
+        names = video_device_names()
+        return None if names is None else any(spec.name in n for n in names.values())
+
+    def _dequeue(self) -> tuple[bytes, float]:
+        try:
+            buffer, time_ns = self.stream.get_frame(self.frame_timeout)
+        except TimeoutError:
+            raise
+        except OSError as e:
+            # the stream closed itself, nothing but reopening the device helps
+            raise CameraDisconnectedError(self.spec.name) from e
+        # advance the index by the sequence gap, so that frames the driver dropped
+        # show up as missing indices
+        sequence = self.stream.sequence
+        if (
+            sequence is not None
+            and self._last_sequence is not None
+            and sequence > self._last_sequence
+        ):
+            self.frame_counter += sequence - self._last_sequence
+        else:
+            self.frame_counter += 1
+        self._last_sequence = sequence
+        return buffer, time_ns
+
     def get_frame(self) -> Frame:
-        frame = self.stream.get_frame()
-        assert frame is not None, "Failed to get frame from stream!"
-        buffer, time_ns = frame
-        if buffer is None:
-            raise TimeoutError
+        buffer, time_ns = self._dequeue()
 
+        start = time.perf_counter_ns() if latency.enabled else 0
         if self.color_format.pixelformat == v4l2.V4L2_PIX_FMT_GREY:
             pixels = np.frombuffer(buffer, dtype=np.uint8).reshape([
                 self.spec.height,
                 self.spec.width,
             ])
         elif self.color_format.pixelformat == v4l2.V4L2_PIX_FMT_MJPEG:
+            import cv2
+
             pixels = cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_COLOR)
 
-        self.frame_counter += 1
+        frame = Frame(pixels, time_ns / 1e9, self.frame_counter)
+        if start:
+            latency.record("v4l2.convert", start)
+        return frame
+
+    def get_encoded_frame(self) -> EncodedFrame:
+        if self.color_format.pixelformat != v4l2.V4L2_PIX_FMT_MJPEG:
+            raise OSError(f"{self.spec.name} does not deliver MJPEG frames!")
 
-        return Frame(pixels, time_ns / 1e9, self.frame_counter)
+        buffer, time_ns = self._dequeue()
+        return EncodedFrame(buffer, time_ns / 1e9, self.frame_counter)
 
     def close(self) -> None:
+        self.stream.close()
         self._fd.close()
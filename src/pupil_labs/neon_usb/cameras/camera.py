@@ -1,11 +1,19 @@
+import threading
+import time
+from collections.abc import Callable
 from types import TracebackType
-from typing import TYPE_CHECKING, NamedTuple
+from typing import TYPE_CHECKING, NamedTuple, TypeVar
 
-from pupil_labs.neon_usb.frame import Frame
+from pupil_labs.neon_usb.clock import ClockOffsetEstimator
+from pupil_labs.neon_usb.frame import EncodedFrame, Frame
+from pupil_labs.neon_usb.stream_stats import StreamStats
+from pupil_labs.neon_usb.usb_utils import forget_calibration
 
 if TYPE_CHECKING:
     from pupil_labs.neon_usb.cameras.backend import CameraBackend
 
+T = TypeVar("T")
+
 
 class CameraSpec(NamedTuple):
     name: str
@@ -23,17 +31,171 @@ class CameraNotFoundError(Exception):
         super().__init__(f"Camera '{name}' not found!")
 
 
+class CameraDisconnectedError(OSError):
+    def __init__(self, name: str) -> None:
+        self.camera_name = name
+        super().__init__(f"Camera '{name}' was disconnected!")
+
+
+class ReconnectTimings(NamedTuple):
+    """Durations in seconds of the phases of reconnecting a camera"""
+
+    teardown: float
+    """Closing the lost camera"""
+    wait: float
+    """Waiting for the camera to show up again"""
+    reopen: float
+    """Opening the camera and restoring its mode and controls"""
+    first_frame: float
+    """Reading the first frame from the reopened camera"""
+
+    @property
+    def since_replug(self) -> float:
+        """Time from the camera showing up again to its first frame"""
+        return self.reopen + self.first_frame
+
+    @property
+    def total(self) -> float:
+        return self.teardown + self.wait + self.reopen + self.first_frame
+
+
 class Camera:
-    def __init__(self, spec: CameraSpec, backend_class: type["CameraBackend"]) -> None:
+    reconnect_timeout: float | None = 10.0
+    """Seconds to wait for a disconnected camera to come back, before the read that
+    noticed the disconnection raises `CameraDisconnectedError`. None disables the
+    automatic reconnection."""
+    reconnect_poll_interval = 0.05
+    close_timeout = 1.0
+    """Seconds to wait for a lost camera to close, closing it can hang in libuvc"""
+
+    def __init__(
+        self, spec: CameraSpec, backend_class: Callable[[CameraSpec], "CameraBackend"]
+    ) -> None:
+        start = time.perf_counter()
         self.backend = backend_class(spec)
         self.spec = spec
+        self._backend_class = backend_class
+        self.reconnect_count = 0
+        self.last_reconnect: ReconnectTimings | None = None
+        self._lost_backend: CameraBackend | None = None
+        """The backend of the camera while it is disconnected, already closed"""
         self.frame_counter = -1
+        self.clock = ClockOffsetEstimator()
+        """Maps the timestamps of this camera onto host monotonic time."""
+        self.stats = StreamStats()
+        """Rate, frame intervals and dropped frames, readable from any thread."""
+        self.timings = {**self.backend.timings, "backend": time.perf_counter() - start}
+        """Durations in seconds of the phases of opening the camera, including those
+        of the backend, and `first_frame`, the time from the backend being open to the
+        first frame"""
+        self._opened_at: float | None = time.perf_counter()
+
+    def _record_first_frame(self) -> None:
+        if self._opened_at is not None:
+            self.timings["first_frame"] = time.perf_counter() - self._opened_at
+            self._opened_at = None
+
+    def _configure(self) -> None:
+        """Apply the camera controls, called again after reconnecting."""
+
+    def _read(self, read: Callable[["CameraBackend"], T]) -> T:
+        if self._lost_backend is None:
+            try:
+                return read(self.backend)
+            except CameraDisconnectedError:
+                if (
+                    self.reconnect_timeout is None
+                    or not self.backend.supports_reconnect
+                ):
+                    raise
+                print(f"{self.spec.name} was disconnected, reconnecting")
+        # a camera that did not come back in time is retried on every read
+        frame, self.last_reconnect = self._reconnect(read, self.reconnect_timeout or 0)
+        return frame
+
+    def reconnect(self, timeout: float = 10.0) -> ReconnectTimings:
+        """Close the camera, wait for it to be present and open it again.
+
+        This happens automatically when a read notices that the camera was
+        disconnected, see `reconnect_timeout`. The camera is reopened with the same
+        mode and controls, the first frame after reopening is discarded.
+
+        Raises:
+            CameraDisconnectedError: the camera did not come back within the timeout
+
+        """
+        _, timings = self._reconnect(lambda backend: backend.get_frame(), timeout)
+        return timings
+
+    def _reconnect(
+        self, read: Callable[["CameraBackend"], T], timeout: float
+    ) -> tuple[T, ReconnectTimings]:
+        start = time.perf_counter()
+        deadline = start + timeout
+        backend_type = type(self.backend)
+
+        if self._lost_backend is not self.backend:
+            self._lost_backend = self.backend
+            closer = threading.Thread(target=self.backend.close, daemon=True)
+            closer.start()
+            closer.join(min(self.close_timeout, timeout))
+            if closer.is_alive():
+                print(f"Closing {self.spec.name} timed out, abandoning it")
+        teardown_end = time.perf_counter()
+
+        # polling presence is cheap, opening is not, so only try when it's there
+        while backend_type.is_present(self.spec) is False:
+            if time.perf_counter() > deadline:
+                raise CameraDisconnectedError(self.spec.name)
+            time.sleep(self.reconnect_poll_interval)
+        wait_end = time.perf_counter()
+
+        while True:
+            try:
+                backend = self._backend_class(self.spec)
+                break
+            except Exception as e:
+                if time.perf_counter() > deadline:
+                    raise CameraDisconnectedError(self.spec.name) from e
+                time.sleep(self.reconnect_poll_interval)
+        backend.frame_timeout = self.backend.frame_timeout
+        self.backend = backend
+        self._lost_backend = None
+        # another module may have been plugged in, its calibration must be read
+        forget_calibration()
+        self._configure()
+        reopen_end = time.perf_counter()
+
+        frame = read(self.backend)
+        end = time.perf_counter()
+        self.reconnect_count += 1
+        return frame, ReconnectTimings(
+            teardown_end - start,
+            wait_end - teardown_end,
+            reopen_end - wait_end,
+            end - reopen_end,
+        )
 
     def get_frame(self) -> Frame:
-        return self.backend.get_frame()
+        frame = self._read(lambda backend: backend.get_frame())
+        self.clock.update(frame.timestamp)
+        self.stats.update(frame.timestamp, frame.index)
+        if self._opened_at is not None:
+            self._record_first_frame()
+        return frame
+
+    def get_encoded_frame(self) -> EncodedFrame:
+        """Return the next frame as delivered by the camera, without decoding it."""
+        frame = self._read(lambda backend: backend.get_encoded_frame())
+        self.clock.update(frame.timestamp)
+        self.stats.update(frame.timestamp, frame.index)
+        if self._opened_at is not None:
+            self._record_first_frame()
+        return frame
 
     def close(self) -> None:
-        self.backend.close()
+        if self._lost_backend is not self.backend:
+            self.backend.close()
 
     def __enter__(self) -> "Camera":
         return self
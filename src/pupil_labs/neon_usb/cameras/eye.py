@@ -1,11 +1,15 @@
+import time
+from collections.abc import Callable
+from pathlib import Path
 from typing import Literal
 
-import cv2
 import numpy as np
 
-from pupil_labs.neon_usb import uvc_utils
+from pupil_labs.neon_usb import latency, uvc_utils
 from pupil_labs.neon_usb.cameras.backend import CameraBackend, UVCBackend, V4l2Backend
 from pupil_labs.neon_usb.cameras.camera import Camera, CameraSpec, Frame
+from pupil_labs.neon_usb.cameras.replay import ReplayBackend
+from pupil_labs.neon_usb.cameras.synthetic import SyntheticBackend
 from pupil_labs.neon_usb.usb_utils import USB_ID_PRODUCT, USB_ID_VENDOR
 
 ExposureMode = Literal["manual", "auto"]
@@ -58,6 +62,8 @@ class Exposure_Time:
                 return [self.ET_thres[1]] * 2
 
             elif self.mode == "auto":
+                import cv2
+
                 half_width = len(image[1]) // 2
 
                 next_ETs = []
@@ -107,7 +113,7 @@ class EyeCamera(Camera):
     def __init__(
         self,
         spec: CameraSpec = NEON_EYE_CAMERA_SPEC,
-        backend_class: type[CameraBackend] | None = None,
+        backend_class: Callable[[CameraSpec], CameraBackend] | None = None,
     ) -> None:
         """Initialize the eye cameras of the connected Neon device.
 
@@ -117,22 +123,31 @@ class EyeCamera(Camera):
         if backend_class is None:
             raise ValueError("backend_class must be specified")
 
+        self._exposure_values: list[int | None] = [None, None]
+        """Last exposure times set, restored when reconnecting"""
         super().__init__(spec, backend_class)
         self.exposure_algorithm: Exposure_Time | None = Exposure_Time(
             max_ET=28, frame_rate=200, mode="auto"
         )
 
     def get_frame(self) -> Frame:
+        start = time.perf_counter_ns() if latency.enabled else 0
         frame = super().get_frame()
+        if start:
+            start = latency.record("eye.read", start)
 
         if self.exposure_algorithm is not None:
             exposure_times = self.exposure_algorithm.calculate_based_on_frame(
                 frame.timestamp, frame.gray
             )
+            if start:
+                start = latency.record("eye.exposure_algorithm", start)
 
             if exposure_times is not None:
                 for side_idx, exposure_time in enumerate(exposure_times):
-                    self._set_eye_exposure(side_idx, int(exposure_time))
+                    self._change_eye_exposure(side_idx, int(exposure_time))
+                if start:
+                    latency.record("eye.exposure_write", start)
 
         return frame
 
@@ -148,7 +163,21 @@ class EyeCamera(Camera):
             else [exposure_time, exposure_time]
         )
         for eye_idx, value in enumerate(values):
-            self._set_eye_exposure(eye_idx, value)
+            self._change_eye_exposure(eye_idx, value)
+
+    @property
+    def last_exposure(self) -> tuple[int | None, int | None]:
+        """Exposure times last set, without querying the camera."""
+        return (self._exposure_values[0], self._exposure_values[1])
+
+    def _configure(self) -> None:
+        for eye_idx, value in enumerate(self._exposure_values):
+            if value is not None:
+                self._set_eye_exposure(eye_idx, value)
+
+    def _change_eye_exposure(self, eye_idx: int, exposure_time: int) -> None:
+        self._set_eye_exposure(eye_idx, exposure_time)
+        self._exposure_values[eye_idx] = exposure_time
 
     def _get_eye_exposure(self, eye_idx: int) -> int | None:
         raise NotImplementedError()
@@ -160,6 +189,11 @@ class EyeCamera(Camera):
 class EyeCameraUVC(EyeCamera):
     def __init__(self, spec: CameraSpec = NEON_EYE_CAMERA_SPEC) -> None:
         super().__init__(spec, UVCBackend)
+        start = time.perf_counter()
+        self._configure()
+        self.timings["controls"] = time.perf_counter() - start
+
+    def _configure(self) -> None:
         assert isinstance(self.backend, UVCBackend)
         self.exposure_controls = [
             self.backend._uvc_capture.add_vendor_control({
@@ -184,6 +218,7 @@ class EyeCameraUVC(EyeCamera):
         self.uvc_controls = {
             c.display_name: c for c in self.backend._uvc_capture.controls
         }
+        super()._configure()
 
     def _get_eye_exposure(self, eye_idx: int) -> int | None:
         val = self.exposure_controls[eye_idx].value
@@ -205,3 +240,56 @@ class EyeCameraV4l2(EyeCamera):
     def _set_eye_exposure(self, eye_idx: int, exposure_time: int) -> None:
         assert isinstance(self.backend, V4l2Backend)
         uvc_utils.set_eye_exposure(self.backend._fd, eye_idx, exposure_time)
+
+
+class _EyeCameraWithoutExposureControl(EyeCamera):
+    """Eye camera on a backend without hardware, exposure values are only stored."""
+
+    def __init__(
+        self, spec: CameraSpec, backend_class: Callable[[CameraSpec], CameraBackend]
+    ) -> None:
+        self._exposures: list[int | None] = [None, None]
+        super().__init__(spec, backend_class)
+
+    def _get_eye_exposure(self, eye_idx: int) -> int | None:
+        return self._exposures[eye_idx]
+
+    def _set_eye_exposure(self, eye_idx: int, exposure_time: int) -> None:
+        self._exposures[eye_idx] = exposure_time
+
+
+class EyeCameraReplay(_EyeCameraWithoutExposureControl):
+    """Eye camera playing back a recording, see `ReplayBackend`."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        realtime: bool = True,
+        loop: bool = False,
+        spec: CameraSpec = NEON_EYE_CAMERA_SPEC,
+    ) -> None:
+        super().__init__(spec, ReplayBackend.factory(path, realtime, loop))
+
+
+class EyeCameraSynthetic(_EyeCameraWithoutExposureControl):
+    """Eye camera generating synthetic frames, see `SyntheticBackend`."""
+
+    def __init__(
+        self,
+        fps: float | None = None,
+        jitter: float = 0.0,
+        drop_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_duration: float = 0.1,
+        spec: CameraSpec = NEON_EYE_CAMERA_SPEC,
+    ) -> None:
+        super().__init__(
+            spec,
+            SyntheticBackend.factory(
+                fps=fps,
+                jitter=jitter,
+                drop_rate=drop_rate,
+                stall_rate=stall_rate,
+                stall_duration=stall_duration,
+            ),
+        )
@@ -0,0 +1,185 @@
+"""Warm-start cache of negotiated camera modes, formats and control descriptors.
+
+Enumerating the modes, formats, frame intervals and controls of a camera takes a
+number of USB round trips on every start, although the result only changes with
+the device model and its firmware. The outcome of a successful negotiation is
+therefore stored in the cache directory (see `cache.get_cache_dir()`), keyed by the
+identity of the device. An entry is used only if its version and the identity it
+was stored with match exactly, and the backends drop it if the device rejects it.
+"""
+
+import hashlib
+import json
+from typing import Any
+
+from pupil_labs.neon_usb import sysfs
+from pupil_labs.neon_usb.cache import read_cache, remove_cache, write_cache
+from pupil_labs.neon_usb.pyrav4l2 import Device, v4l2
+from pupil_labs.neon_usb.pyrav4l2.controls import (
+    Control,
+    IntegerMenuItem,
+    Menu,
+    MenuItem,
+)
+from pupil_labs.neon_usb.pyrav4l2.device import ColorFormat, FrameSize
+
+from .camera import CameraSpec
+
+MODE_CACHE_VERSION = 1
+"""Version of the entry layout, entries written by other versions are ignored"""
+
+
+def _spec_identity(spec: CameraSpec) -> dict[str, Any]:
+    return {
+        "name": spec.name,
+        "width": spec.width,
+        "height": spec.height,
+        "fps": spec.fps,
+    }
+
+
+def uvc_identity(spec: CameraSpec, device_info: dict[str, Any]) -> dict[str, Any]:
+    """Identity of a camera opened with libuvc.
+
+    Args:
+        spec: the requested camera spec
+        device_info: the camera's entry in `uvc.device_list()`
+
+    """
+    usb_dir = sysfs.find_usb_device_by_address(
+        device_info["bus_number"], device_info["device_address"]
+    )
+    return {
+        "backend": "uvc",
+        "spec": _spec_identity(spec),
+        "name": device_info["name"],
+        "manufacturer": device_info["manufacturer"],
+        "serial": device_info["serialNumber"],
+        "usb": sysfs.read_usb_attributes(usb_dir),
+    }
+
+
+def v4l2_identity(spec: CameraSpec, device: Device) -> dict[str, Any]:
+    """Identity of a v4l2 device, from its capabilities and USB attributes.
+
+    Args:
+        spec: the requested camera spec
+        device: the device, it does not need to be probed yet
+
+    """
+    usb_dir = sysfs.usb_device_of_video_node(device.path.name)
+    return {
+        "backend": "v4l2",
+        "spec": _spec_identity(spec),
+        "driver": device.driver_name,
+        "driver_version": device.driver_version,
+        "card": device.device_name,
+        "usb": sysfs.read_usb_attributes(usb_dir),
+    }
+
+
+def _entry_name(identity: dict[str, Any]) -> str:
+    key = json.dumps(identity, sort_keys=True).encode()
+    return f"modes/{identity['backend']}-{hashlib.sha256(key).hexdigest()[:16]}.json"
+
+
+def load_mode(identity: dict[str, Any]) -> dict[str, Any] | None:
+    """Get the cached negotiation result for a device, None if there is none."""
+    data = read_cache(_entry_name(identity))
+    if data is None:
+        return None
+    try:
+        entry = json.loads(data)
+    except ValueError:
+        return None
+    if (
+        not isinstance(entry, dict)
+        or entry.get("version") != MODE_CACHE_VERSION
+        or entry.get("identity") != identity
+    ):
+        return None
+    return entry
+
+
+def store_mode(identity: dict[str, Any], entry: dict[str, Any]) -> bool:
+    """Cache the negotiation result for a device, see `cache.write_cache()`."""
+    data = {**entry, "version": MODE_CACHE_VERSION, "identity": identity}
+    return write_cache(_entry_name(identity), json.dumps(data).encode())
+
+
+def forget_mode(identity: dict[str, Any]) -> None:
+    """Remove the cached negotiation result for a device, e.g. when it is stale."""
+    remove_cache(_entry_name(identity))
+
+
+def dump_formats(formats: dict[ColorFormat, list[FrameSize]]) -> list[dict[str, Any]]:
+    """Convert the formats of a v4l2 device to JSON compatible data."""
+    return [
+        {
+            "description": color_format.description,
+            "pixelformat": color_format.pixelformat,
+            "flags": color_format._flags,
+            "sizes": [[size.width, size.height] for size in sizes],
+        }
+        for color_format, sizes in formats.items()
+    ]
+
+
+def load_formats(data: list[dict[str, Any]]) -> dict[ColorFormat, list[FrameSize]]:
+    """Restore the formats of a v4l2 device from `dump_formats()` data."""
+    return {
+        ColorFormat(f["description"], f["pixelformat"], f["flags"]): [
+            FrameSize(width, height) for width, height in f["sizes"]
+        ]
+        for f in data
+    }
+
+
+def dump_controls(controls: list[Any]) -> list[dict[str, Any]]:
+    """Convert the control descriptors of a v4l2 device to JSON compatible data."""
+    dumped = []
+    for control in controls:
+        data = {
+            "id": control.id,
+            "type": control.type,
+            "name": control.name,
+            "minimum": control.minimum,
+            "maximum": control.maximum,
+            "step": control.step,
+            "default_value": control.default_value,
+            "flags": control.flags,
+        }
+        if isinstance(control, Menu):
+            items: list[Any] = control.items
+            data["items"] = [
+                [item.index, item.name if isinstance(item, MenuItem) else item.value]
+                for item in items
+            ]
+        dumped.append(data)
+    return dumped
+
+
+def load_controls(data: list[dict[str, Any]]) -> list[Any]:
+    """Restore the control descriptors of a v4l2 device from `dump_controls()` data."""
+    controls: list[Any] = []
+    for c in data:
+        query = v4l2.v4l2_query_ext_ctrl()
+        query.id = c["id"]
+        query.type = c["type"]
+        query.name = c["name"].encode()
+        query.minimum = c["minimum"]
+        query.maximum = c["maximum"]
+        query.step = c["step"]
+        query.default_value = c["default_value"]
+        query.flags = c["flags"]
+        if "items" not in c:
+            controls.append(Control(query))
+            continue
+        items: list[Any] = [
+            MenuItem(c["id"], index, value)
+            if c["type"] == v4l2.V4L2_CTRL_TYPE_MENU
+            else IntegerMenuItem(c["id"], index, value)
+            for index, value in c["items"]
+        ]
+        controls.append(Menu(query, items))
+    return controls
@@ -0,0 +1,232 @@
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+DEFAULT_LOOKUP_STEP = 4
+UNDISTORT_CRITERIA = (cv2.TERM_CRITERIA_COUNT | cv2.TERM_CRITERIA_EPS, 20, 1e-8)
+"""Termination criteria of the iterative undistortion, OpenCV's default of five
+iterations leaves errors of several pixels in the image corners"""
+
+# remap can't produce images with more than SHRT_MAX rows or columns
+_LOOKUP_COLUMNS = 4096
+
+
+def _undistort_points(
+    points: np.ndarray, camera_matrix: np.ndarray, distortion_coefficients: np.ndarray
+) -> np.ndarray:
+    if hasattr(cv2, "undistortPointsIter"):  # OpenCV 4
+        return cv2.undistortPointsIter(  # type: ignore[no-any-return]
+            points,
+            camera_matrix,
+            distortion_coefficients,
+            None,
+            None,
+            UNDISTORT_CRITERIA,
+        )
+    return cv2.undistortPoints(
+        points,
+        camera_matrix,
+        distortion_coefficients,
+        None,
+        None,
+        None,
+        UNDISTORT_CRITERIA,
+    )
+
+
+class CameraModel:
+    """Batched conversions between pixel coordinates and 3D rays of a camera.
+
+    All methods take whole arrays of points and process them in a single OpenCV or
+    numpy call. Pixel coordinates are (x, y) in the distorted camera image, 3D
+    points and rays are in camera coordinates (x right, y down, z forward), unless
+    noted otherwise.
+
+    `extrinsics` is the affine transformation from camera coordinates into the
+    coordinate system of the Neon module, as found in `SceneIntrinsics`.
+    """
+
+    def __init__(
+        self,
+        camera_matrix: npt.ArrayLike,
+        distortion_coefficients: npt.ArrayLike,
+        image_size: tuple[int, int],
+        extrinsics: npt.ArrayLike | None = None,
+        lookup_step: int = DEFAULT_LOOKUP_STEP,
+    ) -> None:
+        """Create a camera model.
+
+        Args:
+            camera_matrix: 3x3 camera matrix
+            distortion_coefficients: distortion coefficients in OpenCV order
+            image_size: (width, height) of the camera image
+            extrinsics: 4x4 affine camera to module transformation, identity if None
+            lookup_step: grid spacing in pixels of the lookup table used for
+                approximate undistortion
+
+        """
+        self.camera_matrix = np.asarray(camera_matrix, dtype=np.float64)
+        self.distortion_coefficients = np.asarray(
+            distortion_coefficients, dtype=np.float64
+        )
+        self.image_size = tuple(image_size)
+        self.extrinsics = (
+            np.eye(4) if extrinsics is None else np.asarray(extrinsics, np.float64)
+        )
+        self.lookup_step = lookup_step
+
+        self._inv_camera_matrix = np.linalg.inv(self.camera_matrix)
+        self._focal = self.camera_matrix[[0, 1], [0, 1]]
+        self._center = self.camera_matrix[:2, 2]
+        self._inv_extrinsics = np.linalg.inv(self.extrinsics)
+        self._lookup: np.ndarray | None = None
+
+    def _to_pixels(self, normalized: np.ndarray) -> np.ndarray:
+        return normalized * self._focal + self._center
+
+    def _undistort_normalized(self, points: np.ndarray) -> np.ndarray:
+        pts = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        if len(pts) == 0:
+            return np.empty((0, 2))
+        undistorted = _undistort_points(
+            pts, self.camera_matrix, self.distortion_coefficients
+        )
+        return np.asarray(undistorted.reshape(-1, 2))
+
+    def _build_lookup(self) -> np.ndarray:
+        width, height = self.image_size
+        step = self.lookup_step
+        xs = np.arange(0, width + step, step, dtype=np.float64)
+        ys = np.arange(0, height + step, step, dtype=np.float64)
+        grid = np.stack(np.meshgrid(xs, ys), axis=-1)
+        lookup = self._undistort_normalized(grid.reshape(-1, 2))
+        return lookup.reshape(len(ys), len(xs), 2).astype(np.float32)
+
+    def _undistort_lookup(self, points: np.ndarray) -> np.ndarray:
+        if self._lookup is None:
+            self._lookup = self._build_lookup()
+        # bilinear interpolation in the grid, done by remap with the points laid
+        # out as a (rows, _LOOKUP_COLUMNS) image
+        count = len(points)
+        rows = max(-(-count // _LOOKUP_COLUMNS), 1)
+        grid_pos = np.zeros((2, rows * _LOOKUP_COLUMNS), dtype=np.float32)
+        grid_pos[:, :count] = points.T / self.lookup_step
+        map_x, map_y = grid_pos.reshape(2, rows, _LOOKUP_COLUMNS)
+        result = cv2.remap(
+            self._lookup,
+            map_x,
+            map_y,
+            cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_REPLICATE,
+        )
+        return np.asarray(result.reshape(-1, 2)[:count], dtype=np.float64)
+
+    def undistort_points(
+        self,
+        points: npt.ArrayLike,
+        normalized: bool = False,
+        approximate: bool = False,
+    ) -> np.ndarray:
+        """Remove lens distortion from pixel coordinates.
+
+        Args:
+            points: (N, 2) pixel coordinates in the distorted image
+            normalized: return normalized image coordinates (x/z, y/z) instead of
+                pixel coordinates of an undistorted image with the same camera matrix
+            approximate: interpolate in a precomputed lookup grid instead of solving
+                for every point. This is constant time per point and accurate to
+                a fraction of a pixel within the image, the grid is built on first
+                use. Points outside the image are clamped to the border.
+
+        Returns:
+            (N, 2) undistorted coordinates
+
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if approximate:
+            result = self._undistort_lookup(pts)
+        else:
+            result = self._undistort_normalized(pts)
+        return result if normalized else self._to_pixels(result)
+
+    def distort_points(self, points: npt.ArrayLike) -> np.ndarray:
+        """Apply lens distortion to pixel coordinates of the undistorted image.
+
+        Args:
+            points: (N, 2) pixel coordinates in the undistorted image
+
+        Returns:
+            (N, 2) pixel coordinates in the distorted image
+
+        """
+        normalized = self.pixels_to_normalized(points)
+        return self.project_points(
+            np.column_stack([normalized, np.ones(len(normalized))])
+        )
+
+    def project_points(
+        self, points: npt.ArrayLike, module_coordinates: bool = False
+    ) -> np.ndarray:
+        """Project 3D points into the distorted camera image.
+
+        Args:
+            points: (N, 3) points in camera coordinates
+            module_coordinates: the points are given in module coordinates instead
+
+        Returns:
+            (N, 2) pixel coordinates
+
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if len(pts) == 0:
+            return np.empty((0, 2))
+        if module_coordinates:
+            pts = pts @ self._inv_extrinsics[:3, :3].T + self._inv_extrinsics[:3, 3]
+        projected, _ = cv2.projectPoints(
+            pts,
+            np.zeros(3),
+            np.zeros(3),
+            self.camera_matrix,
+            self.distortion_coefficients,
+        )
+        return np.asarray(projected.reshape(-1, 2))
+
+    def unproject(
+        self,
+        points: npt.ArrayLike,
+        module_coordinates: bool = False,
+        approximate: bool = False,
+    ) -> np.ndarray:
+        """Convert pixel coordinates to 3D rays.
+
+        Args:
+            points: (N, 2) pixel coordinates in the distorted image
+            module_coordinates: return directions in module coordinates
+            approximate: use the lookup grid, see `undistort_points()`
+
+        Returns:
+            (N, 3) unit length ray directions
+
+        """
+        normalized = self.undistort_points(
+            points, normalized=True, approximate=approximate
+        )
+        rays = np.column_stack([normalized, np.ones(len(normalized))])
+        rays /= np.linalg.norm(rays, axis=1, keepdims=True)
+        if module_coordinates:
+            rays = rays @ self.extrinsics[:3, :3].T
+        return rays
+
+    def pixels_to_normalized(self, points: npt.ArrayLike) -> np.ndarray:
+        """Apply the inverse camera matrix to pixel coordinates, ignoring distortion.
+
+        Args:
+            points: (N, 2) pixel coordinates of the undistorted image
+
+        Returns:
+            (N, 2) normalized image coordinates
+
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        inv = self._inv_camera_matrix
+        return np.asarray(pts @ inv[:2, :2].T + inv[:2, 2])
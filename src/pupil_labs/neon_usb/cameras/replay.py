@@ -0,0 +1,201 @@
+import json
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+from pupil_labs.neon_usb.cameras.backend import CameraBackend
+from pupil_labs.neon_usb.cameras.camera import CameraSpec
+from pupil_labs.neon_usb.frame import EncodedFrame, Frame
+from pupil_labs.neon_usb.recording import open_mjpeg_recording, open_raw_recording
+from pupil_labs.neon_usb.recording.raw import META_FILE
+
+
+class _ReplaySource:
+    timestamps: np.ndarray
+    """Timestamps in seconds"""
+    indices: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def image(self, i: int) -> np.ndarray:
+        raise NotImplementedError()
+
+    def encoded(self, i: int) -> EncodedFrame:
+        raise NotImplementedError("Recording does not contain encoded frames")
+
+    def close(self) -> None:
+        pass
+
+
+class _RawSource(_ReplaySource):
+    def __init__(self, path: Path) -> None:
+        self.recording = open_raw_recording(path)
+        self.timestamps = self.recording.timestamps
+        self.indices = self.recording.indices
+
+    def image(self, i: int) -> np.ndarray:
+        return np.asarray(self.recording.frames[i])
+
+
+class _MJPEGSource(_ReplaySource):
+    def __init__(self, path: Path) -> None:
+        self.recording = open_mjpeg_recording(path)
+        self.timestamps = self.recording.timestamps
+        self.indices = self.recording.indices
+
+    def image(self, i: int) -> np.ndarray:
+        return self.recording[i].img
+
+    def encoded(self, i: int) -> EncodedFrame:
+        return self.recording[i]
+
+
+class _NeonRecordingSource(_ReplaySource):
+    def __init__(self, path: Path, spec: CameraSpec) -> None:
+        import pupil_labs.neon_recording as nr
+
+        self.recording = nr.open(path)
+        self.stream: nr.VideoTimeseries
+        if spec.name == self.recording.eye.base_name:
+            self.stream = self.recording.eye
+            self.gray = True
+        else:
+            self.stream = self.recording.scene
+            self.gray = False
+        self.timestamps = self.stream.time / 1e9
+        self.indices = np.arange(len(self.timestamps))
+
+    def image(self, i: int) -> np.ndarray:
+        frame = self.stream[i]
+        img = frame.gray if self.gray else frame.bgr
+        assert isinstance(img, np.ndarray)
+        return img
+
+    def close(self) -> None:
+        self.recording.close()
+
+
+def _open_source(path: Path, spec: CameraSpec) -> _ReplaySource:
+    meta_path = path / META_FILE
+    if meta_path.exists():
+        kind = json.loads(meta_path.read_text()).get("format", "raw")
+        if kind == "mjpeg":
+            return _MJPEGSource(path)
+        return _RawSource(path)
+    if (path / "info.json").exists():
+        return _NeonRecordingSource(path, spec)
+    raise FileNotFoundError(f"No recording found in {path}")
+
+
+class ReplayBackend(CameraBackend):
+    """Serve frames from a recording instead of a physical camera.
+
+    Supported are directories written by `RawFrameRecorder` and `MJPEGRecorder`,
+    as well as Neon recordings readable by `pupil_labs.neon_recording`, from which
+    the eye or scene video is chosen based on `spec.name`.
+
+    In real time mode, `get_frame()` waits until a frame is due according to the
+    original timestamps. Otherwise frames are returned as fast as possible. Frames
+    keep their recorded timestamps and indices. At the end of the recording an
+    `EOFError` is raised, unless `loop` is set, in which case playback restarts
+    with timestamps and indices continuing from where they left off.
+
+    The backend takes additional arguments, so pass it to a camera via
+    `functools.partial`, or use `ReplayBackend.factory()`:
+
+        cam = SceneCamera(backend_class=ReplayBackend.factory("rec/scene"))
+    """
+
+    def __init__(
+        self,
+        spec: CameraSpec,
+        path: str | Path,
+        realtime: bool = True,
+        loop: bool = False,
+        speed: float = 1.0,
+    ) -> None:
+        """Open a recording for playback.
+
+        Args:
+            spec: spec of the camera to emulate
+            path: directory containing the recording
+            realtime: honour the recorded frame timing
+            loop: restart at the end instead of raising `EOFError`
+            speed: playback speed factor in real time mode
+
+        """
+        super().__init__(spec)
+        self.path = Path(path)
+        self.realtime = realtime
+        self.loop = loop
+        self.speed = speed
+
+        self._source = _open_source(self.path, spec)
+        if len(self._source) == 0:
+            self._source.close()
+            raise EOFError(f"Recording in {self.path} is empty")
+
+        timestamps = self._source.timestamps
+        period = float(np.median(np.diff(timestamps))) if len(timestamps) > 1 else 0
+        self._duration = float(timestamps[-1] - timestamps[0]) + period
+        self._index_span = int(self._source.indices[-1] - self._source.indices[0]) + 1
+
+        self._position = 0
+        self._lap = 0
+        self._start_time: float | None = None
+
+    @classmethod
+    def factory(
+        cls,
+        path: str | Path,
+        realtime: bool = True,
+        loop: bool = False,
+        speed: float = 1.0,
+    ) -> Callable[[CameraSpec], "ReplayBackend"]:
+        """Bind the playback options, for passing as `backend_class` to a camera."""
+
+        def create(spec: CameraSpec) -> ReplayBackend:
+            return cls(spec, path, realtime=realtime, loop=loop, speed=speed)
+
+        return create
+
+    def __len__(self) -> int:
+        return len(self._source)
+
+    def _next(self) -> tuple[int, float, int]:
+        if self._position == len(self._source):
+            if not self.loop:
+                raise EOFError("End of recording reached")
+            self._position = 0
+            self._lap += 1
+
+        i = self._position
+        self._position += 1
+        timestamp = float(self._source.timestamps[i]) + self._lap * self._duration
+        index = int(self._source.indices[i]) + self._lap * self._index_span
+
+        if self.realtime:
+            now = time.perf_counter()
+            if self._start_time is None:
+                self._start_time = now
+            offset = timestamp - float(self._source.timestamps[0])
+            delay = self._start_time + offset / self.speed - now
+            if delay > 0:
+                time.sleep(delay)
+
+        return i, timestamp, index
+
+    def get_frame(self) -> Frame:
+        i, timestamp, index = self._next()
+        return Frame(self._source.image(i), timestamp, index)
+
+    def get_encoded_frame(self) -> EncodedFrame:
+        i, timestamp, index = self._next()
+        frame = self._source.encoded(i)
+        return EncodedFrame(frame.data, timestamp, index)
+
+    def close(self) -> None:
+        self._source.close()
@@ -1,9 +1,13 @@
-from typing import NamedTuple
+import time
+from collections.abc import Callable
+from typing import Any, NamedTuple
 
 import numpy as np
 
-from pupil_labs.neon_usb.cameras.backend import UVCBackend
+from pupil_labs.neon_usb.cameras.backend import CameraBackend, UVCBackend
 from pupil_labs.neon_usb.cameras.camera import Camera, CameraSpec
+from pupil_labs.neon_usb.cameras.projection import CameraModel
+from pupil_labs.neon_usb.cameras.undistort import Undistorter, get_undistorter
 from pupil_labs.neon_usb.usb_utils import get_calibration
 
 
@@ -31,19 +35,22 @@ class SceneCamera(Camera):
     computer at the same time.
     """
 
-    def __init__(self, spec: CameraSpec = NEON_SCENE_CAMERA_SPEC) -> None:
+    def __init__(
+        self,
+        spec: CameraSpec = NEON_SCENE_CAMERA_SPEC,
+        backend_class: Callable[[CameraSpec], CameraBackend] = UVCBackend,
+    ) -> None:
         """Initialize the scene camera of the connected Neon device.
 
         The camera stream will be started right away. If the object fails to grab
         frames, it will automatically try to reinitialize.
-        """
-        super().__init__(NEON_SCENE_CAMERA_SPEC, UVCBackend)
 
-        assert isinstance(self.backend, UVCBackend)
-        self.uvc_controls = {
-            c.display_name: c for c in self.backend._uvc_capture.controls
-        }
-        camera_parameters = {
+        Backends other than `UVCBackend`, e.g. `ReplayBackend`, provide no camera
+        controls.
+        """
+        self._camera_model: CameraModel | None = None
+        self.uvc_controls: dict[str, Any] = {}
+        self._control_values = {
             "Backlight Compensation": 2,
             "Brightness": 0,
             "Contrast": 32,
@@ -55,7 +62,23 @@ class SceneCamera(Camera):
             "Auto Exposure Mode": 1,
             "Absolute Exposure Time": 250,
         }
-        for key, value in camera_parameters.items():
+        super().__init__(spec, backend_class)
+
+        start = time.perf_counter()
+        self._configure()
+        if isinstance(self.backend, UVCBackend):
+            self.timings["controls"] = time.perf_counter() - start
+
+    def _configure(self) -> None:
+        # after a reconnect the camera may belong to another module
+        self._camera_model = None
+        if not isinstance(self.backend, UVCBackend):
+            return
+
+        self.uvc_controls = {
+            c.display_name: c for c in self.backend._uvc_capture.controls
+        }
+        for key, value in self._control_values.items():
             try:
                 self.uvc_controls[key].value = value
             except KeyError:
@@ -76,12 +99,84 @@ class SceneCamera(Camera):
             calib_data.scene_extrinsics_affine_matrix,
         )
 
+    def get_camera_model(self) -> CameraModel:
+        """Get a model of the scene camera for batched point (un)projection
+
+        The model is created on first use from `get_intrinsics()`.
+        """
+        if self._camera_model is None:
+            intrinsics = self.get_intrinsics()
+            self._camera_model = CameraModel(
+                intrinsics.camera_matrix,
+                intrinsics.distortion_coefficients,
+                (self.spec.width, self.spec.height),
+                intrinsics.exterinsics_affine_matrix,
+            )
+        return self._camera_model
+
+    def get_undistorter(self, alpha: float = 0.0, scale: float = 1.0) -> Undistorter:
+        """Get an undistorter for the frames of this camera
+
+        The undistortion maps are computed on first use and shared afterwards.
+
+        Args:
+            alpha: 0 to crop to valid pixels only, 1 to keep all source pixels
+            scale: size of the undistorted frames relative to the camera frames
+
+        """
+        intrinsics = self.get_intrinsics()
+        return get_undistorter(
+            intrinsics.camera_matrix,
+            intrinsics.distortion_coefficients,
+            (self.spec.width, self.spec.height),
+            alpha,
+            scale,
+        )
+
+    def undistort(
+        self,
+        img: np.ndarray,
+        alpha: float = 0.0,
+        scale: float = 1.0,
+        out: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """Undistort a scene camera image
+
+        Args:
+            img: image as returned in `Frame.img`, `Frame.bgr` or `Frame.gray`
+            alpha: 0 to crop to valid pixels only, 1 to keep all source pixels
+            scale: size of the undistorted image relative to the input
+            out: preallocated array to write the result to
+
+        Returns:
+            the undistorted image
+
+        """
+        return self.get_undistorter(alpha, scale).undistort(img, out)
+
+    def _exposure_control(self) -> Any:
+        try:
+            return self.uvc_controls["Absolute Exposure Time"]
+        except KeyError:
+            raise OSError(
+                f"{self.spec.name} has no exposure control with "
+                f"{type(self.backend).__name__}!"
+            ) from None
+
     @property
     def exposure(self) -> int:
-        value = self.uvc_controls["Absolute Exposure Time"].value
+        """Absolute exposure time, only with `UVCBackend`.
+
+        Raises:
+            OSError: the backend provides no exposure control, e.g. `ReplayBackend`
+
+        """
+        value = self._exposure_control().value
         assert isinstance(value, int)
         return value
 
     @exposure.setter
     def exposure(self, value: int) -> None:
-        self.uvc_controls["Absolute Exposure Time"].value = value
+        self._exposure_control().value = value
+        # restored when reconnecting
+        self._control_values["Absolute Exposure Time"] = value
@@ -0,0 +1,151 @@
+import time
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from pupil_labs.neon_usb.cameras.backend import CameraBackend
+from pupil_labs.neon_usb.cameras.camera import CameraSpec
+from pupil_labs.neon_usb.frame import EncodedFrame, Frame
+
+SCHEDULE_LENGTH = 4096
+
+
+class SyntheticBackend(CameraBackend):
+    """Generate frames at a configurable rate, for load and soak testing.
+
+    All per-frame randomness is drawn up front: frames cycle through a bank of
+    precomputed images, and timing jitter, drops and stalls are taken from
+    precomputed schedules. A call to `get_frame()` therefore costs little more than
+    waiting for the frame to be due, so measurements reflect the code consuming
+    the frames rather than the generator.
+
+    Dropped frames still use up their time slot and index, so they show up as gaps
+    in `Frame.index`, like frames lost on the USB bus. A stall delays the frame by
+    `stall_duration`; frames that should have arrived during a stall are delivered
+    back to back afterwards. The ground truth is counted in `dropped_count` and
+    `stall_count`. A read that would wait longer than `frame_timeout` raises
+    TimeoutError after the timeout, like a camera.
+    """
+
+    def __init__(
+        self,
+        spec: CameraSpec,
+        fps: float | None = None,
+        jitter: float = 0.0,
+        drop_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_duration: float = 0.1,
+        channels: int = 1,
+        bank_size: int = 16,
+        seed: int = 0,
+    ) -> None:
+        """Set up the generator.
+
+        Args:
+            spec: size and, if `fps` is not given, rate of the frames
+            fps: frame rate, 0 to generate frames as fast as possible
+            jitter: standard deviation of the frame timing in seconds
+            drop_rate: probability that a frame is dropped
+            stall_rate: probability that a frame is delayed by `stall_duration`
+            stall_duration: duration of a stall in seconds
+            channels: 1 for grayscale frames, 3 for BGR frames
+            bank_size: number of distinct precomputed images
+            seed: seed for the pattern and schedules
+
+        """
+        super().__init__(spec)
+        self.fps = spec.fps if fps is None else fps
+        self.stall_duration = stall_duration
+        self.dropped_count = 0
+        self.stall_count = 0
+
+        rng = np.random.default_rng(seed)
+        self._bank = self._make_bank(rng, bank_size, channels)
+        self._encoded_bank: list[bytes] | None = None
+        self._jitter = rng.normal(0, jitter, SCHEDULE_LENGTH) if jitter else None
+        self._drops = rng.random(SCHEDULE_LENGTH) < drop_rate
+        self._stalls = rng.random(SCHEDULE_LENGTH) < stall_rate
+
+        self._slot = 0
+        self._stall_offset = 0.0
+        self._start_time: float | None = None
+
+    @classmethod
+    def factory(cls, **kwargs: Any) -> Callable[[CameraSpec], "SyntheticBackend"]:
+        """Bind the generator options, for passing as `backend_class` to a camera."""
+
+        def create(spec: CameraSpec) -> SyntheticBackend:
+            return cls(spec, **kwargs)
+
+        return create
+
+    def _make_bank(
+        self, rng: np.random.Generator, bank_size: int, channels: int
+    ) -> np.ndarray:
+        height, width = self.spec.height, self.spec.width
+        # a mid gray gradient with noise, shifted from image to image
+        gradient = np.linspace(60, 180, width, dtype=np.float32)[None, :]
+        base = gradient + rng.normal(0, 20, (height, width)).astype(np.float32)
+        base = np.clip(base, 0, 255).astype(np.uint8)
+        shift = max(width // bank_size, 1)
+        bank = np.stack([np.roll(base, i * shift, axis=1) for i in range(bank_size)])
+        if channels == 3:
+            bank = np.repeat(bank[..., None], 3, axis=-1)
+        elif channels != 1:
+            raise ValueError("channels must be 1 or 3")
+        # frames are handed out by reference
+        bank.flags.writeable = False
+        return bank
+
+    def _next(self) -> tuple[int, float]:
+        """Wait for the next frame that is not dropped, return its slot and time."""
+        while True:
+            slot = self._slot
+            self._slot += 1
+            k = slot % SCHEDULE_LENGTH
+
+            if self._start_time is None:
+                self._start_time = time.monotonic()
+            if self.fps:
+                due = self._start_time + slot / self.fps
+                if self._jitter is not None:
+                    due += float(self._jitter[k])
+            else:
+                due = time.monotonic()
+
+            # a slot is visited again after its read timed out
+            if self._stalls[k] and self._stall_offset < due + self.stall_duration:
+                self.stall_count += 1
+                self._stall_offset = due + self.stall_duration
+            delay = max(due, self._stall_offset) - time.monotonic()
+            if delay > self.frame_timeout:
+                time.sleep(self.frame_timeout)
+                self._slot = slot
+                raise TimeoutError(f"No frame within {self.frame_timeout} s")
+            if delay > 0:
+                time.sleep(delay)
+
+            if self._drops[k]:
+                self.dropped_count += 1
+                continue
+            return slot, due
+
+    def get_frame(self) -> Frame:
+        slot, timestamp = self._next()
+        return Frame(self._bank[slot % len(self._bank)], timestamp, slot)
+
+    def get_encoded_frame(self) -> EncodedFrame:
+        if self._encoded_bank is None:
+            import cv2
+
+            self._encoded_bank = [
+                cv2.imencode(".jpg", img)[1].tobytes() for img in self._bank
+            ]
+        slot, timestamp = self._next()
+        return EncodedFrame(
+            self._encoded_bank[slot % len(self._encoded_bank)], timestamp, slot
+        )
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,155 @@
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+MAX_CACHED_UNDISTORTERS = 8
+
+
+class Undistorter:
+    """Undistort images with precomputed remap tables.
+
+    The undistortion maps are computed once with `cv2.initUndistortRectifyMap` and
+    stored in the compact fixed-point `CV_16SC2` representation, so undistorting an
+    image is a single `cv2.remap` call.
+
+    Use `get_undistorter()` to share instances between callers.
+    """
+
+    def __init__(
+        self,
+        camera_matrix: np.ndarray,
+        distortion_coefficients: np.ndarray,
+        image_size: tuple[int, int],
+        alpha: float = 0.0,
+        scale: float = 1.0,
+        interpolation: int = cv2.INTER_LINEAR,
+    ) -> None:
+        """Compute the undistortion maps.
+
+        Args:
+            camera_matrix: 3x3 camera matrix
+            distortion_coefficients: distortion coefficients in OpenCV order
+            image_size: (width, height) of the distorted images
+            alpha: 0 to crop to valid pixels only, 1 to keep all source pixels,
+                see `cv2.getOptimalNewCameraMatrix`
+            scale: size of the undistorted images relative to the input, e.g. 0.5
+                to undistort and downscale in one step
+            interpolation: interpolation method passed to `cv2.remap`
+
+        """
+        self.image_size = tuple(image_size)
+        self.output_size = (
+            max(round(image_size[0] * scale), 1),
+            max(round(image_size[1] * scale), 1),
+        )
+        self.interpolation = interpolation
+
+        camera_matrix = np.asarray(camera_matrix, dtype=np.float64)
+        distortion_coefficients = np.asarray(distortion_coefficients, dtype=np.float64)
+        self.new_camera_matrix, _ = cv2.getOptimalNewCameraMatrix(
+            camera_matrix,
+            distortion_coefficients,
+            self.image_size,
+            alpha,
+            self.output_size,
+        )
+        self._map1, self._map2 = cv2.initUndistortRectifyMap(
+            camera_matrix,
+            distortion_coefficients,
+            None,
+            self.new_camera_matrix,
+            self.output_size,
+            cv2.CV_16SC2,
+        )
+
+    def empty_output(self, img: np.ndarray) -> np.ndarray:
+        """Allocate an array that can hold the undistorted version of `img`."""
+        return np.empty(self._output_shape(img), dtype=img.dtype)
+
+    def _output_shape(self, img: np.ndarray) -> tuple[int, ...]:
+        width, height = self.output_size
+        return (height, width, *img.shape[2:])
+
+    def undistort(self, img: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """Undistort an image.
+
+        Args:
+            img: distorted image of size `image_size`
+            out: array to write the result to, e.g. from `empty_output()`, reusing
+                it across frames avoids allocating an image per frame
+
+        Returns:
+            the undistorted image, `out` if given
+
+        Raises:
+            ValueError: if `img` has the wrong size, or `out` does not match
+                `empty_output(img)` in shape and dtype or is not C-contiguous, in
+                which case OpenCV would silently write to a new array instead
+
+        """
+        if img.shape[1::-1] != self.image_size:
+            raise ValueError(
+                f"Expected an image of size {self.image_size}, got {img.shape[1::-1]}"
+            )
+        if out is None:
+            out = self.empty_output(img)
+        else:
+            shape = self._output_shape(img)
+            if out.shape != shape or out.dtype != img.dtype:
+                raise ValueError(
+                    f"Expected out of shape {shape} and dtype {img.dtype}, "
+                    f"got {out.shape} and {out.dtype}"
+                )
+            if not out.flags.c_contiguous:
+                raise ValueError("Expected a C-contiguous out array")
+        return cv2.remap(
+            img,
+            self._map1,
+            self._map2,
+            self.interpolation,
+            dst=out,
+            borderMode=cv2.BORDER_CONSTANT,
+        )
+
+
+_cache: "OrderedDict[tuple, Undistorter]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_undistorter(
+    camera_matrix: np.ndarray,
+    distortion_coefficients: np.ndarray,
+    image_size: tuple[int, int],
+    alpha: float = 0.0,
+    scale: float = 1.0,
+) -> Undistorter:
+    """Get a shared `Undistorter`, computing its maps only on first use.
+
+    Instances are cached per intrinsics, image size, alpha and scale. The least
+    recently used ones are evicted beyond `MAX_CACHED_UNDISTORTERS`.
+    """
+    camera_matrix = np.asarray(camera_matrix, dtype=np.float64)
+    distortion_coefficients = np.asarray(distortion_coefficients, dtype=np.float64)
+    key = (
+        camera_matrix.tobytes(),
+        distortion_coefficients.tobytes(),
+        tuple(image_size),
+        alpha,
+        scale,
+    )
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    undistorter = Undistorter(
+        camera_matrix, distortion_coefficients, image_size, alpha, scale
+    )
+    with _cache_lock:
+        undistorter = _cache.setdefault(key, undistorter)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_UNDISTORTERS:
+            _cache.popitem(last=False)
+    return undistorter
@@ -0,0 +1,201 @@
+import time
+from typing import overload
+
+import numpy as np
+
+MIN_DEVICE_VARIANCE = 0.1
+"""Variance in s² of the weighted device timestamps below which the drift is not
+fitted, about that of samples spread evenly over a second. Over shorter spans the
+timing jitter dominates the slope."""
+
+
+class ClockOffsetEstimator:
+    """Running robust linear fit mapping device timestamps onto host time.
+
+    The model is `host = device * (1 + drift) + offset`, where host time is
+    `time.monotonic_ns()` taken when a sample is dequeued, in seconds. The offset
+    therefore includes the mean transport latency of the stream.
+
+    The fit is an exponentially weighted least squares over a handful of running
+    sums, so memory use is constant. Samples are Huber weighted against a running
+    estimate of the residual spread, which keeps scheduling hiccups on the host
+    from dragging the fit away. The first `warmup_samples` are held back until the
+    spread can be estimated robustly from their median, so that outliers among
+    them are down-weighted as well. Until the samples span about a second of
+    device time (see `MIN_DEVICE_VARIANCE`), only the offset is fitted and the
+    drift stays 0.
+
+    With the default forgetting factor the fit averages over the last ~1000
+    samples. Once a few times that many were added, the drift error is about
+    `jitter / (45 * window)`, where `jitter` is the spread of the dequeue latency
+    and `window` the device time 1000 samples span, e.g. 0.5 ppm at 200 Hz with
+    100 us of jitter, and about four times that after the first 1000 samples.
+    Note that `offset` is extrapolated to device time zero, so a drift error adds
+    to it in proportion to the device timestamps.
+    """
+
+    warmup_samples = 16
+    """Samples from which the residual spread is first estimated"""
+
+    def __init__(self, forgetting: float = 0.999, huber_threshold: float = 3.0):
+        """Set up an empty estimator.
+
+        Args:
+            forgetting: per-sample decay of the fit statistics, closer to 1 means a
+                longer memory
+            huber_threshold: residuals above this many times the running residual
+                spread get down-weighted
+
+        """
+        self.forgetting = forgetting
+        self.huber_threshold = huber_threshold
+        self.sample_count = 0
+        self.outlier_count = 0
+
+        # timestamps are stored relative to the first sample to keep precision
+        self._device_ref = 0.0
+        self._host_ref = 0.0
+        self._sw = self._sx = self._sy = self._sxx = self._sxy = 0.0
+        self._slope = 1.0
+        self._intercept = 0.0
+        self._spread = 0.0
+        self._fitted = 0
+        self._warmup: list[tuple[float, float]] | None = []
+
+    def update(self, device_timestamp: float, host_ns: int | None = None) -> None:
+        """Add a sample.
+
+        Args:
+            device_timestamp: the timestamp reported by the device, in seconds
+            host_ns: host `time.monotonic_ns()` at dequeue, taken now if omitted
+
+        """
+        if host_ns is None:
+            host_ns = time.monotonic_ns()
+
+        if self.sample_count == 0:
+            self._device_ref = device_timestamp
+            self._host_ref = host_ns / 1e9
+
+        x = device_timestamp - self._device_ref
+        y = host_ns / 1e9 - self._host_ref
+        self.sample_count += 1
+
+        if self._warmup is None:
+            self._add(x, y, self._weigh(x, y))
+            self._solve()
+            return
+
+        self._warmup.append((x, y))
+        offsets = np.array([sy - sx for sx, sy in self._warmup])
+        self._intercept = float(np.median(offsets))
+        if len(self._warmup) < self.warmup_samples:
+            return
+        # the median absolute deviation is not skewed by outliers, unlike a fit
+        self._spread = float(np.median(np.abs(offsets - self._intercept)))
+        samples, self._warmup = self._warmup, None
+        # it counts as much as the samples it was estimated from
+        self._fitted = len(samples)
+        weights = [self._weigh(sx, sy) for sx, sy in samples]
+        for (sx, sy), weight in zip(samples, weights, strict=True):
+            self._add(sx, sy, weight)
+        self._solve()
+
+    def _weigh(self, x: float, y: float) -> float:
+        """Huber weight of a sample against the current fit, updates the spread."""
+        self._fitted += 1
+        weight = 1.0
+        residual = abs(y - (self._slope * x + self._intercept))
+        limit = self.huber_threshold * self._spread
+        if self._spread > 0 and residual > limit:
+            weight = limit / residual
+            self.outlier_count += 1
+            residual = limit
+        alpha = max(1 / self._fitted, 1 - self.forgetting)
+        self._spread += alpha * (residual - self._spread)
+        return weight
+
+    def _add(self, x: float, y: float, weight: float) -> None:
+        lam = self.forgetting
+        self._sw = lam * self._sw + weight
+        self._sx = lam * self._sx + weight * x
+        self._sy = lam * self._sy + weight * y
+        self._sxx = lam * self._sxx + weight * x * x
+        self._sxy = lam * self._sxy + weight * x * y
+
+    def _solve(self) -> None:
+        mean_x = self._sx / self._sw
+        mean_y = self._sy / self._sw
+        var_x = self._sxx / self._sw - mean_x * mean_x
+        # with too little spread in device time only the offset is observable
+        if var_x > MIN_DEVICE_VARIANCE:
+            self._slope = (self._sxy / self._sw - mean_x * mean_y) / var_x
+        self._intercept = mean_y - self._slope * mean_x
+
+    @property
+    def offset(self) -> float:
+        """Host time minus device time at device time zero, in seconds."""
+        return self._host_ref + self._intercept - self._slope * self._device_ref
+
+    @property
+    def drift(self) -> float:
+        """Relative rate difference of the two clocks, e.g. 1e-6 for 1 ppm."""
+        return self._slope - 1.0
+
+    @property
+    def residual_spread(self) -> float:
+        """Running mean absolute residual of the fit, in seconds."""
+        return self._spread
+
+    @overload
+    def to_host_time(self, device_timestamps: float) -> float: ...
+
+    @overload
+    def to_host_time(self, device_timestamps: np.ndarray) -> np.ndarray: ...
+
+    def to_host_time(self, device_timestamps: float | np.ndarray) -> float | np.ndarray:
+        """Convert device timestamps to host monotonic time in seconds.
+
+        Accepts a single timestamp or an array of timestamps.
+        """
+        if self.sample_count == 0:
+            raise ValueError("No samples have been added yet")
+
+        x = np.asarray(device_timestamps, dtype=np.float64) - self._device_ref
+        host = self._host_ref + self._intercept + self._slope * x
+        if isinstance(device_timestamps, np.ndarray):
+            return host
+        return float(host)
+
+
+class ClockAligner:
+    """One `ClockOffsetEstimator` per named stream.
+
+    Comparing offsets of two streams gives their relative latency, e.g.
+    `aligner.offset("scene") - aligner.offset("eye")`.
+    """
+
+    def __init__(self, forgetting: float = 0.999, huber_threshold: float = 3.0):
+        self.forgetting = forgetting
+        self.huber_threshold = huber_threshold
+        self.estimators: dict[str, ClockOffsetEstimator] = {}
+
+    def __getitem__(self, stream: str) -> ClockOffsetEstimator:
+        if stream not in self.estimators:
+            self.estimators[stream] = ClockOffsetEstimator(
+                self.forgetting, self.huber_threshold
+            )
+        return self.estimators[stream]
+
+    def update(
+        self, stream: str, device_timestamp: float, host_ns: int | None = None
+    ) -> None:
+        self[stream].update(device_timestamp, host_ns)
+
+    def offset(self, stream: str) -> float:
+        return self.estimators[stream].offset
+
+    def to_host_time(
+        self, stream: str, device_timestamps: float | np.ndarray
+    ) -> float | np.ndarray:
+        return self.estimators[stream].to_host_time(device_timestamps)
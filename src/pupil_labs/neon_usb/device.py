@@ -1,14 +1,514 @@
-from functools import cached_property
+import queue
+import threading
+import time
+from collections.abc import Callable
+from operator import methodcaller
+from typing import Any, Generic, Literal, NamedTuple, TypeVar, cast
 
-from pupil_labs.neon_usb.cameras.eye import EyeCamera
+from typing_extensions import Self
+
+from pupil_labs.neon_usb import latency
+from pupil_labs.neon_usb.cameras.camera import Camera
+from pupil_labs.neon_usb.cameras.eye import EyeCamera, EyeCameraUVC
 from pupil_labs.neon_usb.cameras.scene import SceneCamera
+from pupil_labs.neon_usb.frame import Frame
+from pupil_labs.neon_usb.queue_utils import ByteBudgetQueue, MemoryBudget, MemoryUsage
+from pupil_labs.neon_usb.stream_stats import StreamStats, StreamStatsSnapshot
+from pupil_labs.neon_usb.watchdog import StallEvent, StreamStalledError, Watchdog
+from pupil_labs.neon_usb_imu import IMUData, NeonUsbImu
+
+T = TypeVar("T")
+
+STREAM_NAMES = ("eye", "scene", "imu")
+
+StallPolicy = Literal["restart", "raise", "ignore"]
+
+
+class StreamBatches(NamedTuple):
+    eye: list[Frame]
+    scene: list[Frame]
+    imu: list[IMUData]
+
+
+class StreamCounters(NamedTuple):
+    received: int
+    """Items read from the device"""
+    dropped: int
+    """Items dropped because the stream's queue was full"""
+    rate: float
+    """Items received per second since the session started"""
+    stalls: int = 0
+    """Times the stream missed its liveness deadline, see `Watchdog`"""
+    restarts: int = 0
+    """Times the stream was restarted after a stall"""
+    reconnects: int = 0
+    """Times the camera was reopened, after a stall or a disconnection"""
+    queued: int = 0
+    """Items waiting in the stream's queue to be collected"""
+
+
+class _Stream(Generic[T]):
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        read: Callable[[Any], T],
+        queue_: queue.Queue[T],
+        timestamp: Callable[[T], float] | None = None,
+    ) -> None:
+        self.name = name
+        self.factory = factory
+        self.read = read
+        self.timestamp = timestamp
+        """Timestamp in seconds of an item, for sources without their own stats"""
+        self.stats = StreamStats()
+        self.queue = queue_
+        self.sinks: list[Callable[[T], Any]] = []
+        self.source: Any = None
+        self.lock = threading.Lock()
+        self.thread: threading.Thread | None = None
+        self.opened = threading.Event()
+        self.error: BaseException | None = None
+        self.error_reported = False
+        self.received = 0
+        self.dropped = 0
+        self.restart = threading.Event()
+        self.restarts = 0
+        self.reconnects = 0
+        """Reconnects of the source of the last session, while it is not open"""
+        self.timings: dict[str, float] = {}
+
+    def drain(self) -> list[T]:
+        items = []
+        while True:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                return items
+
+
+def _close(source: Any) -> None:
+    if hasattr(source, "close"):
+        source.close()
+    elif hasattr(source, "stop_sensors"):
+        source.stop_sensors()
 
 
 class Device:
-    @cached_property
-    def scene(self) -> SceneCamera:
-        return SceneCamera()
+    """Capture session for the eye cameras, scene camera and IMU of a Neon module.
+
+    Each enabled stream is read by its own thread into a bounded queue, from which
+    `get_batches()` collects everything received since the last call. When a queue
+    is full, new items are dropped and counted, so a slow consumer never stalls
+    capturing. Additionally, sinks can be attached to a stream to be called with
+    every item right in the capture thread, e.g. the `write` method of a recorder.
+
+        with Device() as device:
+            device.add_sink("eye", recorder.write)
+            while True:
+                batches = device.get_batches()
+
+    The streams are opened in parallel in `start()`, and capturing begins only once
+    all of them are open, so their first frames are close together in time.
+
+    The camera streams are watched for stalls by `watchdog`: a camera that delivers
+    no frame for a few frame periods is restarted right away, or stopped with a
+    `StreamStalledError`, depending on `on_stall`, instead of waiting for a read to
+    time out after seconds.
+    """
 
-    @cached_property
+    def __init__(
+        self,
+        eye: Callable[[], EyeCamera] | None = EyeCameraUVC,
+        scene: Callable[[], SceneCamera] | None = SceneCamera,
+        imu: Callable[[], NeonUsbImu] | None = NeonUsbImu,
+        queue_size: int = 400,
+        on_stall: StallPolicy = "restart",
+        queue_bytes: int | dict[str, int] | None = None,
+        memory_budget: MemoryBudget | None = None,
+    ) -> None:
+        """Configure the session, no device is opened yet.
+
+        Args:
+            eye: creates the eye camera, None to disable the stream
+            scene: creates the scene camera, None to disable the stream
+            imu: creates the IMU, None to disable the stream
+            queue_size: max number of items buffered per stream
+            on_stall: what to do when a camera stalls: "restart" reopens it,
+                "raise" stops the stream and reports the stall from
+                `get_batches()`, "ignore" only counts the stall
+            queue_bytes: max bytes buffered per stream, or per stream name, see
+                `ByteBudgetQueue`. Decoded scene frames are ~80 times larger than
+                eye frames, so item counts alone bound memory poorly.
+            memory_budget: max bytes buffered by all streams together
+
+        """
+        self.on_stall = on_stall
+        self.watchdog = Watchdog()
+        """Liveness deadlines of the camera streams, configure it before `start()`
+        or add actions to it while running"""
+        self.memory_budget = memory_budget
+
+        def make_queue(name: str) -> queue.Queue[Any]:
+            max_bytes = (
+                queue_bytes.get(name) if isinstance(queue_bytes, dict) else queue_bytes
+            )
+            if max_bytes is None and memory_budget is None:
+                return queue.Queue(maxsize=queue_size)
+            return ByteBudgetQueue(max_bytes, memory_budget, maxsize=queue_size)
+
+        self._streams: dict[str, _Stream[Any]] = {}
+        if eye is not None:
+            self._streams["eye"] = _Stream(
+                "eye", eye, methodcaller("get_frame"), make_queue("eye")
+            )
+        if scene is not None:
+            self._streams["scene"] = _Stream(
+                "scene", scene, methodcaller("get_frame"), make_queue("scene")
+            )
+        if imu is not None:
+            self._streams["imu"] = _Stream(
+                "imu",
+                imu,
+                methodcaller("get_imu_data"),
+                make_queue("imu"),
+                timestamp=lambda data: data.time / 1e9,
+            )
+
+        self._go = threading.Event()
+        self._stop = threading.Event()
+        self._new_data = threading.Event()
+        self._start_time: float | None = None
+        self._stop_time: float | None = None
+        self._open_duration = 0.0
+
+    def _stream(self, name: str) -> _Stream[Any]:
+        try:
+            return self._streams[name]
+        except KeyError:
+            raise ValueError(
+                f"Unknown or disabled stream {name!r}, "
+                f"enabled are {list(self._streams)}"
+            ) from None
+
+    def _source(self, name: str) -> Any:
+        stream = self._stream(name)
+        with stream.lock:
+            if stream.source is None:
+                stream.source = stream.factory()
+            return stream.source
+
+    @property
     def eye(self) -> EyeCamera:
-        return EyeCamera()
+        """The eye camera, opened on first access if the session isn't running."""
+        return cast(EyeCamera, self._source("eye"))
+
+    @property
+    def scene(self) -> SceneCamera:
+        """The scene camera, opened on first access if the session isn't running."""
+        return cast(SceneCamera, self._source("scene"))
+
+    @property
+    def imu(self) -> NeonUsbImu:
+        """The IMU, opened on first access if the session isn't running."""
+        return cast(NeonUsbImu, self._source("imu"))
+
+    def get_source(self, stream: str) -> Any:
+        """Return the camera or IMU of a stream if it is open, None otherwise.
+
+        Unlike the `eye`, `scene` and `imu` properties, this never opens it.
+        """
+        return self._stream(stream).source
+
+    @property
+    def streams(self) -> list[str]:
+        """Names of the enabled streams."""
+        return list(self._streams)
+
+    @property
+    def running(self) -> bool:
+        return any(
+            s.thread is not None and s.thread.is_alive() for s in self._streams.values()
+        )
+
+    def add_sink(self, stream: str, sink: Callable[[Any], Any]) -> None:
+        """Call `sink` with every item of a stream, in the capture thread.
+
+        Sinks should return quickly, since they delay reading the next item. An
+        exception raised by a sink stops the stream like a read error.
+        """
+        self._stream(stream).sinks.append(sink)
+
+    def remove_sink(self, stream: str, sink: Callable[[Any], Any]) -> None:
+        self._stream(stream).sinks.remove(sink)
+
+    def start(self, timeout: float | None = None) -> None:
+        """Open all streams and start capturing.
+
+        Args:
+            timeout: max time in seconds to wait for the streams to open
+
+        Raises:
+            TimeoutError: not all streams opened in time
+            OSError: a stream failed to open
+
+        """
+        if self.running:
+            raise RuntimeError("Session is already running")
+
+        self._go.clear()
+        self._stop.clear()
+        self._new_data.clear()
+        start = time.perf_counter()
+        for stream in self._streams.values():
+            stream.opened.clear()
+            stream.error = None
+            stream.error_reported = False
+            stream.received = stream.dropped = stream.restarts = 0
+            stream.reconnects = 0
+            stream.restart.clear()
+            stream.timings = {}
+            stream.drain()
+            stream.thread = threading.Thread(
+                target=self._run,
+                args=(stream,),
+                name=f"neon-{stream.name}",
+                daemon=True,
+            )
+            stream.thread.start()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for stream in self._streams.values():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if not stream.opened.wait(remaining):
+                self.stop()
+                raise TimeoutError(f"Opening the {stream.name} stream timed out")
+            if stream.error is not None:
+                self.stop()
+                raise OSError(f"Opening the {stream.name} stream failed") from (
+                    stream.error
+                )
+
+        self._open_duration = time.perf_counter() - start
+        self._start_time = time.monotonic()
+        self._stop_time = None
+        self._go.set()
+        self.watchdog.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        """Stop capturing and close all streams.
+
+        Items already buffered can still be collected with `get_batches()`.
+
+        Args:
+            timeout: max time in seconds to wait for each capture thread
+
+        """
+        if self._start_time is not None and self._stop_time is None:
+            self._stop_time = time.monotonic()
+        self._stop.set()
+        self._go.set()
+        self.watchdog.stop()
+        for stream in self._streams.values():
+            if stream.thread is not None:
+                stream.thread.join(timeout)
+                if stream.thread.is_alive():
+                    print(f"The {stream.name} capture thread did not stop in time")
+        # wake up a consumer waiting in get_batches()
+        self._new_data.set()
+
+    def _watch(self, stream: _Stream[Any], source: Any) -> float | None:
+        """Watch a camera stream, return its deadline, None for other streams."""
+        if not isinstance(source, Camera):
+            self.watchdog.unwatch(stream.name)
+            return None
+        deadline = self.watchdog.watch(stream.name, source.spec.fps, [self._on_stall])
+        # the first frame takes longer, see _restart()
+        source.backend.frame_timeout = self.watchdog.grace
+        return deadline
+
+    def _on_stall(self, event: StallEvent) -> None:
+        print(
+            f"The {event.stream} stream stalled, no item for "
+            f"{event.stalled_for * 1000:.0f} ms"
+        )
+        stream = self._streams[event.stream]
+        if self.on_stall == "restart":
+            stream.restart.set()
+        elif self.on_stall == "raise" and stream.error is None:
+            stream.error = StreamStalledError(event.stream, event.stalled_for)
+            self._new_data.set()
+
+    def _restart(self, stream: _Stream[Any], source: Camera, deadline: float) -> None:
+        stream.restart.clear()
+        stream.restarts += 1
+        self.watchdog.rearm(stream.name)
+        source.backend.frame_timeout = self.watchdog.grace
+        # reopening keeps the camera object, its mode and controls
+        source.reconnect()
+        source.backend.frame_timeout = deadline
+        self.watchdog.feed(stream.name)
+
+    def _attach_stats(self, stream: _Stream[Any], source: Any) -> None:
+        """Share the stats of sources that keep their own, e.g. `Camera.stats`."""
+        stats = getattr(source, "stats", None)
+        stream.stats = stats if isinstance(stats, StreamStats) else StreamStats()
+
+    def _read(self, stream: _Stream[T], source: Any) -> T:
+        start = time.perf_counter_ns() if latency.enabled else 0
+        item = stream.read(source)
+        if start:
+            latency.record(f"device.{stream.name}.read", start)
+        return item
+
+    def _deliver(self, stream: _Stream[T], item: T) -> None:
+        start = time.perf_counter_ns() if latency.enabled else 0
+        stream.received += 1
+        if stream.timestamp is not None:
+            # sources with stats of their own update them as they read
+            stream.stats.update(stream.timestamp(item))
+        for sink in stream.sinks:
+            sink(item)
+        try:
+            stream.queue.put_nowait(item)
+        except queue.Full:
+            stream.dropped += 1
+            stream.stats.record_discarded()
+        self._new_data.set()
+        if start:
+            latency.record(f"device.{stream.name}.deliver", start)
+
+    def _run(self, stream: _Stream[Any]) -> None:
+        start = time.perf_counter()
+        try:
+            source = self._source(stream.name)
+            deadline = self._watch(stream, source)
+            self._attach_stats(stream, source)
+        except Exception as e:  # noqa: BLE001
+            stream.error = e
+            stream.opened.set()
+            return
+        stream.timings["open"] = time.perf_counter() - start
+        stream.timings.update(getattr(source, "timings", {}))
+        stream.opened.set()
+
+        self._go.wait()
+        self.watchdog.rearm(stream.name)
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set() and stream.error is None:
+                try:
+                    item = self._read(stream, source)
+                except TimeoutError:
+                    if deadline is None:
+                        raise
+                    # reads of watched streams time out at their deadline
+                    self.watchdog.report(stream.name)
+                    if stream.restart.is_set():
+                        self._restart(stream, source, deadline)
+                    continue
+                stream.restart.clear()
+                if stream.received == 0:
+                    stream.timings["first_item"] = time.perf_counter() - start
+                    if deadline is not None:
+                        source.backend.frame_timeout = deadline
+                self.watchdog.feed(stream.name)
+                self._deliver(stream, item)
+        except Exception as e:  # noqa: BLE001
+            if not self._stop.is_set() and stream.error is None:
+                stream.error = e
+                self._new_data.set()
+        finally:
+            with stream.lock:
+                stream.reconnects = getattr(source, "reconnect_count", 0)
+                stream.source = None
+            _close(source)
+
+    def get_batches(self, timeout: float | None = None) -> StreamBatches:
+        """Collect all items received since the last call.
+
+        Blocks until at least one item is available on any stream, the timeout
+        passes or the session is stopped.
+
+        Args:
+            timeout: max time to wait in seconds
+
+        Raises:
+            OSError: a stream stopped because reading from it failed, raised once
+                per failure, the other streams keep running
+
+        """
+        for stream in self._streams.values():
+            if stream.error is not None and not stream.error_reported:
+                stream.error_reported = True
+                raise OSError(f"The {stream.name} stream failed") from stream.error
+
+        self._new_data.wait(timeout)
+        self._new_data.clear()
+        items = {name: self._streams[name].drain() for name in self._streams}
+        return StreamBatches(**{name: items.get(name, []) for name in STREAM_NAMES})
+
+    def get_startup_timings(self) -> dict[str, dict[str, float]]:
+        """Durations in seconds of the phases of starting the session.
+
+        For every stream: `open`, the time to create the camera or IMU, the phases
+        reported by the camera (see `Camera.timings`), and `first_item`, the time from
+        the start of capturing to the first item. The streams are opened in
+        parallel, the `session` entry holds the `open` time of all of them together
+        and the `first_item` time of the slowest stream.
+        """
+        timings = {name: dict(s.timings) for name, s in self._streams.items()}
+        first_items = [t["first_item"] for t in timings.values() if "first_item" in t]
+        timings["session"] = {"open": self._open_duration}
+        if len(first_items) == len(self._streams):
+            timings["session"]["first_item"] = max(first_items, default=0.0)
+        return timings
+
+    def get_counters(self) -> dict[str, StreamCounters]:
+        """Throughput, stalls and queues of each stream in this or the last session."""
+        elapsed = 0.0
+        if self._start_time is not None:
+            elapsed = (self._stop_time or time.monotonic()) - self._start_time
+        stalls = self.watchdog.get_stats()
+        return {
+            name: StreamCounters(
+                stream.received,
+                stream.dropped,
+                stream.received / elapsed if elapsed > 0 else 0.0,
+                stalls[name].stalls if name in stalls else 0,
+                stream.restarts,
+                getattr(stream.source, "reconnect_count", stream.reconnects),
+                stream.queue.qsize(),
+            )
+            for name, stream in self._streams.items()
+        }
+
+    def get_stream_stats(self) -> dict[str, StreamStatsSnapshot]:
+        """Live rate, frame intervals, dropped and discarded items of each stream.
+
+        Items are dropped before they are received, e.g. by the camera driver, and
+        discarded when the stream's queue is full. Safe to call from any thread
+        while the session is running.
+        """
+        return {name: stream.stats.snapshot() for name, stream in self._streams.items()}
+
+    def get_memory_usage(self) -> dict[str, MemoryUsage]:
+        """Bytes buffered in the queues of the streams with a byte limit.
+
+        The usage of a shared `memory_budget` is reported as "total".
+        """
+        usage = {
+            name: stream.queue.usage()
+            for name, stream in self._streams.items()
+            if isinstance(stream.queue, ByteBudgetQueue)
+        }
+        if self.memory_budget is not None:
+            usage["total"] = self.memory_budget.usage()
+        return usage
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.stop()
@@ -1,8 +1,11 @@
 from dataclasses import dataclass
+from functools import cached_property
 
-import cv2
 import numpy as np
 
+# cv2 is imported in the methods that convert images, so that modules only passing
+# frames around, like recorders and the synchronizer, don't pay for loading OpenCV
+
 
 @dataclass
 class Frame:
@@ -16,6 +19,8 @@ class Frame:
         if self.img.ndim == 2:  # already grayscale
             return self.img
         if self.img.shape[2] == 3:  # assume RGB or BGR
+            import cv2
+
             # If it's RGB, conversion still works but yields correct grayscale
             return cv2.cvtColor(self.img, cv2.COLOR_BGR2GRAY)
         raise ValueError("Unsupported image format for grayscale conversion")
@@ -24,7 +29,44 @@ class Frame:
     def bgr(self) -> np.ndarray:
         """Return a 3-channel BGR version of self.img"""
         if self.img.ndim == 2:  # grayscale -> BGR
+            import cv2
+
             return cv2.cvtColor(self.img, cv2.COLOR_GRAY2BGR)
         if self.img.shape[2] == 3:
             return self.img
         raise ValueError("Unsupported image format for BGR conversion")
+
+
+@dataclass
+class EncodedFrame:
+    """A frame still in the JPEG encoding delivered by the camera.
+
+    The pixels are only decoded when `img`, `gray` or `bgr` is accessed.
+    """
+
+    data: bytes
+    timestamp: float
+    index: int
+
+    @cached_property
+    def img(self) -> np.ndarray:
+        """Return the decoded BGR image"""
+        import cv2
+
+        img = cv2.imdecode(np.frombuffer(self.data, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("Failed to decode JPEG data")
+        return img
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Return a grayscale version of the decoded image"""
+        return self.decode().gray
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """Return the decoded image in BGR"""
+        return self.img
+
+    def decode(self) -> Frame:
+        return Frame(self.img, self.timestamp, self.index)
@@ -0,0 +1,220 @@
+"""Optional timing of the stages of the capture path.
+
+The capture path, from waiting for a frame in the kernel to handing it to the
+consumer, is instrumented with hook points that record the duration of each stage
+into a fixed-size histogram per stage. Recording is disabled by default. Hook
+points take a timestamp only if `enabled` is set and otherwise skip recording
+entirely, so while disabled they cost a flag lookup per stage.
+
+    from pupil_labs.neon_usb import latency
+
+    with latency.recording():
+        for _ in range(1000):
+            camera.get_frame()
+    for stage, stats in latency.snapshot().items():
+        print(f"{stage:24} p50 {stats.p50 * 1e6:5.0f} us p99 {stats.p99 * 1e6:5.0f} us")
+
+Hook points look like this, `record()` returns the end of the stage, which is the
+start of the next one:
+
+    start = time.perf_counter_ns() if latency.enabled else 0
+    ...
+    if start:
+        start = latency.record("stage", start)
+"""
+
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from typing import NamedTuple
+
+enabled = False
+"""Whether the hook points record, see `enable()`"""
+
+SUB_BUCKET_BITS = 3
+"""Buckets per power of two are 2**SUB_BUCKET_BITS, i.e. a relative error <12.5%"""
+NUM_BUCKETS = 320
+"""Enough for durations up to 2**40 ns (18 minutes), longer ones are clamped"""
+
+
+def _bucket(ns: int) -> int:
+    # durations below 2**(SUB_BUCKET_BITS + 1) ns get a bucket each, above that
+    # the top SUB_BUCKET_BITS + 1 bits select the bucket
+    shift = ns.bit_length() - SUB_BUCKET_BITS - 1
+    if shift <= 0:
+        return max(ns, 0)
+    index = ((shift + 1) << SUB_BUCKET_BITS) + (ns >> shift) - (1 << SUB_BUCKET_BITS)
+    return min(index, NUM_BUCKETS - 1)
+
+
+def _bucket_upper_bound(index: int) -> int:
+    """Smallest duration in ns above the bucket."""
+    if index < 2 << SUB_BUCKET_BITS:
+        return index + 1
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    mantissa = (index & ((1 << SUB_BUCKET_BITS) - 1)) + (1 << SUB_BUCKET_BITS)
+    return (mantissa + 1) << shift
+
+
+class LatencyStats(NamedTuple):
+    """Durations of a stage in seconds, percentiles are accurate to 12.5%"""
+
+    samples: int
+    mean: float
+    p50: float
+    p99: float
+    max: float
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of durations with a fixed number of buckets."""
+
+    def __init__(self) -> None:
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self._lock = threading.Lock()
+
+    def record(self, ns: int) -> None:
+        index = _bucket(ns)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_ns += ns
+            self.max_ns = max(self.max_ns, ns)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound in seconds of the bucket holding the q-th quantile (0-1)."""
+        with self._lock:
+            counts, count, max_ns = list(self.counts), self.count, self.max_ns
+        if count == 0:
+            return 0.0
+        rank = max(q * count, 1)
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return min(_bucket_upper_bound(index), max_ns) / 1e9
+        return max_ns / 1e9
+
+    def cumulative(self, bounds_ns: Sequence[int]) -> tuple[list[int], int, int]:
+        """Count the durations up to each bound, e.g. for exporting the histogram.
+
+        Bounds that are not bucket boundaries, see `_bucket_upper_bound()`, count
+        the durations of the bucket they fall into.
+
+        Args:
+            bounds_ns: ascending upper bounds in ns
+
+        Returns:
+            the counts per bound, the total count and the sum of all durations in ns
+
+        """
+        with self._lock:
+            counts, count, total_ns = list(self.counts), self.count, self.total_ns
+        cumulative = []
+        index = 0
+        running = 0
+        for bound in bounds_ns:
+            while index < NUM_BUCKETS and _bucket_upper_bound(index) <= bound:
+                running += counts[index]
+                index += 1
+            cumulative.append(running)
+        return cumulative, count, total_ns
+
+    def stats(self) -> LatencyStats:
+        with self._lock:
+            count, total_ns, max_ns = self.count, self.total_ns, self.max_ns
+        return LatencyStats(
+            count,
+            total_ns / count / 1e9 if count else 0.0,
+            self.percentile(0.5),
+            self.percentile(0.99),
+            max_ns / 1e9,
+        )
+
+
+_histograms: dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+_tracer: Callable[[str, int, int], object] | None = None
+
+
+def _histogram(stage: str) -> LatencyHistogram:
+    histogram = _histograms.get(stage)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(stage, LatencyHistogram())
+    return histogram
+
+
+def record(stage: str, start: int, end: int | None = None) -> int:
+    """Record the duration of a stage.
+
+    Args:
+        stage: name of the stage, e.g. "v4l2.dequeue"
+        start: start of the stage from `time.perf_counter_ns()`
+        end: end of the stage, defaults to now
+
+    Returns:
+        the end of the stage
+
+    """
+    if end is None:
+        end = time.perf_counter_ns()
+    _histogram(stage).record(end - start)
+    if _tracer is not None:
+        _tracer(stage, start, end)
+    return end
+
+
+def set_tracer(
+    tracer: Callable[[str, int, int], object] | None,
+) -> Callable[[str, int, int], object] | None:
+    """Also pass every recorded stage, with its start and end, to `tracer`.
+
+    Used by `tracing`, returns the previous tracer.
+    """
+    global _tracer
+    previous, _tracer = _tracer, tracer
+    return previous
+
+
+def enable() -> None:
+    global enabled
+    enabled = True
+
+
+def disable() -> None:
+    global enabled
+    enabled = False
+
+
+@contextmanager
+def recording(clear: bool = True) -> Iterator[None]:
+    """Enable recording within the block, by default starting from empty histograms."""
+    if clear:
+        reset()
+    enable()
+    try:
+        yield
+    finally:
+        disable()
+
+
+def reset() -> None:
+    """Discard everything recorded so far."""
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def histograms() -> dict[str, LatencyHistogram]:
+    """Histograms of every stage recorded so far, sorted by stage name."""
+    with _histograms_lock:
+        return dict(sorted(_histograms.items()))
+
+
+def snapshot() -> dict[str, LatencyStats]:
+    """Statistics of every stage recorded so far, sorted by stage name."""
+    return {stage: histogram.stats() for stage, histogram in histograms().items()}
@@ -0,0 +1,351 @@
+"""Capture health in the Prometheus text exposition format.
+
+For running capture as a long-lived service, `MetricsServer` serves the state of
+a `Device` session over HTTP, or a Unix socket, for Prometheus to scrape: rates,
+frame intervals, dropped and discarded items, queue depths and bytes, stalls,
+reconnects, the eye exposure times and, while `latency` recording is enabled, the
+latency histogram of every stage.
+
+    device = Device()
+    with device, MetricsServer(device, port=9747).running():
+        while True:
+            batches = device.get_batches()
+            ...
+
+    curl http://127.0.0.1:9747/metrics
+
+Metrics are collected when they are scraped, from counters and snapshots that
+the capture threads maintain anyway, so serving them costs the capture path
+nothing.
+"""
+
+import math
+import os
+import socketserver
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any
+
+from pupil_labs.neon_usb import latency
+
+if TYPE_CHECKING:
+    from pupil_labs.neon_usb.device import Device
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS_NS = tuple(1 << shift for shift in range(10, 31))
+"""Upper bounds of the exported latency buckets, powers of two from ~1 us to ~1 s,
+which are boundaries of the `latency` histogram buckets"""
+
+Sample = tuple[dict[str, str], float]
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _format_labels(labels: dict[str, str], suffix: str = "") -> str:
+    pairs = []
+    for key, value in labels.items():
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{escaped}"')
+    if suffix:
+        pairs.append(suffix)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Exposition:
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+
+    def family(
+        self, name: str, kind: str, description: str, samples: list[Sample]
+    ) -> None:
+        if not samples:
+            return
+        self.lines.append(f"# HELP {name} {description}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        histograms: dict[str, latency.LatencyHistogram],
+    ) -> None:
+        if not histograms:
+            return
+        self.lines.append(f"# HELP {name} {description}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for stage, histogram in histograms.items():
+            labels = {"stage": stage}
+            cumulative, count, total_ns = histogram.cumulative(LATENCY_BUCKETS_NS)
+            for bound, bucket_count in zip(LATENCY_BUCKETS_NS, cumulative, strict=True):
+                le = f'le="{_format_value(bound / 1e9)}"'
+                self.lines.append(
+                    f"{name}_bucket{_format_labels(labels, le)} {bucket_count}"
+                )
+            le = 'le="+Inf"'
+            self.lines.append(f"{name}_bucket{_format_labels(labels, le)} {count}")
+            self.lines.append(
+                f"{name}_sum{_format_labels(labels)} {_format_value(total_ns / 1e9)}"
+            )
+            self.lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _collect_device(exposition: _Exposition, device: "Device") -> None:
+    from pupil_labs.neon_usb.cameras.eye import EyeCamera
+
+    counters = device.get_counters()
+    stats = device.get_stream_stats()
+
+    def per_stream(values: dict[str, float]) -> list[Sample]:
+        return [({"stream": stream}, value) for stream, value in values.items()]
+
+    exposition.family(
+        "neon_device_running",
+        "gauge",
+        "Whether the capture session is running.",
+        [({}, int(device.running))],
+    )
+    exposition.family(
+        "neon_stream_received_total",
+        "counter",
+        "Items read from the device.",
+        per_stream({s: c.received for s, c in counters.items()}),
+    )
+    exposition.family(
+        "neon_stream_dropped_total",
+        "counter",
+        "Items lost before they were received, from gaps in the frame indices.",
+        per_stream({s: st.dropped for s, st in stats.items()}),
+    )
+    exposition.family(
+        "neon_stream_discarded_total",
+        "counter",
+        "Items discarded because the stream's queue was full.",
+        per_stream({s: c.dropped for s, c in counters.items()}),
+    )
+    exposition.family(
+        "neon_stream_fps",
+        "gauge",
+        "Items per second over the last items.",
+        per_stream({s: st.windowed_fps for s, st in stats.items()}),
+    )
+    exposition.family(
+        "neon_stream_interval_mean_seconds",
+        "gauge",
+        "Mean time between consecutive items.",
+        per_stream({s: st.interval_mean for s, st in stats.items()}),
+    )
+    exposition.family(
+        "neon_stream_interval_stddev_seconds",
+        "gauge",
+        "Standard deviation of the time between consecutive items.",
+        per_stream({s: math.sqrt(st.interval_variance) for s, st in stats.items()}),
+    )
+    exposition.family(
+        "neon_stream_interval_max_seconds",
+        "gauge",
+        "Longest time between consecutive items.",
+        per_stream({s: st.interval_max for s, st in stats.items()}),
+    )
+    exposition.family(
+        "neon_stream_queue_depth",
+        "gauge",
+        "Items waiting in the stream's queue to be collected.",
+        per_stream({s: c.queued for s, c in counters.items()}),
+    )
+    exposition.family(
+        "neon_stream_stalls_total",
+        "counter",
+        "Times the stream missed its liveness deadline.",
+        per_stream({s: c.stalls for s, c in counters.items()}),
+    )
+    exposition.family(
+        "neon_stream_restarts_total",
+        "counter",
+        "Times the stream was restarted after a stall.",
+        per_stream({s: c.restarts for s, c in counters.items()}),
+    )
+    exposition.family(
+        "neon_stream_reconnects_total",
+        "counter",
+        "Times the camera was reopened, after a stall or a disconnection.",
+        per_stream({s: c.reconnects for s, c in counters.items()}),
+    )
+
+    memory = device.get_memory_usage()
+    total = memory.pop("total", None)
+    exposition.family(
+        "neon_stream_queue_bytes",
+        "gauge",
+        "Bytes buffered in the stream's queue.",
+        per_stream({s: m.used for s, m in memory.items()}),
+    )
+    exposition.family(
+        "neon_stream_queue_high_water_bytes",
+        "gauge",
+        "Most bytes buffered in the stream's queue at once.",
+        per_stream({s: m.high_water for s, m in memory.items()}),
+    )
+    if total is not None:
+        exposition.family(
+            "neon_memory_budget_bytes",
+            "gauge",
+            "Bytes buffered by all streams together.",
+            [({}, total.used)],
+        )
+        exposition.family(
+            "neon_memory_budget_high_water_bytes",
+            "gauge",
+            "Most bytes buffered by all streams together at once.",
+            [({}, total.high_water)],
+        )
+
+    eye = device.get_source("eye") if "eye" in device.streams else None
+    if isinstance(eye, EyeCamera):
+        exposition.family(
+            "neon_eye_exposure",
+            "gauge",
+            "Exposure time last set for each eye, in camera units.",
+            [
+                ({"eye": str(eye_idx)}, value)
+                for eye_idx, value in enumerate(eye.last_exposure)
+                if value is not None
+            ],
+        )
+
+
+def collect(device: "Device | None" = None) -> str:
+    """Render the metrics of a session and the latency histograms.
+
+    Args:
+        device: session to report on, None to only report the latency histograms
+
+    Returns:
+        the metrics in the Prometheus text exposition format
+
+    """
+    exposition = _Exposition()
+    if device is not None:
+        _collect_device(exposition, device)
+    exposition.histogram(
+        "neon_stage_latency_seconds",
+        "Durations of the stages of the capture path, see pupil_labs.neon_usb.latency.",
+        latency.histograms(),
+    )
+    return exposition.text()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_MetricsHTTPServer | _MetricsUnixServer"
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        try:
+            body = collect(self.server.device).encode()
+        except Exception as e:  # noqa: BLE001
+            self.send_error(500, explain=repr(e))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        # scrapes every few seconds would flood the output
+        pass
+
+
+class _MetricsHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    device: "Device | None" = None
+
+
+class _MetricsUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    device: "Device | None" = None
+
+
+class MetricsServer:
+    def __init__(
+        self,
+        device: "Device | None" = None,
+        host: str = "127.0.0.1",
+        port: int = 9747,
+        path: str | None = None,
+    ) -> None:
+        """Configure the server, it starts listening with `start()`.
+
+        Args:
+            device: session to report on, None to only serve the latency histograms
+            host: interface to listen on, the default only accepts local scrapes
+            port: TCP port, 0 to pick a free one, see `address`
+            path: listen on a Unix socket at this path instead of TCP
+
+        """
+        self.device = device
+        self.host = host
+        self.port = port
+        self.path = path
+        self._server: _MetricsHTTPServer | _MetricsUnixServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def address(self) -> Any:
+        """The bound (host, port) or socket path, None while not started."""
+        return None if self._server is None else self._server.server_address
+
+    def start(self) -> None:
+        """Serve the metrics from a background thread until `stop()`."""
+        if self._server is not None:
+            return
+        server: _MetricsHTTPServer | _MetricsUnixServer
+        if self.path is not None:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            server = _MetricsUnixServer(self.path, _Handler)
+        else:
+            server = _MetricsHTTPServer((self.host, self.port), _Handler)
+        server.device = self.device
+        self._server = server
+        self._thread = threading.Thread(
+            target=server.serve_forever, name="neon-metrics", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        server, self._server = self._server, None
+        if server is None:
+            return
+        server.shutdown()
+        server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.path is not None and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    @contextmanager
+    def running(self) -> Iterator["MetricsServer"]:
+        self.start()
+        try:
+            yield self
+        finally:
+            self.stop()
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-from fcntl import ioctl
 from pathlib import Path
 from typing import Dict, List, Tuple, Type
 
 from .controls import Control, IntegerMenuItem, Item, Menu, MenuItem
+from .syscalls import ioctl, is_char_device, open_device
 from .v4l2 import *
 
 
@@ -70,23 +70,55 @@ class FrameInterval:
 class Device:
     """Class representing a v4l2 device"""
 
-    def __init__(self, path: str | Path) -> None:
+    def __init__(self, path: str | Path, probe: bool = True) -> None:
         """Parameters
         ----------
         path : str | Path
             The path to v4l2 device
+        probe : bool
+            Enumerate formats and controls right away. If False, only the
+            capabilities are queried and `probe()` has to be called before
+            using formats or controls.
 
         """
         self.path = Path(path)
-        if not self.path.is_char_device():
+        if not is_char_device(self.path):
             raise AttributeError("Provided path is not a device")
 
+        self._available_formats: Dict[ColorFormat, List[FrameSize]] = {}
+        self._controls: List[Type[Control]] = []
         self._get_capabilities()
 
+        if probe:
+            self.probe()
+
+    def probe(
+        self,
+        available_formats: Dict[ColorFormat, List[FrameSize]] | None = None,
+        controls: List[Type[Control]] | None = None,
+    ) -> None:
+        """Enumerate formats and controls of the device
+
+        Parameters
+        ----------
+        available_formats : Dict[ColorFormat, List[FrameSize]] | None
+            Formats from a previous enumeration of the same device, used
+            instead of querying them
+        controls : List[Type[Control]] | None
+            Controls from a previous enumeration of the same device, used
+            instead of querying them
+
+        """
         if self.is_video_capture_capable:
-            self._get_available_formats()
+            if available_formats is None:
+                self._get_available_formats()
+            else:
+                self._available_formats = available_formats
 
-        self._get_controls()
+        if controls is None:
+            self._get_controls()
+        else:
+            self._controls = controls
 
     @classmethod
     def with_id(self, id: int) -> Device:
@@ -112,7 +144,7 @@ class Device:
         if not self.is_video_capture_capable:
             raise DeviceNotSupportVideoCapture(self.path)
 
-        with open(self.path) as f_cam:
+        with open_device(self.path) as f_cam:
             fmt = v4l2_format()
             fmt.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
             ioctl(f_cam, VIDIOC_G_FMT, fmt)
@@ -158,7 +190,7 @@ class Device:
                 frame_size == available_size
                 for available_size in self._available_formats[color_format]
             ):
-                with open(self.path) as f_cam:
+                with open_device(self.path) as f_cam:
                     fmt = v4l2_format()
                     fmt.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
                     ioctl(f_cam, VIDIOC_G_FMT, fmt)
@@ -327,7 +359,7 @@ class Device:
         if not any(control == available_ctrl for available_ctrl in self._controls):
             raise UnsupportedControl(self.path, control)
 
-        with open(self.path) as f_cam:
+        with open_device(self.path) as f_cam:
             ctrl = v4l2_query_ext_ctrl()
             ctrl.id = control.id
             ioctl(f_cam, VIDIOC_QUERY_EXT_CTRL, ctrl)
@@ -400,7 +432,7 @@ class Device:
             raise UnsupportedFrameSize(self.path, color_format, frame_size)
 
         intervals = []
-        with open(self.path) as f_cam:
+        with open_device(self.path) as f_cam:
             frmival = v4l2_frmivalenum()
             frmival.pixel_format = color_format.pixelformat
             frmival.width = frame_size.width
@@ -450,7 +482,7 @@ class Device:
         ):
             raise WrongFrameInterval(interval, color_format, frame_size)
 
-        with open(self.path) as f_cam:
+        with open_device(self.path) as f_cam:
             streamparm = v4l2_streamparm()
             streamparm.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
             ioctl(f_cam, VIDIOC_G_PARM, streamparm)
@@ -464,7 +496,7 @@ class Device:
             raise DeviceNotSupportVideoCapture(self.path)
 
         interval = FrameInterval()
-        with open(self.path) as f_cam:
+        with open_device(self.path) as f_cam:
             streamparm = v4l2_streamparm()
             streamparm.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
             ioctl(f_cam, VIDIOC_G_PARM, streamparm)
@@ -478,10 +510,18 @@ class Device:
     def driver_name(self) -> str:
         return self._driver
 
+    @property
+    def driver_version(self) -> int:
+        return self._version
+
     @property
     def device_name(self) -> str:
         return self._card
 
+    @property
+    def bus_info(self) -> str:
+        return self._bus_info
+
     @property
     def is_video_capture_capable(self) -> bool:
         return bool(self._capabilities & V4L2_CAP_VIDEO_CAPTURE)
@@ -500,7 +540,7 @@ class Device:
     def _set_value(
         self, control: Type[Control], value: bool | int | str | Type[Item]
     ) -> None:
-        with open(self.path) as f_cam:
+        with open_device(self.path) as f_cam:
             ctrl = v4l2_ext_control()
             ctrl.id = control.id
             if control.type in [V4L2_CTRL_TYPE_MENU, V4L2_CTRL_TYPE_INTEGER_MENU]:
@@ -533,7 +573,7 @@ class Device:
         ectrls.controls = ctypes.pointer(ctrl)
         ectrls.count = 1
 
-        with open(self.path) as f_cam:
+        with open_device(self.path) as f_cam:
             try:
                 ioctl(f_cam, VIDIOC_G_EXT_CTRLS, ectrls)
             except OSError:
@@ -542,12 +582,14 @@ class Device:
         return ctrl
 
     def _get_capabilities(self) -> None:
-        with open(self.path) as f_cam:
+        with open_device(self.path) as f_cam:
             caps = v4l2_capability()
             ioctl(f_cam, VIDIOC_QUERYCAP, caps)
 
             self._driver = caps.driver.decode()
             self._card = caps.card.decode()
+            self._bus_info = caps.bus_info.decode()
+            self._version = caps.version
             self._capabilities = caps.device_caps
 
     def _get_available_formats(self) -> None:
@@ -556,7 +598,7 @@ class Device:
 
         self._available_formats = {}
 
-        with open(self.path) as f_cam:
+        with open_device(self.path) as f_cam:
             fmt = v4l2_fmtdesc()
             fmt.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
 
@@ -591,7 +633,7 @@ class Device:
 
     def _get_controls(self) -> None:
         self._controls = []
-        with open(self.path) as f_cam:
+        with open_device(self.path) as f_cam:
             ctrl_id = V4L2_CTRL_FLAG_NEXT_CTRL
 
             while True:
@@ -1,10 +1,7 @@
 from __future__ import annotations
 
-import mmap
-from fcntl import ioctl
-from select import select
-
 from .device import Device
+from .syscalls import ioctl, mmap_buffer, open_device, select
 from .v4l2 import *
 
 
@@ -51,7 +48,7 @@ class Stream:
             self._stop()
 
     def _open(self):
-        self.f_cam = open(self.device.path, "rb+", buffering=0)
+        self.f_cam = open_device(self.device.path, "rb+", buffering=0)
 
         req = v4l2_requestbuffers()
         req.count = 4
@@ -70,13 +67,7 @@ class Stream:
             buf.index = i
             ioctl(self.f_cam, VIDIOC_QUERYBUF, buf)
 
-            buffer = mmap.mmap(
-                self.f_cam.fileno(),
-                length=buf.length,
-                flags=mmap.MAP_SHARED,
-                prot=mmap.PROT_READ,
-                offset=buf.m.offset,
-            )
+            buffer = mmap_buffer(self.f_cam, buf.length, buf.m.offset)
             ioctl(self.f_cam, VIDIOC_QBUF, buf)
 
             self.buffers.append((buf, buffer))
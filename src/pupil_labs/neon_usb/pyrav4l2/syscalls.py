@@ -0,0 +1,152 @@
+"""Indirection for all operating system calls made when talking to v4l2 devices.
+
+Every ioctl, open, mmap and select goes through the active provider, which by
+default passes straight through to the operating system. Installing another
+provider, e.g. an in-process fake device, lets the capture code run without a
+camera attached.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import fcntl
+import mmap as _mmap
+import select as _select
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Sequence, Tuple
+
+from typing_extensions import Self
+
+
+class DeviceFile(Protocol):
+    """What the capture code uses of an open device, a file or a fake's handle"""
+
+    @property
+    def name(self) -> Any: ...
+
+    @property
+    def closed(self) -> bool: ...
+
+    def fileno(self) -> int: ...
+
+    def close(self) -> None: ...
+
+    def __enter__(self) -> Self: ...
+
+    def __exit__(
+        self,
+        type_: type[BaseException] | None,
+        value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> Any: ...
+
+
+class SystemCalls:
+    """Provider that passes all calls through to the operating system"""
+
+    def open(
+        self, path: str | Path, mode: str = "r", buffering: int = -1
+    ) -> DeviceFile:
+        return open(path, mode, buffering=buffering)
+
+    def ioctl(self, fd: Any, request: int, arg: Any = 0) -> Any:
+        return fcntl.ioctl(fd, request, arg)
+
+    def mmap(self, fd: Any, length: int, offset: int) -> _mmap.mmap:
+        return _mmap.mmap(
+            fd.fileno(),
+            length=length,
+            flags=_mmap.MAP_SHARED,
+            prot=_mmap.PROT_READ,
+            offset=offset,
+        )
+
+    def select(
+        self,
+        rlist: Sequence[Any],
+        wlist: Sequence[Any],
+        xlist: Sequence[Any],
+        timeout: float | None = None,
+    ) -> Tuple[List[Any], List[Any], List[Any]]:
+        return _select.select(rlist, wlist, xlist, timeout)
+
+    def is_char_device(self, path: str | Path) -> bool:
+        return Path(path).is_char_device()
+
+    def list_devices(self) -> List[Path]:
+        return sorted(Path("/dev/").glob("video*"))
+
+    def video_device_names(self) -> Optional[Dict[str, str]]:
+        """Names of the video device nodes as published in sysfs
+
+        Reading them is much cheaper than opening and querying every node, which
+        makes it suitable for polling. Returns None if sysfs is not available.
+        """
+        root = Path("/sys/class/video4linux")
+        if not root.is_dir():
+            return None
+        names = {}
+        for node in root.iterdir():
+            try:
+                names[node.name] = (node / "name").read_text().strip()
+            except OSError:
+                continue
+        return names
+
+
+_provider: SystemCalls = SystemCalls()
+
+
+def get_provider() -> SystemCalls:
+    return _provider
+
+
+def set_provider(provider: SystemCalls) -> SystemCalls:
+    """Install a provider and return the previously active one"""
+    global _provider
+    previous, _provider = _provider, provider
+    return previous
+
+
+@contextlib.contextmanager
+def use_provider(provider: SystemCalls) -> Iterator[SystemCalls]:
+    """Temporarily install a provider"""
+    previous = set_provider(provider)
+    try:
+        yield provider
+    finally:
+        set_provider(previous)
+
+
+def open_device(path: str | Path, mode: str = "r", buffering: int = -1) -> DeviceFile:
+    return _provider.open(path, mode, buffering)
+
+
+def ioctl(fd: Any, request: int, arg: Any = 0) -> Any:
+    return _provider.ioctl(fd, request, arg)
+
+
+def mmap_buffer(fd: Any, length: int, offset: int) -> _mmap.mmap:
+    return _provider.mmap(fd, length, offset)
+
+
+def select(
+    rlist: Sequence[Any],
+    wlist: Sequence[Any],
+    xlist: Sequence[Any],
+    timeout: float | None = None,
+) -> Tuple[List[Any], List[Any], List[Any]]:
+    return _provider.select(rlist, wlist, xlist, timeout)
+
+
+def is_char_device(path: str | Path) -> bool:
+    return _provider.is_char_device(path)
+
+
+def list_devices() -> List[Path]:
+    return _provider.list_devices()
+
+
+def video_device_names() -> Optional[Dict[str, str]]:
+    return _provider.video_device_names()
@@ -1,21 +1,40 @@
-import contextlib
+import mmap
+import pickle
 import queue
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from pathlib import Path
 from threading import Event
-from typing import TypeVar
+from typing import Any, Generic, NamedTuple, TypeVar, cast
 
+import numpy as np
+
+from pupil_labs.neon_usb import latency
 from pupil_labs.neon_usb.cameras.eye import EyeCamera
 from pupil_labs.neon_usb.cameras.scene import SceneCamera
-from pupil_labs.neon_usb.frame import Frame
+from pupil_labs.neon_usb.frame import EncodedFrame, Frame
 
 T = TypeVar("T")
 
+BUDGET_POLL_INTERVAL = 0.01
+"""Seconds between retries of a blocking put that waits for a shared budget, which
+is freed by other queues that don't wake it up"""
+
 
 def get_all_items(q: queue.Queue[T]) -> list[T]:
     """Retrieve all items from a queue and always at least one."""
     items = []
+    start = time.perf_counter_ns() if latency.enabled else 0
     # Need to get at least one item
     # Otherwise the queue might be spammed with requests
     items.append(q.get())
+    if start:
+        latency.record("queue.wait", start)
     while True:
         try:
             items.append(q.get_nowait())
@@ -25,7 +44,7 @@ def get_all_items(q: queue.Queue[T]) -> list[T]:
 
 
 def image_receiver(
-    CameraClass: type[SceneCamera | EyeCamera],
+    CameraClass: Callable[[], SceneCamera | EyeCamera],
     output_q: queue.Queue[Frame],
     start_event: Event,
     stop_event: Event,
@@ -39,6 +58,477 @@ def image_receiver(
         if stop_event.is_set():
             cam.close()
             break
+        start = time.perf_counter_ns() if latency.enabled else 0
         image = cam.get_frame()
-        with contextlib.suppress(queue.Full):
+        if start:
+            start = latency.record("receiver.read", start)
+        try:
             output_q.put_nowait(image)
+        except queue.Full:
+            cam.stats.record_discarded()
+        if start:
+            latency.record("receiver.put", start)
+
+
+def item_nbytes(item: object) -> int:
+    """Estimate the memory held by an item of a stream.
+
+    The pixels of a `Frame`, the payload of an `EncodedFrame` plus its pixels if it
+    was decoded, the buffer of arrays and bytes, and the shallow size of anything
+    else, like IMU samples.
+    """
+    if isinstance(item, Frame):
+        return int(item.img.nbytes)
+    if isinstance(item, EncodedFrame):
+        decoded = item.__dict__.get("img")
+        return len(item.data) + (0 if decoded is None else int(decoded.nbytes))
+    nbytes = getattr(item, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if isinstance(item, bytes | bytearray):
+        return len(item)
+    return sys.getsizeof(item)
+
+
+class MemoryUsage(NamedTuple):
+    used: int
+    """Bytes held right now"""
+    high_water: int
+    """Most bytes held at once"""
+    limit: int | None
+    """Max bytes, None if unlimited"""
+
+
+class MemoryBudget:
+    """Byte limit shared by several queues or rings, e.g. all streams of a session."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._used = 0
+        self._high_water = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, nbytes: int) -> bool:
+        """Reserve bytes if they fit into the limit, return whether they did."""
+        with self._lock:
+            if self._used + nbytes > self.limit:
+                return False
+            self._used += nbytes
+            self._high_water = max(self._high_water, self._used)
+            return True
+
+    def release(self, nbytes: int) -> None:
+        with self._lock:
+            self._used -= nbytes
+
+    def usage(self) -> MemoryUsage:
+        with self._lock:
+            return MemoryUsage(self._used, self._high_water, self.limit)
+
+
+class ByteBudgetQueue(queue.Queue[T], Generic[T]):
+    """Queue bounded by the bytes of its items instead of, or as well as, their number.
+
+    A limit of 400 items is ~29 MB of eye frames but ~2.3 GB of decoded scene
+    frames, a byte limit holds the memory of a stalled consumer to the same bound
+    for every stream. A single item larger than `max_bytes` is still accepted by
+    an empty queue, so that oversized items don't block the stream forever.
+
+        budget = MemoryBudget(512 << 20)
+        eye_q = ByteBudgetQueue[Frame](max_bytes=64 << 20, budget=budget)
+        scene_q = ByteBudgetQueue[Frame](max_bytes=256 << 20, budget=budget)
+    """
+
+    def __init__(
+        self,
+        max_bytes: int | None = None,
+        budget: MemoryBudget | None = None,
+        maxsize: int = 0,
+        size_of: Callable[[Any], int] = item_nbytes,
+    ) -> None:
+        """Create an empty queue.
+
+        Args:
+            max_bytes: max total bytes of the items, None for no limit of its own
+            budget: limit shared with other queues, which every item also has to fit
+            maxsize: max number of items, 0 for no limit
+            size_of: bytes of an item, see `item_nbytes()`
+
+        """
+        super().__init__(maxsize)
+        self.max_bytes = max_bytes
+        self.budget = budget
+        self.size_of = size_of
+        self._bytes = 0
+        self._high_water = 0
+
+    def _init(self, maxsize: int) -> None:
+        super()._init(maxsize)
+        self._sizes: deque[int] = deque()
+
+    def _get(self) -> T:
+        item = super()._get()
+        nbytes = self._sizes.popleft()
+        self._bytes -= nbytes
+        if self.budget is not None:
+            self.budget.release(nbytes)
+        return item
+
+    def _reserve(self, nbytes: int) -> bool:
+        if 0 < self.maxsize <= self._qsize():
+            return False
+        if (
+            self.max_bytes is not None
+            and self._bytes + nbytes > self.max_bytes
+            and self._qsize() > 0
+        ):
+            return False
+        return self.budget is None or self.budget.try_acquire(nbytes)
+
+    def put(self, item: T, block: bool = True, timeout: float | None = None) -> None:
+        """Put an item into the queue, see `queue.Queue.put()`.
+
+        Raises:
+            queue.Full: the item does not fit into the limits, with `block` only
+                after waiting for `timeout`
+
+        """
+        nbytes = self.size_of(item)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.not_full:
+            while not self._reserve(nbytes):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    raise queue.Full
+                wait = BUDGET_POLL_INTERVAL
+                if remaining is not None:
+                    wait = min(wait, remaining)
+                self.not_full.wait(wait)
+            self._put(item)
+            self._sizes.append(nbytes)
+            self._bytes += nbytes
+            self._high_water = max(self._high_water, self._bytes)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the items in the queue."""
+        return self._bytes
+
+    def usage(self) -> MemoryUsage:
+        with self.mutex:
+            return MemoryUsage(self._bytes, self._high_water, self.max_bytes)
+
+
+class ByteBudgetRing(Generic[T]):
+    """The newest items within a byte limit, the oldest are evicted to make room.
+
+    Unlike `ByteBudgetQueue`, which rejects new items when full, a ring always keeps
+    the latest items, e.g. for a live preview that only shows the newest frame.
+    Items that don't fit into a shared `budget` even after evicting all of the
+    ring's own items are discarded.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        budget: MemoryBudget | None = None,
+        size_of: Callable[[Any], int] = item_nbytes,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.budget = budget
+        self.size_of = size_of
+        self.evicted = 0
+        """Items removed to make room for newer ones"""
+        self.discarded = 0
+        """Items not stored because the shared budget was exhausted"""
+        self._items: deque[tuple[T, int]] = deque()
+        self._bytes = 0
+        self._high_water = 0
+        self._lock = threading.Lock()
+
+    def _evict(self) -> None:
+        _, nbytes = self._items.popleft()
+        self._bytes -= nbytes
+        if self.budget is not None:
+            self.budget.release(nbytes)
+        self.evicted += 1
+
+    def append(self, item: T) -> bool:
+        """Store an item, evicting the oldest ones as needed.
+
+        Returns:
+            whether the item was stored, False if it was discarded
+
+        """
+        nbytes = self.size_of(item)
+        with self._lock:
+            while self._items and self._bytes + nbytes > self.max_bytes:
+                self._evict()
+            if self.budget is not None:
+                while not self.budget.try_acquire(nbytes):
+                    if not self._items:
+                        self.discarded += 1
+                        return False
+                    self._evict()
+            self._items.append((item, nbytes))
+            self._bytes += nbytes
+            self._high_water = max(self._high_water, self._bytes)
+            return True
+
+    def popleft(self) -> T:
+        """Remove and return the oldest item.
+
+        Raises:
+            IndexError: the ring is empty
+
+        """
+        with self._lock:
+            item, nbytes = self._items.popleft()
+            self._bytes -= nbytes
+        if self.budget is not None:
+            self.budget.release(nbytes)
+        return item
+
+    def drain(self) -> list[T]:
+        """Remove and return all items, oldest first."""
+        with self._lock:
+            items, self._items = self._items, deque()
+            nbytes, self._bytes = self._bytes, 0
+        if self.budget is not None:
+            self.budget.release(nbytes)
+        return [item for item, _ in items]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the items in the ring."""
+        return self._bytes
+
+    def usage(self) -> MemoryUsage:
+        with self._lock:
+            return MemoryUsage(self._bytes, self._high_water, self.max_bytes)
+
+
+_FRAME, _ENCODED_FRAME, _PICKLED = range(3)
+_SPILL_HEADER = struct.Struct("<BdqB3Q8s")
+"""Kind, timestamp, index, number of dimensions, shape and dtype of a spilled item,
+followed by its pixels, JPEG payload or pickle"""
+
+
+class SpillQueue(queue.Queue[T], Generic[T]):
+    """Queue that spills items to a file on disk instead of rejecting them.
+
+    Items are kept in memory up to `memory_bytes`. Beyond that they are appended
+    to a memory-mapped ring file of `disk_bytes` and read back in order once the
+    consumer catches up, so that a consumer that falls behind for a few seconds
+    loses nothing. Once an item went to disk, later items follow it there until the
+    spilled ones are consumed, which keeps the order. The queue is full, e.g. for
+    `image_receiver()`, only when the spill file is full as well.
+
+    Frames and encoded frames are spilled as their raw pixels or payload, with
+    timestamp and index, other items are pickled. The file is created in
+    `directory`, or the system's temporary directory, and deleted on `close()`.
+
+        eye_q = SpillQueue[Frame](memory_bytes=32 << 20, disk_bytes=2 << 30)
+        threading.Thread(
+            target=image_receiver, args=(EyeCameraUVC, eye_q, started, stop)
+        ).start()
+    """
+
+    def __init__(
+        self,
+        memory_bytes: int,
+        disk_bytes: int,
+        directory: str | Path | None = None,
+        size_of: Callable[[Any], int] = item_nbytes,
+    ) -> None:
+        """Create an empty queue, the spill file is created on the first spill.
+
+        Args:
+            memory_bytes: max bytes of the items kept in memory
+            disk_bytes: size of the spill file, the max bytes spilled at once
+            directory: where to create the spill file, ideally on a fast local disk
+            size_of: bytes of an item in memory, see `item_nbytes()`
+
+        """
+        super().__init__()
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.directory = directory
+        self.size_of = size_of
+        self.spilled = 0
+        """Items written to the spill file so far"""
+        self._bytes = 0
+        self._high_water = 0
+        self._disk_used = 0
+        self._disk_high_water = 0
+        self._write_offset = 0
+        self._file: Any = None
+        self._map: mmap.mmap | None = None
+
+    def _init(self, maxsize: int) -> None:
+        super()._init(maxsize)
+        self._sizes: deque[int] = deque()
+        self._records: deque[tuple[int, int]] = deque()
+        """Offset and length of the spilled items, oldest first"""
+
+    def _qsize(self) -> int:
+        return len(self.queue) + len(self._records)
+
+    def _get(self) -> T:
+        if self.queue:
+            item = super()._get()
+            self._bytes -= self._sizes.popleft()
+            return item
+        offset, length = self._records.popleft()
+        self._disk_used -= length
+        if not self._records:
+            self._write_offset = 0
+        return cast(T, self._load(offset, length))
+
+    def _spill_offset(self, length: int) -> int | None:
+        """Find room for a record in the ring file, None if it's full."""
+        if length > self.disk_bytes:
+            return None
+        if not self._records:
+            return 0
+        head = self._records[0][0]
+        if self._records[-1][0] < head:
+            # wrapped around, the free space is between the end and the head
+            return self._write_offset if self._write_offset + length <= head else None
+        if self._write_offset + length <= self.disk_bytes:
+            return self._write_offset
+        return 0 if length <= head else None
+
+    def _open_spill_file(self) -> mmap.mmap:
+        if self._map is None:
+            self._file = tempfile.TemporaryFile(  # noqa: SIM115
+                prefix="neon-spill-", dir=self.directory
+            )
+            self._file.truncate(self.disk_bytes)
+            self._map = mmap.mmap(self._file.fileno(), self.disk_bytes)
+        return self._map
+
+    def _spill(self, item: T) -> bool:
+        payload: Any
+        if isinstance(item, Frame):
+            img = np.ascontiguousarray(item.img)
+            if img.ndim > 3:
+                raise ValueError("Only frames with up to 3 dimensions can be spilled")
+            shape = (*img.shape, 0, 0, 0)[:3]
+            header = _SPILL_HEADER.pack(
+                _FRAME,
+                item.timestamp,
+                item.index,
+                img.ndim,
+                *shape,
+                img.dtype.str.encode(),
+            )
+            payload = img.reshape(-1).view(np.uint8)
+        elif isinstance(item, EncodedFrame):
+            header = _SPILL_HEADER.pack(
+                _ENCODED_FRAME, item.timestamp, item.index, 0, 0, 0, 0, b""
+            )
+            payload = item.data
+        else:
+            header = _SPILL_HEADER.pack(_PICKLED, 0.0, 0, 0, 0, 0, 0, b"")
+            payload = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+
+        length = len(header) + len(payload)
+        offset = self._spill_offset(length)
+        if offset is None:
+            return False
+        spill_map = self._open_spill_file()
+        spill_map[offset : offset + len(header)] = header
+        spill_map[offset + len(header) : offset + length] = payload
+        self._records.append((offset, length))
+        self._write_offset = offset + length
+        self._disk_used += length
+        self._disk_high_water = max(self._disk_high_water, self._disk_used)
+        self.spilled += 1
+        return True
+
+    def _load(self, offset: int, length: int) -> Any:
+        assert self._map is not None
+        kind, timestamp, index, ndim, *shape, dtype = _SPILL_HEADER.unpack_from(
+            self._map, offset
+        )
+        start = offset + _SPILL_HEADER.size
+        end = offset + length
+        if kind == _FRAME:
+            pixel_type = np.dtype(dtype.rstrip(b"\0").decode())
+            img = np.frombuffer(
+                self._map, pixel_type, (end - start) // pixel_type.itemsize, start
+            )
+            # copied, the slot in the file is reused
+            return Frame(img.reshape(shape[:ndim]).copy(), timestamp, index)
+        if kind == _ENCODED_FRAME:
+            return EncodedFrame(self._map[start:end], timestamp, index)
+        return pickle.loads(self._map[start:end])  # noqa: S301
+
+    def put(self, item: T, block: bool = True, timeout: float | None = None) -> None:
+        """Put an item into memory or the spill file, see `queue.Queue.put()`.
+
+        Raises:
+            queue.Full: the spill file is full, with `block` only after waiting for
+                `timeout`
+
+        """
+        nbytes = self.size_of(item)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.not_full:
+            while True:
+                if not self._records and (
+                    not self.queue or self._bytes + nbytes <= self.memory_bytes
+                ):
+                    self._put(item)
+                    self._sizes.append(nbytes)
+                    self._bytes += nbytes
+                    self._high_water = max(self._high_water, self._bytes)
+                    break
+                if self._spill(item):
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    raise queue.Full
+                self.not_full.wait(remaining)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def usage(self) -> MemoryUsage:
+        """Bytes of the items kept in memory."""
+        with self.mutex:
+            return MemoryUsage(self._bytes, self._high_water, self.memory_bytes)
+
+    def disk_usage(self) -> MemoryUsage:
+        """Bytes of the items in the spill file."""
+        with self.mutex:
+            return MemoryUsage(self._disk_used, self._disk_high_water, self.disk_bytes)
+
+    def close(self) -> None:
+        """Delete the spill file, spilled items that were not consumed are lost.
+
+        The lost items count as done for `join()`, and putters waiting for room are
+        woken up.
+        """
+        with self.mutex:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+                self._file.close()
+                self._file = None
+            if self._records:
+                self.unfinished_tasks = max(
+                    self.unfinished_tasks - len(self._records), 0
+                )
+                if self.unfinished_tasks == 0:
+                    self.all_tasks_done.notify_all()
+                self.not_full.notify_all()
+                self.not_empty.notify_all()
+            self._records.clear()
+            self._disk_used = 0
+            self._write_offset = 0
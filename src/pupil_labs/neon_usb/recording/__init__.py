@@ -0,0 +1,21 @@
+from pupil_labs.neon_usb.recording.base import BackgroundRecorder
+from pupil_labs.neon_usb.recording.mjpeg import (
+    MJPEGRecorder,
+    MJPEGRecording,
+    open_mjpeg_recording,
+)
+from pupil_labs.neon_usb.recording.raw import (
+    RawFrameRecorder,
+    RawRecording,
+    open_raw_recording,
+)
+
+__all__ = [
+    "BackgroundRecorder",
+    "MJPEGRecorder",
+    "MJPEGRecording",
+    "RawFrameRecorder",
+    "RawRecording",
+    "open_mjpeg_recording",
+    "open_raw_recording",
+]
@@ -0,0 +1,132 @@
+import queue
+from abc import ABC, abstractmethod
+from pathlib import Path
+from threading import Thread
+from types import TracebackType
+from typing import Generic, TypeVar
+
+from typing_extensions import Self
+
+T = TypeVar("T")
+
+
+class _Stop:
+    """Type of the item telling the background thread to finish."""
+
+
+_STOP = _Stop()
+
+
+class BackgroundRecorder(ABC, Generic[T]):
+    """Base class for recorders that write on a background thread.
+
+    `write()` only hands the item to a bounded queue, so the capture thread never
+    blocks on disk I/O. Data is synced to disk every `fsync_every` items and on
+    `close()`. If the queue is full, the item is dropped and counted in
+    `dropped_count`, unless `block` is set.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        queue_size: int = 256,
+        fsync_every: int = 200,
+        block: bool = False,
+    ) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.fsync_every = fsync_every
+        self.block = block
+        self.count = 0
+        self.dropped_count = 0
+
+        self._queue: queue.Queue[T | _Stop] = queue.Queue(maxsize=queue_size)
+        self._error: BaseException | None = None
+        self._closed = False
+        self._open()
+        self._thread = Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def write(self, item: T) -> bool:
+        """Queue an item for writing. Returns False if it had to be dropped."""
+        if self._error is not None:
+            raise OSError("Recorder failed in the background") from self._error
+        if self._closed:
+            raise ValueError("Recorder is closed")
+
+        try:
+            self._queue.put(item, block=self.block)
+        except queue.Full:
+            self.dropped_count += 1
+            return False
+        return True
+
+    @property
+    def pending(self) -> int:
+        """Number of items waiting to be written."""
+        return self._queue.qsize()
+
+    def close(self) -> None:
+        """Write all pending items, sync and close the files."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._error is not None:
+            raise OSError("Recorder failed in the background") from self._error
+
+    def _run(self) -> None:
+        unsynced = 0
+        while not isinstance(item := self._queue.get(), _Stop):
+            if self._error is not None:
+                continue  # keep draining, so blocking producers never hang
+            try:
+                self._write_item(item)
+                self.count += 1
+                unsynced += 1
+                if unsynced >= self.fsync_every:
+                    self._sync()
+                    unsynced = 0
+            except Exception as e:  # noqa: BLE001
+                self._error = e
+
+        try:
+            if self._error is None:
+                self._sync()
+        except Exception as e:  # noqa: BLE001
+            self._error = e
+        finally:
+            try:
+                self._finalize()
+            except Exception as e:  # noqa: BLE001
+                # reported by close(), the first error is the cause of the rest
+                if self._error is None:
+                    self._error = e
+
+    @abstractmethod
+    def _open(self) -> None:
+        pass
+
+    @abstractmethod
+    def _write_item(self, item: T) -> None:
+        pass
+
+    @abstractmethod
+    def _sync(self) -> None:
+        pass
+
+    @abstractmethod
+    def _finalize(self) -> None:
+        pass
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        type_: type[BaseException] | None,
+        value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
@@ -0,0 +1,125 @@
+import json
+import os
+import struct
+from pathlib import Path
+from typing import IO
+
+import numpy as np
+
+from pupil_labs.neon_usb.frame import EncodedFrame
+from pupil_labs.neon_usb.recording.base import BackgroundRecorder
+
+FRAMES_FILE = "frames.mjpeg"
+INDEX_FILE = "frames.mjpeg.idx"
+META_FILE = "meta.json"
+
+INDEX_DTYPE = np.dtype([
+    ("timestamp_ns", "<i8"),
+    ("index", "<i8"),
+    ("offset", "<i8"),
+    ("length", "<i8"),
+])
+INDEX_STRUCT = struct.Struct("<qqqq")
+
+
+class MJPEGRecorder(BackgroundRecorder[EncodedFrame]):
+    """Record compressed scene frames as they come from the camera.
+
+    Frames from `Camera.get_encoded_frame()` are appended to a single file without
+    decoding or re-encoding them. Concatenated JPEGs form a plain MJPEG stream, so
+    the file can be played directly, e.g. `ffplay -f mjpeg frames.mjpeg`.
+    Timestamps, indices and the byte range of every frame go into a parallel int64
+    index file.
+
+    A session is read back with `open_mjpeg_recording()`.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        queue_size: int = 64,
+        fsync_every: int = 30,
+        block: bool = False,
+    ) -> None:
+        """Create a new recording in the directory `path`.
+
+        Args:
+            path: output directory, created if needed
+            queue_size: max number of frames waiting to be written
+            fsync_every: number of frames after which data is synced to disk
+            block: block on a full queue instead of dropping the frame
+
+        """
+        self._frames_file: IO[bytes]
+        self._index_file: IO[bytes]
+        self._offset = 0
+        super().__init__(path, queue_size, fsync_every, block)
+
+    def _open(self) -> None:
+        (self.path / META_FILE).write_text(json.dumps({"format": "mjpeg"}))
+        self._frames_file = open(self.path / FRAMES_FILE, "wb")  # noqa: SIM115
+        self._index_file = open(self.path / INDEX_FILE, "wb")  # noqa: SIM115
+
+    def _write_item(self, item: EncodedFrame) -> None:
+        length = len(item.data)
+        self._frames_file.write(item.data)
+        self._index_file.write(
+            INDEX_STRUCT.pack(
+                round(item.timestamp * 1e9), item.index, self._offset, length
+            )
+        )
+        self._offset += length
+
+    def _sync(self) -> None:
+        for f in (self._frames_file, self._index_file):
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _finalize(self) -> None:
+        self._frames_file.close()
+        self._index_file.close()
+
+
+class MJPEGRecording:
+    """Read access to a recording made with `MJPEGRecorder`.
+
+    The JPEG data is memory-mapped; frames are only decoded when their pixels are
+    accessed.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        index = np.fromfile(self.path / INDEX_FILE, dtype=INDEX_DTYPE)
+        data_size = (self.path / FRAMES_FILE).stat().st_size
+        # ignore a frame whose data did not make it to disk
+        index = index[index["offset"] + index["length"] <= data_size]
+
+        self.timestamps_ns: np.ndarray = index["timestamp_ns"]
+        self.indices: np.ndarray = index["index"]
+        self._offsets = index["offset"]
+        self._lengths = index["length"]
+        self._data = (
+            np.memmap(self.path / FRAMES_FILE, dtype=np.uint8, mode="r")
+            if data_size
+            else np.empty(0, dtype=np.uint8)
+        )
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Frame timestamps in seconds, like `Frame.timestamp`."""
+        return self.timestamps_ns / 1e9
+
+    def __len__(self) -> int:
+        return len(self.timestamps_ns)
+
+    def __getitem__(self, i: int) -> EncodedFrame:
+        start = int(self._offsets[i])
+        data = self._data[start : start + int(self._lengths[i])].tobytes()
+        return EncodedFrame(
+            data, float(self.timestamps_ns[i]) / 1e9, int(self.indices[i])
+        )
+
+
+def open_mjpeg_recording(path: str | Path) -> MJPEGRecording:
+    """Open a recording made with `MJPEGRecorder`."""
+    return MJPEGRecording(path)
@@ -0,0 +1,167 @@
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import IO, NamedTuple
+
+import numpy as np
+
+from pupil_labs.neon_usb.frame import Frame
+from pupil_labs.neon_usb.recording.base import BackgroundRecorder
+
+FRAMES_FILE = "frames.raw"
+INDEX_FILE = "frames.idx"
+META_FILE = "meta.json"
+
+INDEX_DTYPE = np.dtype([("timestamp_ns", "<i8"), ("index", "<i8")])
+INDEX_STRUCT = struct.Struct("<qq")
+
+EYE_FRAME_SHAPE = (192, 384)
+
+
+class RawRecording(NamedTuple):
+    frames: np.ndarray
+    """All frames as `np.memmap` of shape (N, height, width), paged in on access."""
+    timestamps_ns: np.ndarray
+    indices: np.ndarray
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Frame timestamps in seconds, like `Frame.timestamp`."""
+        return self.timestamps_ns / 1e9
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def frame(self, i: int) -> Frame:
+        return Frame(
+            self.frames[i], float(self.timestamps_ns[i]) / 1e9, int(self.indices[i])
+        )
+
+
+class RawFrameRecorder(BackgroundRecorder[Frame]):
+    """Record uncompressed frames, e.g. of the eye camera, into a memory-mapped file.
+
+    The frame file is preallocated for `initial_capacity` frames and doubles in size
+    whenever it runs full, so there is no per-frame allocation or file growth.
+    Timestamps (in ns) and frame indices go into a parallel int64 index file. The
+    index file is appended after the frame data, so its length always tells how many
+    frames are complete, even if the process died before `close()`.
+
+    A session is read back with `open_raw_recording()`.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        shape: tuple[int, ...] = EYE_FRAME_SHAPE,
+        dtype: np.dtype | type = np.uint8,
+        initial_capacity: int = 2000,
+        queue_size: int = 256,
+        fsync_every: int = 200,
+        block: bool = False,
+    ) -> None:
+        """Create a new recording in the directory `path`.
+
+        Args:
+            path: output directory, created if needed
+            shape: shape of a single frame
+            dtype: pixel data type
+            initial_capacity: number of frames to preallocate space for
+            queue_size: max number of frames waiting to be written
+            fsync_every: number of frames after which data is synced to disk
+            block: block on a full queue instead of dropping the frame
+
+        Raises:
+            ValueError: if `initial_capacity` is less than 1
+
+        """
+        if initial_capacity < 1:
+            raise ValueError(
+                f"initial_capacity must be at least 1, got {initial_capacity}"
+            )
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.capacity = initial_capacity
+
+        self._frames_file: IO[bytes]
+        self._index_file: IO[bytes]
+        self._mmap: mmap.mmap | None = None
+        self._synced_until = 0
+        super().__init__(path, queue_size, fsync_every, block)
+
+    def _open(self) -> None:
+        (self.path / META_FILE).write_text(
+            json.dumps({"format": "raw", "shape": self.shape, "dtype": self.dtype.str})
+        )
+        self._frames_file = open(self.path / FRAMES_FILE, "w+b")  # noqa: SIM115
+        self._index_file = open(self.path / INDEX_FILE, "wb")  # noqa: SIM115
+        self._map(self.capacity)
+
+    def _map(self, capacity: int) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+        os.ftruncate(self._frames_file.fileno(), capacity * self.frame_bytes)
+        self._mmap = mmap.mmap(self._frames_file.fileno(), capacity * self.frame_bytes)
+        self.capacity = capacity
+
+    def _write_item(self, item: Frame) -> None:
+        img = item.img
+        if img.shape != self.shape or img.dtype != self.dtype:
+            raise ValueError(
+                f"Expected frames of shape {self.shape} and dtype {self.dtype}, "
+                f"got {img.shape} {img.dtype}"
+            )
+        if self.count == self.capacity:
+            self._map(2 * self.capacity)
+
+        assert self._mmap is not None
+        start = self.count * self.frame_bytes
+        self._mmap[start : start + self.frame_bytes] = np.ascontiguousarray(img).data
+        self._index_file.write(
+            INDEX_STRUCT.pack(round(item.timestamp * 1e9), item.index)
+        )
+
+    def _sync(self) -> None:
+        assert self._mmap is not None
+        end = self.count * self.frame_bytes
+        start = self._synced_until - self._synced_until % mmap.ALLOCATIONGRANULARITY
+        if end > start:
+            self._mmap.flush(start, end - start)
+        self._synced_until = end
+        self._index_file.flush()
+        os.fsync(self._index_file.fileno())
+
+    def _finalize(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        # drop the preallocated tail
+        os.ftruncate(self._frames_file.fileno(), self.count * self.frame_bytes)
+        self._frames_file.close()
+        self._index_file.close()
+
+
+def open_raw_recording(path: str | Path) -> RawRecording:
+    """Open a recording made with `RawFrameRecorder` without loading it into RAM."""
+    path = Path(path)
+    meta = json.loads((path / META_FILE).read_text())
+    shape = tuple(meta["shape"])
+    dtype = np.dtype(meta["dtype"])
+    frame_bytes = int(np.prod(shape)) * dtype.itemsize
+
+    index_size = (path / INDEX_FILE).stat().st_size // INDEX_DTYPE.itemsize
+    frames_size = (path / FRAMES_FILE).stat().st_size // frame_bytes
+    count = min(index_size, frames_size)
+
+    if count == 0:
+        frames = np.empty((0, *shape), dtype=dtype)
+    else:
+        frames = np.memmap(
+            path / FRAMES_FILE, dtype=dtype, mode="r", shape=(count, *shape)
+        )
+    index = np.fromfile(path / INDEX_FILE, dtype=INDEX_DTYPE, count=count)
+
+    return RawRecording(frames, index["timestamp_ns"], index["index"])
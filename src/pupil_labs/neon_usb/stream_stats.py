@@ -0,0 +1,142 @@
+"""Live rate, timing and loss statistics of a stream of frames or samples.
+
+`StreamStats` is updated by the thread reading a stream, once per item, in
+constant time and memory. Any other thread can take a consistent `snapshot()` at
+any time without locking: the writer increments a version number before and after
+every update, and a reader retries if the version was odd or changed while it
+copied the values, like a seqlock.
+
+    camera = EyeCameraV4l2()
+    ...
+    stats = camera.stats.snapshot()
+    print(f"{stats.windowed_fps:.1f} FPS, {stats.dropped} dropped")
+"""
+
+import time
+from typing import NamedTuple
+
+
+class StreamStatsSnapshot(NamedTuple):
+    frames: int
+    """Items received"""
+    fps: float
+    """Rate from the last interval"""
+    windowed_fps: float
+    """Rate over the last `window` items"""
+    interval_mean: float
+    """Mean seconds between consecutive items"""
+    interval_variance: float
+    """Population variance of the seconds between consecutive items"""
+    interval_max: float
+    dropped: int
+    """Items lost before they were received, from gaps in the item indices"""
+    discarded: int
+    """Items received but discarded, e.g. by a full queue"""
+    last_timestamp: float | None
+
+
+class StreamStats:
+    def __init__(self, window: int = 64) -> None:
+        """Create empty statistics.
+
+        Args:
+            window: number of recent items the windowed rate is computed from
+
+        """
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        self.window = window
+        self._version = 0
+        self._timestamps = [0.0] * window
+        self._reset()
+
+    def _reset(self) -> None:
+        self._frames = 0
+        self._last_timestamp: float | None = None
+        self._last_index: int | None = None
+        self._interval = 0.0
+        self._intervals = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._max = 0.0
+        self._dropped = 0
+        self._discarded = 0
+
+    def reset(self) -> None:
+        """Start over, must be called from the thread that updates the stats."""
+        self._version += 1
+        self._reset()
+        self._version += 1
+
+    def update(self, timestamp: float, index: int | None = None) -> None:
+        """Record a received item.
+
+        Args:
+            timestamp: time of the item in seconds
+            index: sequence number of the item if the stream has one, a jump by more
+                than one counts the items in between as dropped. A decrease, e.g.
+                after the stream restarted, is not counted.
+
+        """
+        self._version += 1
+        if self._last_timestamp is not None:
+            interval = timestamp - self._last_timestamp
+            self._interval = interval
+            # Welford's online mean and variance
+            self._intervals += 1
+            delta = interval - self._mean
+            self._mean += delta / self._intervals
+            self._m2 += delta * (interval - self._mean)
+            self._max = max(self._max, interval)
+        if index is not None:
+            if self._last_index is not None and index > self._last_index + 1:
+                self._dropped += index - self._last_index - 1
+            self._last_index = index
+        self._timestamps[self._frames % self.window] = timestamp
+        self._frames += 1
+        self._last_timestamp = timestamp
+        self._version += 1
+
+    def record_discarded(self, count: int = 1) -> None:
+        """Record received items that were discarded, from the updating thread."""
+        self._version += 1
+        self._discarded += count
+        self._version += 1
+
+    def snapshot(self) -> StreamStatsSnapshot:
+        """Get the current statistics, safe to call from any thread."""
+        while True:
+            version = self._version
+            if version % 2:
+                # an update is in progress, let the writer finish it
+                time.sleep(0)
+                continue
+            frames = self._frames
+            in_window = min(frames, self.window)
+            newest = self._timestamps[(frames - 1) % self.window]
+            oldest = self._timestamps[(frames - in_window) % self.window]
+            interval = self._interval
+            intervals = self._intervals
+            mean = self._mean
+            m2 = self._m2
+            max_interval = self._max
+            dropped = self._dropped
+            discarded = self._discarded
+            last_timestamp = self._last_timestamp
+            if self._version == version:
+                break
+
+        windowed_fps = 0.0
+        if in_window >= 2 and newest > oldest:
+            windowed_fps = (in_window - 1) / (newest - oldest)
+        return StreamStatsSnapshot(
+            frames,
+            1 / interval if interval > 0 else 0.0,
+            windowed_fps,
+            mean,
+            m2 / intervals if intervals else 0.0,
+            max_interval,
+            dropped,
+            discarded,
+            last_timestamp,
+        )
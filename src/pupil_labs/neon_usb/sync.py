@@ -0,0 +1,270 @@
+from collections.abc import Sequence
+from typing import Generic, NamedTuple, TypeVar
+
+import numpy as np
+from pupil_labs.neon_usb_imu import Data3D, IMUData, Quaternion
+
+from pupil_labs.neon_usb.frame import Frame
+
+T = TypeVar("T")
+
+IMU_FIELDS = 10  # gyro xyz, accel xyz, quaternion xyzw
+
+
+class SyncedFrames(NamedTuple):
+    scene: Frame
+    eye: list[Frame]
+    """Nearest eye frame, or all eye frames inside the window. Empty if none."""
+    imu: IMUData | None
+    """IMU sample interpolated at the scene timestamp, if it could be bracketed."""
+
+
+class _History(Generic[T]):
+    """Bounded, timestamp sorted history of a single stream.
+
+    Timestamps live in a numpy array twice the size of the capacity. When it runs
+    full, the newest `capacity` entries are moved to the front, so appending is
+    O(1) amortized and `timestamps` is always a contiguous view.
+    """
+
+    def __init__(self, capacity: int, width: int = 0) -> None:
+        self.capacity = capacity
+        self._ts = np.empty(2 * capacity, dtype=np.float64)
+        self._values = np.empty((2 * capacity, width), dtype=np.float64)
+        self._items: list[T] = []
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._ts[self._start : self._end]
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[self._start : self._end]
+
+    @property
+    def newest(self) -> float | None:
+        return float(self._ts[self._end - 1]) if self._end > self._start else None
+
+    def item(self, idx: int) -> T:
+        return self._items[idx]
+
+    def append(self, timestamp: float, item: T, values: Sequence[float] = ()) -> None:
+        if self._end == len(self._ts):
+            self._compact()
+        pos = self._end
+        if self._end > self._start and timestamp < self._ts[self._end - 1]:
+            # out of order arrival, keep the history sorted
+            pos = self._start + int(
+                np.searchsorted(self.timestamps, timestamp, side="right")
+            )
+            self._ts[pos + 1 : self._end + 1] = self._ts[pos : self._end]
+            self._values[pos + 1 : self._end + 1] = self._values[pos : self._end]
+            self._items.insert(pos - self._start, item)
+        else:
+            self._items.append(item)
+        self._ts[pos] = timestamp
+        if len(values):
+            self._values[pos] = values
+        self._end += 1
+        if len(self) > self.capacity:
+            self._start += 1
+            del self._items[0]
+
+    def drop_oldest(self, count: int) -> None:
+        """Forget the `count` oldest entries."""
+        count = min(count, len(self))
+        self._start += count
+        del self._items[:count]
+
+    def _compact(self) -> None:
+        n = len(self)
+        self._ts[:n] = self._ts[self._start : self._end]
+        self._values[:n] = self._values[self._start : self._end]
+        self._start, self._end = 0, n
+
+
+class StreamSynchronizer:
+    """Match scene frames with eye frames and IMU samples.
+
+    Samples of all three streams are pushed in as they arrive and kept in bounded
+    per-stream histories. Every scene frame is paired with its nearest eye frame (or
+    all eye frames within `eye_window`) and an IMU sample linearly interpolated at
+    the scene timestamp. Matching for all pending scene frames happens at once, with
+    `np.searchsorted` over the timestamp arrays.
+
+    All timestamps are expected in seconds on a common clock. Scene and eye frames
+    of the UVC backend already share one. IMU samples are converted with
+    `IMUData.time / 1e9` unless a timestamp is passed explicitly.
+
+    A scene frame is emitted once every stream that has delivered data so far has
+    progressed past it. If one stream lags behind for more than `max_delay`
+    seconds (measured in stream time), the frame is emitted with whatever is
+    available. Samples arriving after the frames they belong to were emitted are
+    counted in `late_counts` and discarded.
+    """
+
+    def __init__(
+        self,
+        eye_tolerance: float = 0.5 / 200,
+        eye_window: float | None = None,
+        imu_tolerance: float = 0.05,
+        max_delay: float = 0.2,
+        history_size: int = 2000,
+    ) -> None:
+        """Configure the matching.
+
+        Args:
+            eye_tolerance: max distance in seconds to the nearest eye frame
+            eye_window: if set, match all eye frames within +/- this many seconds
+                instead of only the nearest one
+            imu_tolerance: max gap in seconds between the two IMU samples used for
+                interpolation
+            max_delay: how long a scene frame waits for lagging streams
+            history_size: number of samples kept per stream
+
+        """
+        self.eye_tolerance = eye_tolerance
+        self.eye_window = eye_window
+        self.imu_tolerance = imu_tolerance
+        self.max_delay = max_delay
+
+        self._eye = _History[Frame](history_size)
+        self._imu = _History[IMUData](history_size, width=IMU_FIELDS)
+        self._scene = _History[Frame](history_size)
+        self._watermark = -np.inf
+        self.late_counts = {"eye": 0, "scene": 0, "imu": 0}
+
+    @property
+    def _eye_reach(self) -> float:
+        return self.eye_window if self.eye_window is not None else self.eye_tolerance
+
+    def add_eye(self, *frames: Frame) -> None:
+        for frame in frames:
+            if frame.timestamp + self._eye_reach < self._watermark:
+                self.late_counts["eye"] += 1
+                continue
+            self._eye.append(frame.timestamp, frame)
+
+    def add_scene(self, *frames: Frame) -> None:
+        for frame in frames:
+            if frame.timestamp <= self._watermark:
+                self.late_counts["scene"] += 1
+                continue
+            self._scene.append(frame.timestamp, frame)
+
+    def add_imu(
+        self, *data: IMUData, timestamps: Sequence[float] | None = None
+    ) -> None:
+        for i, datum in enumerate(data):
+            ts = datum.time / 1e9 if timestamps is None else timestamps[i]
+            if ts + self.imu_tolerance < self._watermark:
+                self.late_counts["imu"] += 1
+                continue
+            self._imu.append(
+                ts, datum, (*datum.gyro_data, *datum.accel_data, *datum.quaternion)
+            )
+
+    def get_matches(self) -> list[SyncedFrames]:
+        """Return all scene frames that are ready, together with their matches."""
+        if not len(self._scene):
+            return []
+
+        scene_ts = self._scene.timestamps
+        ready = self._count_ready(scene_ts)
+        if ready == 0:
+            return []
+
+        scene_ts = scene_ts[:ready]
+        eye_matches = self._match_eye(scene_ts)
+        imu_matches = self._interpolate_imu(scene_ts)
+
+        results = [
+            SyncedFrames(self._scene.item(i), eye_matches[i], imu_matches[i])
+            for i in range(ready)
+        ]
+        self._watermark = float(scene_ts[-1])
+        self._scene.drop_oldest(ready)
+        return results
+
+    def _count_ready(self, scene_ts: np.ndarray) -> int:
+        newest = [
+            h.newest
+            for h in (self._eye, self._imu, self._scene)
+            if h.newest is not None
+        ]
+        deadline = max(newest) - self.max_delay
+
+        horizon = np.inf
+        if self._eye.newest is not None:
+            horizon = min(horizon, self._eye.newest - self._eye_reach)
+        if self._imu.newest is not None:
+            horizon = min(horizon, self._imu.newest)
+        horizon = max(horizon, deadline)
+
+        return int(np.searchsorted(scene_ts, horizon, side="right"))
+
+    def _match_eye(self, scene_ts: np.ndarray) -> list[list[Frame]]:
+        eye_ts = self._eye.timestamps
+        if len(eye_ts) == 0:
+            return [[] for _ in scene_ts]
+
+        if self.eye_window is not None:
+            lo = np.searchsorted(eye_ts, scene_ts - self.eye_window, side="left")
+            hi = np.searchsorted(eye_ts, scene_ts + self.eye_window, side="right")
+            return [
+                [self._eye.item(j) for j in range(a, b)]
+                for a, b in zip(lo.tolist(), hi.tolist(), strict=True)
+            ]
+
+        right = np.searchsorted(eye_ts, scene_ts)
+        left = np.clip(right - 1, 0, len(eye_ts) - 1)
+        right = np.clip(right, 0, len(eye_ts) - 1)
+        use_left = np.abs(scene_ts - eye_ts[left]) <= np.abs(eye_ts[right] - scene_ts)
+        nearest = np.where(use_left, left, right)
+        ok = np.abs(eye_ts[nearest] - scene_ts) <= self.eye_tolerance
+
+        return [
+            [self._eye.item(j)] if valid else []
+            for j, valid in zip(nearest.tolist(), ok.tolist(), strict=True)
+        ]
+
+    def _interpolate_imu(self, scene_ts: np.ndarray) -> list[IMUData | None]:
+        imu_ts = self._imu.timestamps
+        if len(imu_ts) < 2:
+            return [None] * len(scene_ts)
+
+        right = np.clip(np.searchsorted(imu_ts, scene_ts), 1, len(imu_ts) - 1)
+        left = right - 1
+        t0, t1 = imu_ts[left], imu_ts[right]
+        ok = (t0 <= scene_ts) & (scene_ts <= t1) & (t1 - t0 <= self.imu_tolerance)
+
+        span = np.where(t1 > t0, t1 - t0, 1.0)
+        w = ((scene_ts - t0) / span)[:, None]
+        v0, v1 = self._imu.values[left], self._imu.values[right]
+
+        # take the short way around for the quaternion part
+        q_sign = np.sign(np.sum(v0[:, 6:] * v1[:, 6:], axis=1, keepdims=True))
+        v1[:, 6:] *= np.where(q_sign == 0, 1, q_sign)
+        values = v0 + (v1 - v0) * w
+        norm = np.linalg.norm(values[:, 6:], axis=1, keepdims=True)
+        values[:, 6:] /= np.where(norm > 0, norm, 1)
+
+        times_ns = np.round(scene_ts * 1e9).astype(np.int64)
+        return [
+            IMUData(
+                Data3D(*row[0:3]),
+                Data3D(*row[3:6]),
+                Quaternion(*row[6:10]),
+                time,
+            )
+            if valid
+            else None
+            for row, time, valid in zip(
+                values.tolist(), times_ns.tolist(), ok.tolist(), strict=True
+            )
+        ]
@@ -0,0 +1,103 @@
+"""Cheap lookups of USB devices in the Linux sysfs.
+
+Listing `/sys/bus/usb/devices` and reading a couple of small attribute files takes
+well below a millisecond, unlike enumerating devices through libusb or libuvc, so
+these functions are suitable for polling, e.g. while waiting for a device to come
+back after it was unplugged. On systems without sysfs they report that nothing is
+known instead of failing.
+"""
+
+from pathlib import Path
+
+SYSFS_ROOT = Path("/sys")
+
+USB_ATTRIBUTES = ("idVendor", "idProduct", "bcdDevice", "manufacturer", "product")
+
+
+def _usb_devices_dir() -> Path:
+    return SYSFS_ROOT / "bus" / "usb" / "devices"
+
+
+def is_available() -> bool:
+    """Whether USB devices can be looked up in sysfs on this system."""
+    return _usb_devices_dir().is_dir()
+
+
+def _read_attribute(usb_dir: Path, name: str) -> str | None:
+    try:
+        return (usb_dir / name).read_text().strip()
+    except OSError:
+        return None
+
+
+def read_usb_attributes(usb_dir: Path | None) -> dict[str, str]:
+    """Read the model and firmware release of a USB device.
+
+    Args:
+        usb_dir: sysfs directory of the device, attributes it lacks are left out
+
+    """
+    attributes: dict[str, str] = {}
+    if usb_dir is None:
+        return attributes
+    for name in USB_ATTRIBUTES:
+        value = _read_attribute(usb_dir, name)
+        if value is not None:
+            attributes[name] = value
+    return attributes
+
+
+def find_usb_devices(vendor_id: int, product_id: int) -> list[Path] | None:
+    """Find the sysfs directories of all connected USB devices with the given ids.
+
+    Returns:
+        the directories, None if sysfs is not available
+
+    """
+    try:
+        usb_dirs = list(_usb_devices_dir().iterdir())
+    except OSError:
+        return None
+    ids = (f"{vendor_id:04x}", f"{product_id:04x}")
+    return [
+        usb_dir
+        for usb_dir in usb_dirs
+        # entries with a colon are interfaces of a device
+        if ":" not in usb_dir.name
+        and (
+            _read_attribute(usb_dir, "idVendor"),
+            _read_attribute(usb_dir, "idProduct"),
+        )
+        == ids
+    ]
+
+
+def find_usb_device_by_address(bus_number: int, device_address: int) -> Path | None:
+    """Find the sysfs directory of a USB device by its bus number and address."""
+    try:
+        usb_dirs = list(_usb_devices_dir().iterdir())
+    except OSError:
+        return None
+    for usb_dir in usb_dirs:
+        try:
+            if (
+                int((usb_dir / "busnum").read_text()) == bus_number
+                and int((usb_dir / "devnum").read_text()) == device_address
+            ):
+                return usb_dir
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def usb_device_of_video_node(node: str) -> Path | None:
+    """Find the sysfs directory of the USB device behind a video node, e.g. video0."""
+    try:
+        # the node's device is the USB interface, its parent the USB device
+        return (
+            (SYSFS_ROOT / "class" / "video4linux" / node / "device")
+            .resolve(strict=True)
+            .parent
+        )
+    except OSError:
+        return None
@@ -0,0 +1,25 @@
+"""Fakes for running the capture code without hardware attached."""
+
+from pupil_labs.neon_usb.testing.fake_usb import (
+    FakeNeonUsbDevice,
+    FakeUsbTransport,
+    make_calibration_blob,
+)
+from pupil_labs.neon_usb.testing.fake_v4l2 import (
+    FakeControl,
+    FakeDeviceFile,
+    FakeFormat,
+    FakeV4l2Device,
+    FakeV4l2Provider,
+)
+
+__all__ = [
+    "FakeControl",
+    "FakeDeviceFile",
+    "FakeFormat",
+    "FakeNeonUsbDevice",
+    "FakeUsbTransport",
+    "FakeV4l2Device",
+    "FakeV4l2Provider",
+    "make_calibration_blob",
+]
@@ -0,0 +1,147 @@
+import array
+import errno
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+
+import numpy as np
+import usb.core
+import usb.util
+from pupil_labs.neon_recording.calib import Calibration
+
+from pupil_labs.neon_usb.usb_utils import (
+    CALIBRATION_DATA_LENGTH,
+    USB_ID_PRODUCT,
+    USB_ID_VENDOR,
+    VC_GET_VERSION,
+    VC_READ_CALIRATION_DATA,
+    UsbTransport,
+    use_transport,
+)
+
+
+def make_calibration_blob(serial: str = "123456", version: int = 1) -> bytes:
+    """Create plausible calibration data as stored on a Neon module.
+
+    Args:
+        serial: six character module serial number
+        version: calibration data version
+
+    Returns:
+        `CALIBRATION_DATA_LENGTH` bytes, padded with 0xff like unused flash
+
+    """
+    calib = np.zeros(1, dtype=Calibration.dtype)[0]
+    calib["version"] = version
+    calib["serial"] = serial.encode()
+    calib["scene_camera_matrix"] = [[891.0, 0, 815.0], [0, 890.0, 597.0], [0, 0, 1]]
+    calib["scene_distortion_coefficients"] = [
+        -0.13, 0.11, 0.0002, -0.0001, 0.0, 0.17, 0.05, 0.02
+    ]  # fmt: skip
+    calib["scene_extrinsics_affine_matrix"] = np.eye(4)
+    for side, x in (("right", -0.03), ("left", 0.03)):
+        calib[f"{side}_camera_matrix"] = [[140.0, 0, 96.0], [0, 140.0, 96.0], [0, 0, 1]]
+        calib[f"{side}_distortion_coefficients"] = [0.05, -0.1, 0, 0, 0, 0, 0, 0]
+        extrinsics = np.eye(4)
+        extrinsics[0, 3] = x
+        calib[f"{side}_extrinsics_affine_matrix"] = extrinsics
+    data = bytes(calib.tobytes())
+    return data + b"\xff" * (CALIBRATION_DATA_LENGTH - len(data))
+
+
+class FakeNeonUsbDevice:
+    """Stand-in for the pyusb device of a Neon module.
+
+    Answers the vendor control requests used by `usb_utils`: reading calibration
+    data and firmware versions. Every transfer sleeps for `latency` seconds to
+    model the USB round trip, and reads of more than `max_chunk_size` bytes of
+    calibration data fail with a pipe error, like control transfers exceeding what
+    the firmware supports.
+    """
+
+    idVendor = USB_ID_VENDOR
+    idProduct = USB_ID_PRODUCT
+
+    def __init__(
+        self,
+        calibration: bytes | None = None,
+        fx2_version: int = 0x0102,
+        fpga_version: int = 0x0304,
+        latency: float = 0.001,
+        max_chunk_size: int = 64,
+    ) -> None:
+        """Create a fake module.
+
+        Args:
+            calibration: calibration data, defaults to `make_calibration_blob()`
+            fx2_version: version reported for the FX2 firmware
+            fpga_version: version reported for the FPGA firmware
+            latency: duration of each control transfer in seconds
+            max_chunk_size: largest calibration read that succeeds
+
+        """
+        if calibration is None:
+            calibration = make_calibration_blob()
+        self.calibration = calibration.ljust(CALIBRATION_DATA_LENGTH, b"\xff")
+        self.fx2_version = fx2_version
+        self.fpga_version = fpga_version
+        self.latency = latency
+        self.max_chunk_size = max_chunk_size
+
+        self.transfer_count = 0
+        self.bytes_transferred = 0
+        self.requests: list[tuple[int, int, int]] = []
+        """(bRequest, wIndex, wLength) of every transfer"""
+
+    def ctrl_transfer(
+        self,
+        bmRequestType: int,
+        bRequest: int,
+        wValue: int = 0,
+        wIndex: int = 0,
+        data_or_wLength: int | Sequence[int] | None = None,
+        timeout: int | None = None,
+    ) -> array.array:
+        if self.latency:
+            time.sleep(self.latency)
+        self.transfer_count += 1
+
+        if not bmRequestType & usb.util.CTRL_IN or not isinstance(data_or_wLength, int):
+            raise usb.core.USBError("Pipe error", errno=errno.EPIPE)
+        length = data_or_wLength
+        self.requests.append((bRequest, wIndex, length))
+
+        if bRequest == VC_READ_CALIRATION_DATA:
+            if length > self.max_chunk_size:
+                raise usb.core.USBError("Pipe error", errno=errno.EPIPE)
+            data = self.calibration[wIndex : wIndex + length]
+        elif bRequest == VC_GET_VERSION:
+            data = self.fx2_version.to_bytes(4, "little")
+            data += self.fpga_version.to_bytes(4, "little")
+            data = data[:length]
+        else:
+            raise usb.core.USBError("Pipe error", errno=errno.EPIPE)
+
+        self.bytes_transferred += len(data)
+        return array.array("B", data)
+
+
+class FakeUsbTransport(UsbTransport):
+    """Transport finding a fake device instead of searching the USB bus.
+
+    Example:
+        with FakeUsbTransport(FakeNeonUsbDevice(latency=0.002)).installed():
+            calibration = get_calibration()
+
+    """
+
+    def __init__(self, device: FakeNeonUsbDevice | None = None) -> None:
+        self.device = FakeNeonUsbDevice() if device is None else device
+
+    @contextmanager
+    def installed(self) -> Iterator["FakeUsbTransport"]:
+        with use_transport(self):
+            yield self
+
+    def find(self) -> usb.core.Device | None:
+        return self.device
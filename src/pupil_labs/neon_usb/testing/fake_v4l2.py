@@ -0,0 +1,570 @@
+import ctypes
+import errno
+import itertools
+import mmap
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from types import TracebackType
+from typing import Any, NamedTuple
+
+import cv2
+import numpy as np
+from typing_extensions import Self
+
+from pupil_labs.neon_usb.pyrav4l2 import v4l2
+from pupil_labs.neon_usb.pyrav4l2.syscalls import SystemCalls, use_provider
+from pupil_labs.neon_usb.uvc_utils import (
+    UVC_GET_CUR,
+    UVC_GET_LEN,
+    UVC_SET_CUR,
+    UVCIOC_CTRL_QUERY,
+    size_map,
+    uvc_xu_control_query,
+)
+
+V4L2_CID_BRIGHTNESS = 0x00980900
+V4L2_CID_CONTRAST = 0x00980901
+V4L2_CID_GAIN = 0x00980913
+V4L2_CID_POWER_LINE_FREQUENCY = 0x00980918
+
+
+class FakeFormat(NamedTuple):
+    pixelformat: int
+    description: str
+    width: int
+    height: int
+    fps: tuple[int, ...]
+
+    @property
+    def compressed(self) -> bool:
+        return bool(self.pixelformat == v4l2.V4L2_PIX_FMT_MJPEG)
+
+
+class FakeControl(NamedTuple):
+    id: int
+    name: str
+    type: int
+    minimum: int
+    maximum: int
+    default: int
+    menu: tuple[str, ...] = ()
+
+
+DEFAULT_CONTROLS = (
+    FakeControl(
+        V4L2_CID_BRIGHTNESS, "Brightness", v4l2.V4L2_CTRL_TYPE_INTEGER, -64, 64, 0
+    ),
+    FakeControl(V4L2_CID_CONTRAST, "Contrast", v4l2.V4L2_CTRL_TYPE_INTEGER, 0, 64, 32),
+    FakeControl(V4L2_CID_GAIN, "Gain", v4l2.V4L2_CTRL_TYPE_INTEGER, 0, 100, 64),
+    FakeControl(
+        V4L2_CID_POWER_LINE_FREQUENCY,
+        "Power Line Frequency",
+        v4l2.V4L2_CTRL_TYPE_MENU,
+        0,
+        2,
+        1,
+        ("Disabled", "50 Hz", "60 Hz"),
+    ),
+)
+
+
+def _fill(target: Any, name: str, value: str) -> None:
+    setattr(target, name, value.encode())
+
+
+class FakeV4l2Device:
+    """In-process emulation of a UVC camera behind the v4l2 API.
+
+    The device answers the ioctls used by `pyrav4l2`, `V4lStream` and `uvc_utils`:
+    capability and format enumeration, format and frame interval negotiation,
+    buffer management, streaming with sequence numbers and monotonic timestamps,
+    extended controls and UVC extension unit queries. Frames are produced at the
+    negotiated frame rate from a small bank of precomputed payloads. If the
+    consumer falls behind and no buffer is queued, frames are skipped like a real
+    driver would, which shows up as a gap in the sequence numbers. Unplugging and
+    replugging the camera is emulated with `disconnect()` and `connect()`.
+
+    Install it with `FakeV4l2Provider`.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        card: str,
+        formats: Sequence[FakeFormat],
+        controls: Sequence[FakeControl] = DEFAULT_CONTROLS,
+        payloads: Callable[[FakeFormat], Sequence[bytes]] | None = None,
+        bus_info: str = "usb-0000:00:14.0-1",
+    ) -> None:
+        """Create a fake device.
+
+        Args:
+            path: device node path, e.g. "/dev/video0"
+            card: device name reported by VIDIOC_QUERYCAP
+            formats: supported pixel formats, frame sizes and frame rates
+            controls: supported v4l2 controls
+            payloads: returns the frame payloads for a format, defaults to noisy
+                gradients (JPEG encoded for MJPEG formats)
+            bus_info: bus info reported by VIDIOC_QUERYCAP
+
+        """
+        self.path = Path(path)
+        self.card = card
+        self.bus_info = bus_info
+        self.formats = list(formats)
+        self.controls = {c.id: c for c in controls}
+        self.control_values = {c.id: c.default for c in controls}
+        self.xu_values: dict[int, int] = {}
+        self.ioctl_counts: dict[int, int] = {}
+        self.dropped_count = 0
+
+        self._payload_factory = payloads or _default_payloads
+        self._payloads: dict[FakeFormat, Sequence[bytes]] = {}
+        self._format = self.formats[0]
+        self._interval = (1, self._format.fps[0])
+        self._buffers: list[tuple[int, int]] = []
+        self._mappings: dict[int, list[mmap.mmap]] = {}
+        self._queued: deque[int] = deque()
+        self._streaming = False
+        self._sequence = 0
+        self._start_time = 0.0
+        self._owner: object | None = None
+        self.connected = True
+        self.generation = 0
+        """Incremented on every reconnection, files opened before stay unusable"""
+
+        self._handlers: dict[int, Callable[[Any], None]] = {
+            v4l2.VIDIOC_QUERYCAP: self._querycap,
+            v4l2.VIDIOC_ENUM_FMT: self._enum_fmt,
+            v4l2.VIDIOC_ENUM_FRAMESIZES: self._enum_framesizes,
+            v4l2.VIDIOC_ENUM_FRAMEINTERVALS: self._enum_frameintervals,
+            v4l2.VIDIOC_G_FMT: self._g_fmt,
+            v4l2.VIDIOC_S_FMT: self._s_fmt,
+            v4l2.VIDIOC_G_PARM: self._g_parm,
+            v4l2.VIDIOC_S_PARM: self._s_parm,
+            v4l2.VIDIOC_REQBUFS: self._reqbufs,
+            v4l2.VIDIOC_QUERYBUF: self._querybuf,
+            v4l2.VIDIOC_QBUF: self._qbuf,
+            v4l2.VIDIOC_DQBUF: self._dqbuf,
+            v4l2.VIDIOC_STREAMON: self._streamon,
+            v4l2.VIDIOC_STREAMOFF: self._streamoff,
+            v4l2.VIDIOC_QUERY_EXT_CTRL: self._query_ext_ctrl,
+            v4l2.VIDIOC_QUERYMENU: self._querymenu,
+            v4l2.VIDIOC_G_EXT_CTRLS: self._g_ext_ctrls,
+            v4l2.VIDIOC_S_EXT_CTRLS: self._s_ext_ctrls,
+            UVCIOC_CTRL_QUERY: self._xu_query,
+        }
+
+    @classmethod
+    def neon_eye(
+        cls, path: str | Path = "/dev/video0", **kwargs: Any
+    ) -> "FakeV4l2Device":
+        """Create a device looking like the Neon eye cameras."""
+        return cls(
+            path,
+            "Neon Sensor Module v1",
+            [FakeFormat(v4l2.V4L2_PIX_FMT_GREY, "8-bit Greyscale", 384, 192, (200,))],
+            **kwargs,
+        )
+
+    @classmethod
+    def neon_scene(
+        cls, path: str | Path = "/dev/video2", **kwargs: Any
+    ) -> "FakeV4l2Device":
+        """Create a device looking like the Neon scene camera."""
+        return cls(
+            path,
+            "Neon Scene Camera v1",
+            [FakeFormat(v4l2.V4L2_PIX_FMT_MJPEG, "Motion-JPEG", 1600, 1200, (30,))],
+            **kwargs,
+        )
+
+    @property
+    def fps(self) -> float:
+        return self._interval[1] / self._interval[0]
+
+    def disconnect(self) -> None:
+        """Unplug the device: its node disappears and open files fail with ENODEV."""
+        self.connected = False
+        self.generation += 1
+        self._streamoff(None)
+        self._buffers = []
+        self._mappings.clear()
+        self._owner = None
+
+    def connect(self) -> None:
+        """Plug the device back in, with its formats and controls reset."""
+        self.connected = True
+        self._format = self.formats[0]
+        self._interval = (1, self._format.fps[0])
+        self.control_values = {c.id: c.default for c in self.controls.values()}
+        self.xu_values = {}
+
+    def ioctl(self, request: int, arg: Any) -> int:
+        handler = self._handlers.get(request)
+        if handler is None:
+            raise OSError(errno.ENOTTY, "Inappropriate ioctl for device")
+        self.ioctl_counts[request] = self.ioctl_counts.get(request, 0) + 1
+        handler(arg)
+        return 0
+
+    def acquire(self, owner: object) -> None:
+        """Make `owner` the file that allocated the buffers, like VIDIOC_REQBUFS."""
+        self._owner = owner
+
+    def release(self, owner: object) -> None:
+        """Stop streaming and free the buffers when their owner is closed.
+
+        Like the kernel, which does so when the file that allocated them is released.
+        """
+        if self._owner is owner:
+            self._streamoff(None)
+            self._buffers = []
+            self._mappings.clear()
+            self._owner = None
+
+    def map_buffer(self, length: int, offset: int) -> mmap.mmap:
+        for index, (buf_length, buf_offset) in enumerate(self._buffers):
+            if buf_offset == offset and length <= buf_length:
+                mapping = mmap.mmap(-1, buf_length)
+                self._mappings.setdefault(index, []).append(mapping)
+                return mapping
+        raise OSError(errno.EINVAL, "No buffer at this offset")
+
+    def wait_readable(self, timeout: float | None) -> bool:
+        """Block until a frame can be dequeued or the timeout passes."""
+        if not self._streaming or not self._queued:
+            return True
+        delay = self._due(self._sequence) - time.monotonic()
+        if timeout is not None and delay > timeout:
+            time.sleep(max(timeout, 0))
+            return False
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+    def _due(self, sequence: int) -> float:
+        return self._start_time + sequence * self._interval[0] / self._interval[1]
+
+    def _payloads_for(self, fmt: FakeFormat) -> Sequence[bytes]:
+        if fmt not in self._payloads:
+            self._payloads[fmt] = self._payload_factory(fmt)
+        return self._payloads[fmt]
+
+    def _buffer_size(self) -> int:
+        payload = max(len(p) for p in self._payloads_for(self._format))
+        return -(-payload // mmap.PAGESIZE) * mmap.PAGESIZE
+
+    def _querycap(self, caps: Any) -> None:
+        _fill(caps, "driver", "uvcvideo")
+        _fill(caps, "card", self.card)
+        _fill(caps, "bus_info", self.bus_info)
+        caps.version = 0x060800
+        caps.device_caps = v4l2.V4L2_CAP_VIDEO_CAPTURE | v4l2.V4L2_CAP_STREAMING
+        caps.capabilities = caps.device_caps | v4l2.V4L2_CAP_DEVICE_CAPS
+
+    def _enum_fmt(self, desc: Any) -> None:
+        pixelformats = list(dict.fromkeys(f.pixelformat for f in self.formats))
+        if desc.index >= len(pixelformats):
+            raise OSError(errno.EINVAL, "Invalid argument")
+        fmt = next(f for f in self.formats if f.pixelformat == pixelformats[desc.index])
+        _fill(desc, "description", fmt.description)
+        desc.pixelformat = fmt.pixelformat
+        desc.flags = v4l2.V4L2_FMT_FLAG_COMPRESSED if fmt.compressed else 0
+
+    def _enum_framesizes(self, frmsize: Any) -> None:
+        sizes = [f for f in self.formats if f.pixelformat == frmsize.pixel_format]
+        if frmsize.index >= len(sizes):
+            raise OSError(errno.EINVAL, "Invalid argument")
+        frmsize.type = v4l2.V4L2_FRMSIZE_TYPE_DISCRETE
+        frmsize.discrete.width = sizes[frmsize.index].width
+        frmsize.discrete.height = sizes[frmsize.index].height
+
+    def _enum_frameintervals(self, frmival: Any) -> None:
+        fmt = self._find_format(frmival.pixel_format, frmival.width, frmival.height)
+        if frmival.index >= len(fmt.fps):
+            raise OSError(errno.EINVAL, "Invalid argument")
+        frmival.type = v4l2.V4L2_FRMIVAL_TYPE_DISCRETE
+        frmival.discrete.numerator = 1
+        frmival.discrete.denominator = fmt.fps[frmival.index]
+
+    def _find_format(self, pixelformat: int, width: int, height: int) -> FakeFormat:
+        for fmt in self.formats:
+            if (fmt.pixelformat, fmt.width, fmt.height) == (pixelformat, width, height):
+                return fmt
+        raise OSError(errno.EINVAL, "Invalid argument")
+
+    def _g_fmt(self, fmt: Any) -> None:
+        pix = fmt.fmt.pix
+        pix.width = self._format.width
+        pix.height = self._format.height
+        pix.pixelformat = self._format.pixelformat
+        pix.field = v4l2.V4L2_FIELD_NONE
+        pix.bytesperline = 0 if self._format.compressed else self._format.width
+        pix.sizeimage = self._buffer_size()
+
+    def _s_fmt(self, fmt: Any) -> None:
+        if self._buffers:
+            raise OSError(errno.EBUSY, "Device or resource busy")
+        pix = fmt.fmt.pix
+        self._format = self._find_format(pix.pixelformat, pix.width, pix.height)
+        self._interval = (1, self._format.fps[0])
+        self._g_fmt(fmt)
+
+    def _g_parm(self, parm: Any) -> None:
+        parm.parm.capture.timeperframe.numerator = self._interval[0]
+        parm.parm.capture.timeperframe.denominator = self._interval[1]
+
+    def _s_parm(self, parm: Any) -> None:
+        frac = parm.parm.capture.timeperframe
+        fps = frac.denominator / frac.numerator
+        # like uvcvideo, pick the closest supported interval
+        closest = min(self._format.fps, key=lambda f: abs(f - fps))
+        self._interval = (1, closest)
+        self._g_parm(parm)
+
+    def _reqbufs(self, req: Any) -> None:
+        if self._streaming:
+            raise OSError(errno.EBUSY, "Device or resource busy")
+        for mappings in self._mappings.values():
+            for mapping in mappings:
+                if not mapping.closed:
+                    mapping.close()
+        self._mappings.clear()
+        self._queued.clear()
+        size = self._buffer_size()
+        self._buffers = [(size, i * size) for i in range(min(req.count, 32))]
+        req.count = len(self._buffers)
+
+    def _querybuf(self, buf: Any) -> None:
+        if buf.index >= len(self._buffers):
+            raise OSError(errno.EINVAL, "Invalid argument")
+        buf.length, buf.m.offset = self._buffers[buf.index]
+
+    def _qbuf(self, buf: Any) -> None:
+        if buf.index >= len(self._buffers) or buf.index in self._queued:
+            raise OSError(errno.EINVAL, "Invalid argument")
+        self._queued.append(buf.index)
+
+    def _dqbuf(self, buf: Any) -> None:
+        if not self._streaming or not self._queued:
+            raise OSError(errno.EINVAL, "Invalid argument")
+
+        # frames that found no free buffer are lost
+        interval = self._interval[0] / self._interval[1]
+        behind = int((time.monotonic() - self._due(self._sequence)) / interval)
+        skipped = max(0, behind - (len(self._queued) - 1))
+        self._sequence += skipped
+        self.dropped_count += skipped
+
+        due = self._due(self._sequence)
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        index = self._queued.popleft()
+        payloads = self._payloads_for(self._format)
+        payload = payloads[self._sequence % len(payloads)]
+        for mapping in self._mappings.get(index, []):
+            if not mapping.closed:
+                mapping[: len(payload)] = payload
+
+        buf.index = index
+        buf.bytesused = len(payload)
+        buf.length, buf.m.offset = self._buffers[index]
+        buf.sequence = self._sequence
+        buf.timestamp.tv_sec = int(due)
+        buf.timestamp.tv_usec = int((due % 1) * 1e6)
+        self._sequence += 1
+
+    def _streamon(self, _: Any) -> None:
+        if not self._buffers:
+            raise OSError(errno.EINVAL, "Invalid argument")
+        if not self._streaming:
+            self._streaming = True
+            self._sequence = 0
+            self._start_time = time.monotonic()
+
+    def _streamoff(self, _: Any) -> None:
+        self._streaming = False
+        self._queued.clear()
+
+    def _query_ext_ctrl(self, query: Any) -> None:
+        flags = v4l2.V4L2_CTRL_FLAG_NEXT_CTRL | v4l2.V4L2_CTRL_FLAG_NEXT_COMPOUND
+        ctrl_id = query.id & ~flags
+        if query.id & v4l2.V4L2_CTRL_FLAG_NEXT_CTRL:
+            ids = sorted(i for i in self.controls if i > ctrl_id)
+        else:
+            ids = [ctrl_id] if ctrl_id in self.controls else []
+        if not ids:
+            raise OSError(errno.EINVAL, "Invalid argument")
+
+        control = self.controls[ids[0]]
+        query.id = control.id
+        query.type = control.type
+        _fill(query, "name", control.name)
+        query.minimum = control.minimum
+        query.maximum = control.maximum
+        query.step = 1
+        query.default_value = control.default
+        query.flags = 0
+        query.elem_size = 4
+        query.elems = 1
+
+    def _querymenu(self, menu: Any) -> None:
+        control = self.controls.get(menu.id)
+        if control is None or not 0 <= menu.index < len(control.menu):
+            raise OSError(errno.EINVAL, "Invalid argument")
+        _fill(menu, "name", control.menu[menu.index])
+
+    def _ext_controls(self, ectrls: Any) -> Iterator[Any]:
+        for i in range(ectrls.count):
+            ctrl = ectrls.controls[i]
+            if ctrl.id not in self.controls:
+                ectrls.error_idx = i
+                raise OSError(errno.EINVAL, "Invalid argument")
+            yield ctrl
+
+    def _g_ext_ctrls(self, ectrls: Any) -> None:
+        for ctrl in self._ext_controls(ectrls):
+            ctrl.value = self.control_values[ctrl.id]
+
+    def _s_ext_ctrls(self, ectrls: Any) -> None:
+        for ctrl in self._ext_controls(ectrls):
+            control = self.controls[ctrl.id]
+            if not control.minimum <= ctrl.value <= control.maximum:
+                raise OSError(errno.ERANGE, "Numerical result out of range")
+            self.control_values[ctrl.id] = ctrl.value
+
+    def _xu_query(self, query: uvc_xu_control_query) -> None:
+        size = size_map.get(query.selector)
+        if size is None:
+            raise OSError(errno.ENOENT, "No such file or directory")
+
+        if query.query == UVC_SET_CUR:
+            data = ctypes.string_at(query.data, query.size)
+            self.xu_values[query.selector] = int.from_bytes(data, byteorder="little")
+        elif query.query == UVC_GET_CUR:
+            value = self.xu_values.get(query.selector, 0)
+            ctypes.memmove(query.data, value.to_bytes(query.size, "little"), query.size)
+        elif query.query == UVC_GET_LEN:
+            ctypes.memmove(query.data, size.to_bytes(2, "little"), 2)
+        else:
+            raise OSError(errno.EINVAL, "Invalid argument")
+
+
+def _default_payloads(fmt: FakeFormat, count: int = 8) -> list[bytes]:
+    rng = np.random.default_rng(fmt.pixelformat)
+    gradient = np.linspace(60, 180, fmt.width, dtype=np.float32)[None, :]
+    noise = rng.normal(0, 8, (count, fmt.height, fmt.width)).astype(np.float32)
+    images = np.clip(gradient + noise, 0, 255).astype(np.uint8)
+    if fmt.compressed:
+        return [cv2.imencode(".jpg", img)[1].tobytes() for img in images]
+    return [img.tobytes() for img in images]
+
+
+class FakeDeviceFile:
+    """File object returned when opening a fake device node."""
+
+    def __init__(self, device: FakeV4l2Device, fileno: int) -> None:
+        self.device = device
+        self.generation = device.generation
+        self.name = str(device.path)
+        self.closed = False
+        self._fileno = fileno
+
+    def fileno(self) -> int:
+        return self._fileno
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.device.release(self)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        type_: type[BaseException] | None,
+        value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class FakeV4l2Provider(SystemCalls):
+    """Routes v4l2 system calls to fake devices instead of the kernel.
+
+    Example:
+        with FakeV4l2Provider([FakeV4l2Device.neon_eye()]).installed():
+            cam = EyeCameraV4l2()
+
+    """
+
+    def __init__(self, devices: Iterable[FakeV4l2Device]) -> None:
+        self.devices = {str(d.path): d for d in devices}
+        self._filenos = itertools.count(1000)
+
+    @contextmanager
+    def installed(self) -> Iterator["FakeV4l2Provider"]:
+        with use_provider(self):
+            yield self
+
+    def _file(self, fd: Any) -> FakeDeviceFile:
+        if not isinstance(fd, FakeDeviceFile):
+            raise TypeError(f"Not a fake device file: {fd!r}")
+        if fd.closed:
+            raise ValueError("I/O operation on closed file")
+        if not fd.device.connected or fd.generation != fd.device.generation:
+            raise OSError(errno.ENODEV, "No such device")
+        return fd
+
+    def open(
+        self, path: str | Path, mode: str = "r", buffering: int = -1
+    ) -> FakeDeviceFile:
+        device = self.devices.get(str(path))
+        if device is None or not device.connected:
+            raise FileNotFoundError(
+                errno.ENOENT, "No such file or directory", str(path)
+            )
+        return FakeDeviceFile(device, next(self._filenos))
+
+    def ioctl(self, fd: Any, request: int, arg: Any = 0) -> Any:
+        file = self._file(fd)
+        result = file.device.ioctl(request, arg)
+        if request == v4l2.VIDIOC_REQBUFS:
+            file.device.acquire(file)
+        return result
+
+    def mmap(self, fd: Any, length: int, offset: int) -> mmap.mmap:
+        return self._file(fd).device.map_buffer(length, offset)
+
+    def select(
+        self,
+        rlist: Sequence[Any],
+        wlist: Sequence[Any],
+        xlist: Sequence[Any],
+        timeout: float | None = None,
+    ) -> tuple[list[Any], list[Any], list[Any]]:
+        # like the kernel, report a lost device as readable, so that reading fails
+        ready = [
+            f
+            for f in rlist
+            if f.generation != f.device.generation
+            or self._file(f).device.wait_readable(timeout)
+        ]
+        return ready, list(wlist), []
+
+    def is_char_device(self, path: str | Path) -> bool:
+        device = self.devices.get(str(path))
+        return device is not None and device.connected
+
+    def list_devices(self) -> list[Path]:
+        return sorted(d.path for d in self.devices.values() if d.connected)
+
+    def video_device_names(self) -> dict[str, str]:
+        return {d.path.name: d.card for d in self.devices.values() if d.connected}
@@ -0,0 +1,165 @@
+"""Timelines of the capture path in the Chrome Trace Event format.
+
+Aggregated latencies (see `latency`) hide when things happen: a garbage collection
+or a control transfer that lines up with frame arrivals, or the eye, scene and IMU
+threads blocking each other. While tracing, every stage recorded at the hook points
+of `latency` is also stored as an event with its thread, start and end, together
+with the garbage collections, in a ring of preallocated slots. Once the ring is
+full the oldest events are overwritten, so tracing can stay on indefinitely and
+the dump shows the last moments before e.g. a stall.
+
+    from pupil_labs.neon_usb import tracing
+
+    with tracing.tracing() as trace:
+        ...
+    trace.dump("capture.json")
+
+Open the dump in https://ui.perfetto.dev or chrome://tracing.
+"""
+
+import gc
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from pupil_labs.neon_usb import latency
+
+
+class TraceEvent(NamedTuple):
+    name: str
+    thread: int
+    """Identifier of the thread, see `threading.get_ident()`"""
+    start: int
+    """`time.perf_counter_ns()` at the begin of the event"""
+    end: int
+
+
+class TraceRing:
+    """Fixed number of event slots, written round robin by all threads."""
+
+    def __init__(self, capacity: int = 1 << 16) -> None:
+        self.capacity = capacity
+        self._events: list[TraceEvent | None] = [None] * capacity
+        self._written = 0
+        self._lock = threading.Lock()
+        self._thread_names: dict[int, str] = {}
+        self._gc_start = 0
+
+    def add(self, name: str, start: int, end: int) -> None:
+        thread = threading.get_ident()
+        if thread not in self._thread_names:
+            self._thread_names[thread] = threading.current_thread().name
+        # created before taking the lock, allocating could run the gc callback,
+        # which adds an event itself
+        event = TraceEvent(name, thread, start, end)
+        with self._lock:
+            self._events[self._written % self.capacity] = event
+            self._written += 1
+
+    @property
+    def dropped(self) -> int:
+        """Events overwritten because the ring was full."""
+        return max(self._written - self.capacity, 0)
+
+    def events(self) -> list[TraceEvent]:
+        """Return the events in the ring, oldest first."""
+        with self._lock:
+            written = self._written
+        first = max(written - self.capacity, 0)
+        # slots hold whole events, one overwritten meanwhile is newer but not torn
+        slots = (self._events[i % self.capacity] for i in range(first, written))
+        return [event for event in slots if event is not None]
+
+    def _on_gc(self, phase: str, info: dict[str, Any]) -> None:
+        if phase == "start":
+            self._gc_start = time.perf_counter_ns()
+        elif self._gc_start:
+            self.add(
+                f"gc.gen{info['generation']}", self._gc_start, time.perf_counter_ns()
+            )
+            self._gc_start = 0
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """Convert the events to Chrome Trace Event data, times in microseconds."""
+        pid = os.getpid()
+        events = self.events()
+        origin = min((e.start for e in events), default=0)
+        trace_events: list[dict[str, Any]] = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": thread,
+                "args": {"name": name},
+            }
+            for thread, name in list(self._thread_names.items())
+        ]
+        trace_events.extend(
+            {
+                "name": e.name,
+                "cat": e.name.split(".", 1)[0],
+                "ph": "X",
+                "pid": pid,
+                "tid": e.thread,
+                "ts": (e.start - origin) / 1e3,
+                "dur": (e.end - e.start) / 1e3,
+            }
+            for e in events
+        )
+        return {
+            "traceEvents": trace_events,
+            "displayTimeUnit": "ms",
+            "otherData": {"dropped_events": self.dropped},
+        }
+
+    def dump(self, path: str | Path) -> None:
+        """Write the events to a JSON file for Perfetto or chrome://tracing."""
+        Path(path).write_text(json.dumps(self.to_chrome_trace()))
+
+
+_ring: TraceRing | None = None
+_enabled_latency = False
+
+
+def start(capacity: int = 1 << 16) -> TraceRing:
+    """Start recording events into a new ring, enabling the `latency` hook points.
+
+    Tracing already in progress is stopped first.
+    """
+    global _ring, _enabled_latency
+    stop()
+    _ring = TraceRing(capacity)
+    latency.set_tracer(_ring.add)
+    gc.callbacks.append(_ring._on_gc)
+    _enabled_latency = not latency.enabled
+    latency.enable()
+    return _ring
+
+
+def stop() -> TraceRing | None:
+    """Stop recording events, return the ring holding them."""
+    global _ring, _enabled_latency
+    ring, _ring = _ring, None
+    if ring is None:
+        return None
+    latency.set_tracer(None)
+    gc.callbacks.remove(ring._on_gc)
+    if _enabled_latency:
+        latency.disable()
+        _enabled_latency = False
+    return ring
+
+
+@contextmanager
+def tracing(capacity: int = 1 << 16) -> Iterator[TraceRing]:
+    """Record events within the block into the returned ring."""
+    ring = start(capacity)
+    try:
+        yield ring
+    finally:
+        stop()
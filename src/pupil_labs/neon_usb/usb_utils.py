@@ -1,81 +1,333 @@
-import usb.core
-import usb.util
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from pupil_labs.neon_usb.cache import list_cache, read_cache, write_cache
+
+if TYPE_CHECKING:
+    # both are imported where needed, pupil_labs.neon_recording pulls in pandas and
+    # PyAV, which would make even reading the versions slow to start
+    import usb.core
+    from pupil_labs.neon_recording.calib import Calibration
 
-from pupil_labs.neon_recording.calib import Calibration
 
 VC_GET_VERSION = 0xC0
 VC_READ_CALIRATION_DATA = 0xD4
 CALIBRATION_DATA_LENGTH = 1024
 CALIBRATION_DATA_CHUNK_SIZE = 64
+CALIBRATION_CHUNK_SIZES = (1024, 512, 256, 128, CALIBRATION_DATA_CHUNK_SIZE)
+"""Chunk sizes tried when detecting the largest control transfer the firmware serves"""
 USB_ID_VENDOR = 0x16D0
 USB_ID_PRODUCT = 0x11D3
 
 
-def _read_calibration_data_chunk(dev: usb.core.Device, offset: int) -> bytes:
+class CalibrationFetchStats(NamedTuple):
+    duration: float
+    """Total time spent fetching the calibration in seconds"""
+    source: str
+    """Where the calibration came from: "memory" (read before by this process),
+    "disk" (the cache) or "device"."""
+    chunk_size: int
+    """Calibration bytes read per control transfer"""
+    bytes_read: int
+    """Calibration bytes read from the device"""
+
+
+def _read_calibration_data_chunk(
+    dev: usb.core.Device, offset: int, length: int = CALIBRATION_DATA_CHUNK_SIZE
+) -> bytes:
     """Read calibration data chunk from device
 
     Args:
         dev: the pyusb device to read from
         offset: the offset in bytes to read from
+        length: the number of bytes to read
 
     Returns:
         the data chunk as byte array
 
     """
+    import usb.util
+
     data = dev.ctrl_transfer(
         usb.util.CTRL_IN | usb.util.CTRL_TYPE_VENDOR,
         VC_READ_CALIRATION_DATA,
         wIndex=offset,
-        data_or_wLength=CALIBRATION_DATA_CHUNK_SIZE,
+        data_or_wLength=length,
     )
-    if len(data) != CALIBRATION_DATA_CHUNK_SIZE:
-        raise OSError("Reading 64 bytes from VC_READ_CALIRATION_DATA failed")
+    if len(data) != length:
+        raise OSError(f"Reading {length} bytes from VC_READ_CALIRATION_DATA failed")
 
     return bytes(data)
 
 
-def _read_calibration_data(dev: usb.core.Device) -> bytes:
-    """Read full calibration data block from device
+def _read_calibration_data(
+    dev: usb.core.Device,
+    length: int = CALIBRATION_DATA_LENGTH,
+    chunk_size: int = CALIBRATION_DATA_CHUNK_SIZE,
+    head: bytes = b"",
+) -> bytes:
+    """Read calibration data block from device
 
     Arguments:
         dev: the pyusb device to read from
+        length: number of bytes needed, reading continues to the end of the chunk
+        chunk_size: number of bytes to read per control transfer
+        head: data already read from the start of the block
 
     Returns:
         byte array containing the calibration data
 
     """
     data = b"".join([
-        _read_calibration_data_chunk(dev, offset)
-        for offset in range(0, CALIBRATION_DATA_LENGTH, CALIBRATION_DATA_CHUNK_SIZE)
+        head,
+        *(
+            _read_calibration_data_chunk(dev, offset, chunk_size)
+            for offset in range(len(head), length, chunk_size)
+        ),
     ])
 
     return data
 
 
-def _find_neon() -> usb.core.Device:
-    return usb.core.find(idVendor=USB_ID_VENDOR, idProduct=USB_ID_PRODUCT)
+def _chunk_size_cache_name(versions: dict[str, int]) -> str:
+    return f"calibration/chunk-size-{versions['fx2']:08x}-{versions['fpga']:08x}"
+
+
+def _read_first_calibration_chunk(
+    dev: usb.core.Device, versions: dict[str, int]
+) -> bytes:
+    """Read the first calibration chunk using the largest chunk size that works
+
+    The firmware may not accept control transfers of more than 64 bytes, so larger
+    sizes are tried first. The detected size is remembered per firmware version, in
+    memory and in the disk cache, so detection only happens once.
+    """
+    key = (versions["fx2"], versions["fpga"])
+    if key not in _chunk_sizes:
+        cached = read_cache(_chunk_size_cache_name(versions))
+        if cached is not None and cached.strip().isdigit():
+            _chunk_sizes[key] = int(cached)
+
+    if key in _chunk_sizes:
+        with contextlib.suppress(OSError):
+            return _read_calibration_data_chunk(dev, 0, _chunk_sizes[key])
+
+    for size in CALIBRATION_CHUNK_SIZES:
+        try:
+            head = _read_calibration_data_chunk(dev, 0, size)
+        except OSError:
+            if size == CALIBRATION_CHUNK_SIZES[-1]:
+                raise
+        else:
+            _chunk_sizes[key] = size
+            write_cache(_chunk_size_cache_name(versions), str(size).encode())
+            return head
+    raise ValueError("CALIBRATION_CHUNK_SIZES is empty")
+
+
+class UsbTransport:
+    """Locates the Neon module on the USB bus using pyusb"""
+
+    def find(self) -> usb.core.Device | None:
+        import usb.core
+
+        return usb.core.find(idVendor=USB_ID_VENDOR, idProduct=USB_ID_PRODUCT)
+
 
+_transport: UsbTransport = UsbTransport()
 
-def get_calibration(dev: usb.core.Device | None = None) -> Calibration:
+
+def get_transport() -> UsbTransport:
+    return _transport
+
+
+def set_transport(transport: UsbTransport) -> UsbTransport:
+    """Install a transport and return the previously active one"""
+    global _transport
+    previous, _transport = _transport, transport
+    return previous
+
+
+@contextlib.contextmanager
+def use_transport(transport: UsbTransport) -> Iterator[UsbTransport]:
+    """Temporarily install a transport"""
+    previous = set_transport(transport)
+    try:
+        yield transport
+    finally:
+        set_transport(previous)
+
+
+def _find_neon() -> usb.core.Device:
+    dev = _transport.find()
     if dev is None:
-        dev = _find_neon()
+        raise OSError("No Neon module found on the USB bus")
+    return dev
+
+
+_calibration_lock = threading.Lock()
+_calibration: Calibration | None = None
+_calibration_key: str | None = None
+"""Serial and firmware versions of the module `_calibration` was read from"""
+_fetch_stats: CalibrationFetchStats | None = None
+_chunk_sizes: dict[tuple[int, int], int] = {}
+
+
+def _calibration_cache_name(header: bytes, versions: dict[str, int]) -> str:
+    from pupil_labs.neon_recording.calib import Calibration
+
+    # the serial follows the one byte version field
+    offset = Calibration.dtype["version"].itemsize
+    raw_serial = header[offset : offset + Calibration.dtype["serial"].itemsize]
+    serial = raw_serial.decode("ascii", errors="ignore").rstrip("\0")
+    if not serial.isalnum():
+        serial = raw_serial.hex()
+    return f"calibration/{serial}-{versions['fx2']:08x}-{versions['fpga']:08x}.bin"
+
+
+def _parse_cached_calibration(data: bytes | None) -> Calibration | None:
+    from pupil_labs.neon_recording.calib import Calibration
+
+    if data is None or len(data) != Calibration.dtype.itemsize:
+        return None
+    return Calibration.from_buffer(data)
+
 
-    data = _read_calibration_data(dev)
-    return Calibration.from_buffer(data[: Calibration.dtype.itemsize])
+def get_calibration(
+    dev: usb.core.Device | None = None, use_cache: bool = True
+) -> Calibration:
+    """Read the calibration of the connected Neon module
+
+    Once read, the calibration is kept in memory and returned without touching the
+    USB bus again, until `forget_calibration()` is called, which happens when a
+    camera reconnects, since another module may have been plugged in. A device given
+    explicitly is always checked against the serial number of the copy in memory.
+
+    The calibration is also cached on disk (see `cache.get_cache_dir()`), keyed by
+    the serial number and the FX2 and FPGA firmware versions, so later processes only
+    need to read the version and the first calibration chunk to validate the cached
+    copy, instead of the full calibration.
+
+    When reading from the device, only the bytes used by `Calibration` are read,
+    in chunks of the largest size the firmware accepts. `get_calibration_fetch_stats()`
+    tells how long fetching took.
+
+    Args:
+        dev: the pyusb device to read from, defaults to the connected module
+        use_cache: False to ignore cached copies and read from the device, the
+            caches are updated with the result
+
+    Returns:
+        the parsed calibration
+
+    """
+    from pupil_labs.neon_recording.calib import Calibration
+
+    global _calibration, _calibration_key, _fetch_stats
+    with _calibration_lock:
+        if use_cache and dev is None and _calibration is not None:
+            return _calibration
+
+        start = time.perf_counter()
+        if dev is None:
+            dev = _find_neon()
+
+        versions = get_versions(dev)
+        head = _read_first_calibration_chunk(dev, versions)
+        cache_name = _calibration_cache_name(head, versions)
+        length = Calibration.dtype.itemsize
+
+        calibration = None
+        source = "memory"
+        if use_cache and cache_name == _calibration_key:
+            calibration = _calibration
+        elif use_cache and len(head) < length:
+            source = "disk"
+            cached = read_cache(cache_name)
+            if cached is not None and cached.startswith(head):
+                calibration = _parse_cached_calibration(cached)
+
+        data = head
+        if calibration is None:
+            source = "device"
+            data = _read_calibration_data(dev, length, len(head), head)
+            calibration = Calibration.from_buffer(data[:length])
+            write_cache(cache_name, data[:length])
+
+        _calibration = calibration
+        _calibration_key = cache_name
+        _fetch_stats = CalibrationFetchStats(
+            time.perf_counter() - start, source, len(head), len(data)
+        )
+        return calibration
+
+
+def forget_calibration() -> None:
+    """Drop the calibration kept in memory, the next read checks the module again."""
+    global _calibration, _calibration_key
+    with _calibration_lock:
+        _calibration = _calibration_key = None
+
+
+def get_calibration_fetch_stats() -> CalibrationFetchStats | None:
+    """Return timing of the last calibration fetch from disk or device
+
+    Calls of `get_calibration()` answered from memory without reading the first
+    calibration chunk are not counted.
+    """
+    return _fetch_stats
+
+
+def load_cached_calibration(serial: str | None = None) -> Calibration | None:
+    """Load a calibration from the disk cache without accessing the device
+
+    Meant for worker processes, which can rely on the main process having called
+    `get_calibration()`. The cached copy is not validated against the device.
+
+    Args:
+        serial: serial number of the module, defaults to the most recently cached one
+
+    Returns:
+        the calibration, or None if none is cached
+
+    """
+    for path in list_cache(f"calibration/{serial or '*'}-*.bin"):
+        data = read_cache(f"calibration/{path.name}")
+        calibration = _parse_cached_calibration(data)
+        if calibration is not None:
+            return calibration
+    return None
 
 
 def get_versions(dev: usb.core.Device | None = None) -> dict[str, int]:
+    import usb.util
+
     if dev is None:
         dev = _find_neon()
 
-    data = dev.ctrl_transfer(usb.util.CTRL_IN | usb.util.CTRL_TYPE_VENDOR,
-                             VC_GET_VERSION, 0, 0, 8)
+    data = dev.ctrl_transfer(
+        usb.util.CTRL_IN | usb.util.CTRL_TYPE_VENDOR, VC_GET_VERSION, 0, 0, 8
+    )
     if len(data) != 8:
         raise IOError("Reading 8 bytes to VC_GET_VERSION failed")
 
     versions = {
-        'fx2': int.from_bytes(data[:4], byteorder='little'),
-        'fpga': int.from_bytes(data[4:], byteorder='little'),
+        "fx2": int.from_bytes(data[:4], byteorder="little"),
+        "fpga": int.from_bytes(data[4:], byteorder="little"),
     }
 
     return versions
+
+
+def __getattr__(name: str) -> Any:
+    # Calibration used to be imported eagerly, keep it importable from here
+    if name == "Calibration":
+        from pupil_labs.neon_recording.calib import Calibration
+
+        return Calibration
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
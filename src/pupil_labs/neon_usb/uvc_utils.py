@@ -1,9 +1,10 @@
 import ctypes
-from fcntl import ioctl
-from io import TextIOWrapper
+import time
 from typing import Any, ClassVar
 
+from pupil_labs.neon_usb import latency
 from pupil_labs.neon_usb.pyrav4l2 import v4l2
+from pupil_labs.neon_usb.pyrav4l2.syscalls import DeviceFile, ioctl
 
 UVC_RC_UNDEFINED = 0x00
 UVC_SET_CUR = 0x01
@@ -40,8 +41,10 @@ class uvc_xu_control_query(ctypes.Structure):
 
         # For set operations, data is an int; for get operations, it's already a pointer
         if isinstance(data, int):
-            d = ctypes.c_ubyte(data)
-            self.data = ctypes.pointer(d)
+            buffer = (ctypes.c_uint8 * size).from_buffer_copy(
+                data.to_bytes(size, byteorder="little")
+            )
+            self.data = ctypes.cast(buffer, ctypes.POINTER(ctypes.c_uint8))
         else:
             self.data = data
 
@@ -57,18 +60,22 @@ size_map = {
 
 
 def xu_query(
-    fd: TextIOWrapper, selector: int, control: int, data: int, data_len: int
+    fd: DeviceFile, selector: int, control: int, data: int, data_len: int
 ) -> Any:
     query = uvc_xu_control_query(3, selector, control, data_len, data)
 
-    return ioctl(fd, UVCIOC_CTRL_QUERY, query)
+    start = time.perf_counter_ns() if latency.enabled else 0
+    result = ioctl(fd, UVCIOC_CTRL_QUERY, query)
+    if start:
+        latency.record("v4l2.xu_control", start)
+    return result
 
 
-def xu_set(fd: TextIOWrapper, selector: int, control: int, value: int) -> Any:
+def xu_set(fd: DeviceFile, selector: int, control: int, value: int) -> Any:
     return xu_query(fd, selector, control, value, size_map[selector])
 
 
-def set_eye_exposure(fd: TextIOWrapper, eye_idx: int, value: int) -> Any:
+def set_eye_exposure(fd: DeviceFile, eye_idx: int, value: int) -> Any:
     try:
         return xu_set(fd, XU_CTL_EXPOSURE1 + eye_idx, UVC_SET_CUR, value)
     except Exception:
@@ -76,7 +83,7 @@ def set_eye_exposure(fd: TextIOWrapper, eye_idx: int, value: int) -> Any:
     return None
 
 
-def get_eye_exposure(fd: TextIOWrapper, eye_idx: int) -> int | None:
+def get_eye_exposure(fd: DeviceFile, eye_idx: int) -> int | None:
     try:
         selector = XU_CTL_EXPOSURE1 + eye_idx
         data_len = size_map[selector]
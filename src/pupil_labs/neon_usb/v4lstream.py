@@ -1,13 +1,18 @@
+import contextlib
 import ctypes
-from fcntl import ioctl
-from select import select
-from typing import Any
+import time
 
+from pupil_labs.neon_usb import latency
 from pupil_labs.neon_usb.pyrav4l2 import v4l2
 from pupil_labs.neon_usb.pyrav4l2.stream import Stream
+from pupil_labs.neon_usb.pyrav4l2.syscalls import ioctl, select
 
 
 class V4lStream(Stream):
+    sequence: int | None = None
+    """Sequence number the driver gave the last dequeued frame, it skips the frames
+    the driver dropped"""
+
     def open(self) -> None:
         if self.f_cam.closed:
             self._open()
@@ -20,19 +25,58 @@ class V4lStream(Stream):
         select((self.f_cam,), (), ())
 
     def close(self) -> None:
+        """Stop streaming and release the buffers.
+
+        Safe to call repeatedly and after the device was disconnected, in which case
+        stopping the stream fails and is skipped.
+        """
+        if self.f_cam.closed:
+            return
+        with contextlib.suppress(OSError):
+            ioctl(
+                self.f_cam,
+                v4l2.VIDIOC_STREAMOFF,
+                ctypes.c_int(v4l2.V4L2_BUF_TYPE_VIDEO_CAPTURE),
+            )
+        for _, mapping in self.buffers:
+            mapping.close()
         self.f_cam.close()
 
-    def get_frame(self) -> Any | None:
+    def get_frame(self, timeout: float | None = None) -> tuple[bytes, float]:
+        """Dequeue the next frame.
+
+        Args:
+            timeout: max seconds to wait for the frame, None to wait indefinitely
+
+        Raises:
+            TimeoutError: no frame arrived within the timeout, the stream stays open
+            OSError: dequeuing failed, e.g. because the device was disconnected. The
+                stream is closed and has to be opened again.
+
+        """
+        start = time.perf_counter_ns() if latency.enabled else 0
+        readable, _, _ = select((self.f_cam,), (), (), timeout)
+        if not readable:
+            raise TimeoutError(f"No frame within {timeout} s")
+        if start:
+            start = latency.record("v4l2.select", start)
         try:
             buf = self.buffers[0][0]
             ioctl(self.f_cam, v4l2.VIDIOC_DQBUF, buf)
             assert buf.index is not None
+            if start:
+                start = latency.record("v4l2.dequeue", start)
 
             frame = self.buffers[buf.index][1][: buf.bytesused]
+            self.sequence = buf.sequence
             time_ns = buf.timestamp.tv_sec * 1e9 + buf.timestamp.tv_usec * 1000
+            if start:
+                start = latency.record("v4l2.copy", start)
             ioctl(self.f_cam, v4l2.VIDIOC_QBUF, buf)
+            if start:
+                latency.record("v4l2.requeue", start)
         except Exception:
-            self._stop()
-            return None
+            self.close()
+            raise
 
         return frame, time_ns
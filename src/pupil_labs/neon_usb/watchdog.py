@@ -0,0 +1,223 @@
+"""Liveness deadlines for streams that are expected to deliver at a steady rate.
+
+A stalled camera, e.g. a hung DQBUF or a libuvc transfer that stopped, would
+otherwise only be noticed when some read happens to time out. The `Watchdog`
+derives a deadline of a few frame periods from the rate of each stream and fires
+recovery actions as soon as a stream misses it, from a thread of its own, so that
+a stall is detected even while the reading thread is blocked.
+
+    watchdog = Watchdog()
+    watchdog.watch("eye", fps=200, actions=[lambda event: print(event)])
+    with watchdog.running():
+        while True:
+            frame = camera.get_frame()
+            watchdog.feed("eye")
+"""
+
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import NamedTuple
+
+
+class StallEvent(NamedTuple):
+    stream: str
+    stalled_for: float
+    """Seconds since the last item of the stream"""
+    stalls: int
+    """Stalls of the stream so far, including this one"""
+
+
+class StallStats(NamedTuple):
+    stalls: int
+    """Number of times the stream missed its deadline"""
+    duration: float
+    """Total seconds from missing the deadline to the next item, of all stalls"""
+    stalled: bool
+    """Whether the stream is stalled right now"""
+
+
+class StreamStalledError(TimeoutError):
+    def __init__(self, stream: str, stalled_for: float) -> None:
+        self.stream = stream
+        super().__init__(f"The {stream} stream stalled for {stalled_for:.3f} s")
+
+
+StallAction = Callable[[StallEvent], object]
+
+
+class _Watch:
+    def __init__(
+        self, deadline: float, grace: float, actions: Iterable[StallAction]
+    ) -> None:
+        self.deadline = deadline
+        self.grace = grace
+        self.actions = list(actions)
+        self.last = time.monotonic()
+        self.fed = False
+        self.stalled_at: float | None = None
+        self.count = 0
+        self.duration = 0.0
+
+
+class Watchdog:
+    def __init__(
+        self, periods: float = 4.0, min_deadline: float = 0.1, grace: float = 2.0
+    ) -> None:
+        """Configure the deadlines, no stream is watched yet.
+
+        Args:
+            periods: frame periods a stream may go without an item
+            min_deadline: lower bound of the deadline in seconds, against false
+                alarms from scheduling delays at high frame rates
+            grace: deadline in seconds for the first item after `watch()` or
+                `rearm()`, which takes longer while a stream starts
+
+        """
+        self.periods = periods
+        self.min_deadline = min_deadline
+        self.grace = grace
+        self._watches: dict[str, _Watch] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def deadline_for(self, fps: float) -> float:
+        """Seconds a stream with the given rate may go without an item."""
+        return max(self.periods / fps, self.min_deadline)
+
+    def watch(
+        self, stream: str, fps: float, actions: Iterable[StallAction] = ()
+    ) -> float:
+        """Start watching a stream, replacing a previous watch of the same name.
+
+        Args:
+            stream: name of the stream
+            fps: expected rate of the stream, e.g. `CameraSpec.fps`
+            actions: called with a `StallEvent` when the stream misses its deadline,
+                once per stall, from the watchdog thread or the thread calling
+                `report()`
+
+        Returns:
+            the deadline in seconds
+
+        """
+        deadline = self.deadline_for(fps)
+        with self._lock:
+            self._watches[stream] = _Watch(deadline, max(deadline, self.grace), actions)
+        return deadline
+
+    def unwatch(self, stream: str) -> None:
+        with self._lock:
+            self._watches.pop(stream, None)
+
+    def add_action(self, stream: str, action: StallAction) -> None:
+        with self._lock:
+            self._watches[stream].actions.append(action)
+
+    def feed(self, stream: str) -> None:
+        """Record that the stream delivered an item, ending a stall."""
+        now = time.monotonic()
+        with self._lock:
+            watch = self._watches.get(stream)
+            if watch is None:
+                return
+            watch.last = now
+            watch.fed = True
+            if watch.stalled_at is not None:
+                watch.duration += now - watch.stalled_at
+                watch.stalled_at = None
+
+    def rearm(self, stream: str) -> None:
+        """Give the stream the grace period again, e.g. when restarting it.
+
+        A stall in progress lasts until the next `feed()`.
+        """
+        with self._lock:
+            watch = self._watches.get(stream)
+            if watch is not None:
+                watch.last = time.monotonic()
+                watch.fed = False
+
+    def report(self, stream: str) -> bool:
+        """Declare the stream stalled, e.g. because a read with its deadline timed out.
+
+        Returns:
+            whether this started a new stall, False if it was already known
+
+        """
+        return bool(self._check([stream], force=True))
+
+    def check(self) -> list[StallEvent]:
+        """Fire the actions of all streams that just missed their deadline."""
+        return self._check(list(self._watches), force=False)
+
+    def _check(self, streams: list[str], force: bool) -> list[StallEvent]:
+        now = time.monotonic()
+        fired = []
+        with self._lock:
+            for stream in streams:
+                watch = self._watches.get(stream)
+                if watch is None or watch.stalled_at is not None:
+                    continue
+                deadline = watch.deadline if watch.fed else watch.grace
+                if force or now - watch.last > deadline:
+                    watch.stalled_at = now
+                    watch.count += 1
+                    event = StallEvent(stream, now - watch.last, watch.count)
+                    fired.append((event, list(watch.actions)))
+        # outside the lock, actions may feed or rearm
+        for event, actions in fired:
+            for action in actions:
+                action(event)
+        return [event for event, _ in fired]
+
+    def get_stats(self) -> dict[str, StallStats]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                stream: StallStats(
+                    watch.count,
+                    watch.duration
+                    + (0.0 if watch.stalled_at is None else now - watch.stalled_at),
+                    watch.stalled_at is not None,
+                )
+                for stream, watch in self._watches.items()
+            }
+
+    def start(self) -> None:
+        """Check the deadlines in a background thread until `stop()`."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="neon-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @contextmanager
+    def running(self) -> Iterator["Watchdog"]:
+        self.start()
+        try:
+            yield self
+        finally:
+            self.stop()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                deadlines = [w.deadline for w in self._watches.values()]
+            # a stall is noticed within a quarter of the shortest deadline
+            if self._stop.wait(min(deadlines, default=self.min_deadline) / 4):
+                return
+            try:
+                self.check()
+            except Exception as e:  # noqa: BLE001
+                print(f"A stall action failed: {e!r}")
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from pupil_labs.neon_usb.clock import ClockOffsetEstimator
+
+OFFSET = 12.345
+DRIFT = 20e-6
+FPS = 200
+LATENCY = 100e-6
+"""Mean of the exponentially distributed dequeue latency"""
+
+
+def simulate(
+    seed: int, n: int = 3000, outlier_rate: float = 0.01
+) -> tuple[ClockOffsetEstimator, np.ndarray, np.ndarray, int]:
+    """Feed samples with latency jitter and sparse 50 ms hiccups of the host."""
+    rng = np.random.default_rng(seed)
+    device = np.arange(n) / FPS
+    host = device * (1 + DRIFT) + OFFSET + rng.exponential(LATENCY, n)
+    outliers = rng.random(n) < outlier_rate
+    # among the first samples too, before the residual spread is known
+    outliers[[1, 3, 7]] = True
+    host[outliers] += 0.05
+
+    estimator = ClockOffsetEstimator()
+    for d, h in zip(device, host, strict=True):
+        estimator.update(float(d), round(h * 1e9))
+    return estimator, device, host, int(outliers.sum())
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_recovers_offset_and_drift(seed: int) -> None:
+    estimator, device, _, _ = simulate(seed)
+    # the drift error is ~0.4 ppm (1 sigma) for this jitter, rate and duration
+    assert estimator.drift == pytest.approx(DRIFT, abs=1.5e-6)
+    # the offset includes the latency, the down-weighted tail pulls it lower
+    assert 0 <= estimator.offset - OFFSET <= LATENCY
+
+    expected = device[-100:] * (1 + DRIFT) + OFFSET + LATENCY
+    converted = estimator.to_host_time(device[-100:])
+    assert np.abs(converted - expected).max() < LATENCY
+    assert estimator.to_host_time(float(device[-1])) == pytest.approx(
+        converted[-1], abs=1e-9
+    )
+
+
+def test_counts_outliers() -> None:
+    estimator, _, _, injected = simulate(0)
+    assert estimator.sample_count == 3000
+    # every hiccup, and some samples from the tail of the latency distribution
+    assert injected <= estimator.outlier_count <= 0.1 * estimator.sample_count
+    assert estimator.residual_spread < LATENCY
+
+
+def test_only_offset_observable_over_short_span() -> None:
+    rng = np.random.default_rng(0)
+    # 0.1 s of device time, too short to tell drift from jitter
+    device = 500.0 + np.arange(100) / 1000
+    host = device * (1 + DRIFT) + OFFSET + rng.normal(0, 1e-5, len(device))
+    estimator = ClockOffsetEstimator()
+    for d, h in zip(device, host, strict=True):
+        estimator.update(float(d), round(h * 1e9))
+    assert estimator.drift == 0
+    # the drift over the device timestamps looks like offset
+    assert estimator.offset == pytest.approx(OFFSET + 500.0 * DRIFT, abs=5e-5)
+
+
+def test_offset_only_during_warmup() -> None:
+    estimator = ClockOffsetEstimator()
+    with pytest.raises(ValueError):
+        estimator.to_host_time(0.0)
+    # identical device timestamps, and a 50 ms outlier among the first three
+    for host in (1.0, 1.05, 1.0002):
+        estimator.update(3.0, round(host * 1e9))
+    assert estimator.drift == 0
+    assert estimator.offset == pytest.approx(1.0002 - 3.0)
+    assert estimator.to_host_time(np.array([3.0, 4.0])) == pytest.approx([
+        1.0002,
+        2.0002,
+    ])
@@ -0,0 +1,146 @@
+import time
+from collections.abc import Iterator
+
+import numpy as np
+import pytest
+
+from pupil_labs.neon_usb.cameras.eye import EyeCameraSynthetic, EyeCameraV4l2
+from pupil_labs.neon_usb.cameras.scene import NEON_SCENE_CAMERA_SPEC, SceneCamera
+from pupil_labs.neon_usb.cameras.synthetic import SyntheticBackend
+from pupil_labs.neon_usb.device import Device, StreamBatches
+from pupil_labs.neon_usb.frame import Frame
+from pupil_labs.neon_usb.testing.fake_v4l2 import FakeV4l2Device, FakeV4l2Provider
+
+
+class TrackedEyeCamera(EyeCameraSynthetic):
+    """Synthetic eye camera remembering whether it was closed."""
+
+    def __init__(self, opened: list["TrackedEyeCamera"]) -> None:
+        super().__init__(fps=200)
+        self.closed = False
+        opened.append(self)
+
+    def close(self) -> None:
+        self.closed = True
+        super().close()
+
+
+def small_scene() -> SceneCamera:
+    spec = NEON_SCENE_CAMERA_SPEC._replace(width=64, height=48)
+    return SceneCamera(spec, SyntheticBackend.factory(fps=30, channels=3))
+
+
+def collect(device: Device, duration: float) -> StreamBatches:
+    """Collect batches for `duration` seconds, and whatever is left after that."""
+    collected = StreamBatches([], [], [])
+    end = time.monotonic() + duration
+    with device:
+        while time.monotonic() < end:
+            for items, new in zip(collected, device.get_batches(0.05), strict=True):
+                items.extend(new)
+    for items, new in zip(collected, device.get_batches(0), strict=True):
+        items.extend(new)
+    return collected
+
+
+def assert_in_order(frames: list[Frame], fps: float) -> None:
+    indices = [f.index for f in frames]
+    assert indices == list(range(indices[0], indices[0] + len(indices)))
+    assert np.allclose(np.diff([f.timestamp for f in frames]), 1 / fps)
+
+
+def assert_stopped(device: Device) -> None:
+    assert not device.running
+    for name, stream in device._streams.items():
+        assert stream.thread is not None
+        assert not stream.thread.is_alive()
+        assert device.get_source(name) is None
+
+
+def test_batches_arrive_in_order() -> None:
+    device = Device(
+        eye=lambda: EyeCameraSynthetic(fps=200), scene=small_scene, imu=None
+    )
+    assert device.streams == ["eye", "scene"]
+    batches = collect(device, 0.5)
+    assert_stopped(device)
+
+    assert len(batches.eye) >= 50
+    assert len(batches.scene) >= 5
+    assert batches.imu == []
+    assert_in_order(batches.eye, 200)
+    assert_in_order(batches.scene, 30)
+    assert batches.scene[0].img.shape == (48, 64, 3)
+
+    counters = device.get_counters()
+    assert list(counters) == ["eye", "scene"]
+    assert counters["eye"].received == len(batches.eye)
+    assert counters["scene"].received == len(batches.scene)
+    assert all(c.dropped == 0 and c.queued == 0 for c in counters.values())
+    assert 100 < counters["eye"].rate < 300
+
+
+def test_full_queue_drops_newest() -> None:
+    device = Device(
+        eye=lambda: EyeCameraSynthetic(fps=200), scene=None, imu=None, queue_size=5
+    )
+    with device:
+        # the consumer stalls
+        time.sleep(0.3)
+    counters = device.get_counters()["eye"]
+    assert counters.queued == 5
+    assert counters.dropped == counters.received - 5 > 0
+    # the first items were kept
+    assert [f.index for f in device.get_batches(0).eye] == list(range(5))
+    assert device.get_counters()["eye"].queued == 0
+
+
+def test_stop_joins_threads_and_closes_sources() -> None:
+    opened: list[TrackedEyeCamera] = []
+    device = Device(eye=lambda: TrackedEyeCamera(opened), scene=None, imu=None)
+    for _ in range(2):
+        with device:
+            assert device.get_source("eye") is opened[-1]
+            assert device.get_batches(timeout=1).eye
+        assert_stopped(device)
+    # every session opens the camera anew
+    assert len(opened) == 2
+    assert all(camera.closed for camera in opened)
+
+
+def test_failing_stream_closes_opened_streams() -> None:
+    opened: list[TrackedEyeCamera] = []
+
+    def broken_scene() -> SceneCamera:
+        # fail only once the eye camera is open
+        while not opened:
+            time.sleep(0.001)
+        raise OSError("No scene camera found")
+
+    device = Device(eye=lambda: TrackedEyeCamera(opened), scene=broken_scene, imu=None)
+    with pytest.raises(OSError, match="Opening the scene stream failed") as excinfo:
+        device.start()
+    assert str(excinfo.value.__cause__) == "No scene camera found"
+    assert_stopped(device)
+    assert len(opened) == 1
+    assert opened[0].closed
+    assert device.get_counters()["eye"].received == 0
+
+
+@pytest.fixture
+def fake_eye() -> Iterator[FakeV4l2Device]:
+    device = FakeV4l2Device.neon_eye()
+    with FakeV4l2Provider([device]).installed():
+        yield device
+
+
+def test_v4l2_camera_released_on_stop(fake_eye: FakeV4l2Device) -> None:
+    device = Device(eye=EyeCameraV4l2, scene=None, imu=None)
+    batches = collect(device, 0.3)
+    assert_stopped(device)
+    assert len(batches.eye) >= 20
+    assert_in_order(batches.eye, fake_eye.fps)
+    assert batches.eye[0].img.shape == (192, 384)
+    # closing the camera stopped streaming and freed the buffers
+    assert not fake_eye._streaming
+    assert fake_eye._owner is None
@@ -0,0 +1,138 @@
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from pupil_labs.neon_usb.cache import CACHE_DIR_ENV
+from pupil_labs.neon_usb.cameras import mode_cache
+from pupil_labs.neon_usb.cameras.backend import V4l2Backend
+from pupil_labs.neon_usb.cameras.eye import NEON_EYE_CAMERA_SPEC
+from pupil_labs.neon_usb.pyrav4l2 import v4l2
+from pupil_labs.neon_usb.testing.fake_v4l2 import FakeV4l2Device, FakeV4l2Provider
+
+ENUMERATION = (
+    v4l2.VIDIOC_ENUM_FMT,
+    v4l2.VIDIOC_ENUM_FRAMESIZES,
+    v4l2.VIDIOC_QUERY_EXT_CTRL,
+    v4l2.VIDIOC_QUERYMENU,
+)
+"""Requests enumerating formats and controls, skipped with a cached mode"""
+
+
+@pytest.fixture
+def cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def device(cache_dir: Path) -> Iterator[FakeV4l2Device]:
+    device = FakeV4l2Device.neon_eye()
+    with FakeV4l2Provider([device]).installed():
+        yield device
+
+
+def start(device: FakeV4l2Device) -> tuple[V4l2Backend, int]:
+    """Open a backend, return it and the number of enumeration requests it made."""
+    device.ioctl_counts.clear()
+    backend = V4l2Backend(NEON_EYE_CAMERA_SPEC)
+    backend.close()
+    return backend, sum(device.ioctl_counts.get(r, 0) for r in ENUMERATION)
+
+
+def entry_path(cache_dir: Path) -> Path:
+    (path,) = (cache_dir / "modes").glob("v4l2-*.json")
+    return path
+
+
+def test_formats_and_controls_round_trip(device: FakeV4l2Device) -> None:
+    backend, _ = start(device)
+    assert backend.device is not None
+    formats = backend.device.available_formats
+    controls = backend.device.controls
+
+    dumped = mode_cache.dump_formats(formats)
+    assert json.loads(json.dumps(dumped)) == dumped
+    restored = mode_cache.load_formats(dumped)
+    assert restored == formats
+    assert mode_cache.dump_formats(restored) == dumped
+
+    dumped = mode_cache.dump_controls(controls)
+    assert json.loads(json.dumps(dumped)) == dumped
+    assert [c["name"] for c in dumped] == [
+        "Brightness",
+        "Contrast",
+        "Gain",
+        "Power Line Frequency",
+    ]
+    assert dumped[-1]["items"] == [[0, "Disabled"], [1, "50 Hz"], [2, "60 Hz"]]
+    assert mode_cache.dump_controls(mode_cache.load_controls(dumped)) == dumped
+
+
+def test_second_start_uses_cached_mode(device: FakeV4l2Device, cache_dir: Path) -> None:
+    first, enumerated = start(device)
+    assert first.mode_source == "device"
+    assert enumerated > 0
+    entry = json.loads(entry_path(cache_dir).read_text())
+    assert entry["version"] == mode_cache.MODE_CACHE_VERSION
+    assert entry["mode"] == [v4l2.V4L2_PIX_FMT_GREY, 384, 192, 1, 200]
+
+    second, enumerated = start(device)
+    assert second.mode_source == "disk"
+    assert enumerated == 0
+    assert second.device is not None
+    assert len(second.device.controls) == 4
+    assert second.color_format == first.color_format
+
+    # the cache can be bypassed
+    device.ioctl_counts.clear()
+    V4l2Backend(NEON_EYE_CAMERA_SPEC, use_cache=False).close()
+    assert device.ioctl_counts[v4l2.VIDIOC_ENUM_FMT] > 0
+
+
+def test_entry_of_other_identity_ignored(
+    device: FakeV4l2Device, cache_dir: Path
+) -> None:
+    start(device)
+    path = entry_path(cache_dir)
+    entry = json.loads(path.read_text())
+    entry["identity"]["card"] = "Another Camera"
+    path.write_text(json.dumps(entry))
+    backend, enumerated = start(device)
+    assert backend.mode_source == "device"
+    assert enumerated > 0
+
+
+@pytest.mark.parametrize(
+    ("change", "rejected"),
+    [
+        # unreadable, dropped before it is used
+        pytest.param({"formats": "corrupt"}, False, id="corrupt"),
+        # readable, but the device rejects the mode
+        pytest.param(
+            {"mode": [v4l2.V4L2_PIX_FMT_GREY, 640, 480, 1, 200]}, True, id="rejected"
+        ),
+    ],
+)
+def test_bad_entry_forgotten(
+    device: FakeV4l2Device,
+    cache_dir: Path,
+    change: dict[str, object],
+    rejected: bool,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    start(device)
+    path = entry_path(cache_dir)
+    stored = json.loads(path.read_text())
+    path.write_text(json.dumps({**stored, **change}))
+
+    capsys.readouterr()
+    backend, enumerated = start(device)
+    assert ("was rejected" in capsys.readouterr().out) == rejected
+    assert backend.mode_source == "device"
+    assert enumerated > 0
+    # the entry was replaced by that of the fresh negotiation
+    assert json.loads(path.read_text()) == stored
+    backend, _ = start(device)
+    assert backend.mode_source == "disk"
@@ -0,0 +1,318 @@
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+
+from pupil_labs.neon_usb.cameras.eye import EyeCameraSynthetic
+from pupil_labs.neon_usb.frame import EncodedFrame, Frame
+from pupil_labs.neon_usb.queue_utils import (
+    BUDGET_POLL_INTERVAL,
+    ByteBudgetQueue,
+    ByteBudgetRing,
+    MemoryBudget,
+    SpillQueue,
+    image_receiver,
+)
+
+# a 10x10 grayscale frame and its header take 150 bytes in the spill file
+RECORD = 150
+
+
+def make_item(i: int) -> Any:
+    rng = np.random.default_rng(i)
+    kind = i % 4
+    if kind == 0:
+        return Frame(rng.integers(0, 255, (10, 10), dtype=np.uint8), i * 0.005, i)
+    if kind == 1:
+        img = rng.integers(0, 1 << 16, (4, 6, 3), dtype=np.uint16)
+        return Frame(img, i * 0.005, i)
+    if kind == 2:
+        return EncodedFrame(rng.bytes(int(rng.integers(1, 300))), i * 0.005, i)
+    return {"index": i, "samples": list(range(i % 7))}
+
+
+def assert_same(actual: Any, expected: Any) -> None:
+    assert type(actual) is type(expected)
+    if isinstance(expected, Frame):
+        assert actual.img.dtype == expected.img.dtype
+        np.testing.assert_array_equal(actual.img, expected.img)
+        assert (actual.timestamp, actual.index) == (expected.timestamp, expected.index)
+    elif isinstance(expected, EncodedFrame):
+        assert bytes(actual.data) == expected.data
+        assert (actual.timestamp, actual.index) == (expected.timestamp, expected.index)
+    else:
+        assert actual == expected
+
+
+def frame(i: int) -> Frame:
+    return Frame(np.full((10, 10), i % 256, np.uint8), float(i), i)
+
+
+def test_byte_queue_accepts_oversized_item_when_empty() -> None:
+    q: ByteBudgetQueue[bytes] = ByteBudgetQueue(max_bytes=100)
+    q.put_nowait(b"x" * 300)
+    assert q.nbytes == 300
+    # but not behind another item
+    with pytest.raises(queue.Full):
+        q.put_nowait(b"y")
+    assert q.get_nowait() == b"x" * 300
+    q.put_nowait(b"y" * 60)
+    q.put_nowait(b"z" * 40)
+    with pytest.raises(queue.Full):
+        q.put_nowait(b"w")
+    assert q.usage() == (100, 300, 100)
+
+
+def test_byte_queue_full_when_budget_exhausted() -> None:
+    budget = MemoryBudget(150)
+    eye: ByteBudgetQueue[bytes] = ByteBudgetQueue(max_bytes=100, budget=budget)
+    scene: ByteBudgetQueue[bytes] = ByteBudgetQueue(max_bytes=100, budget=budget)
+    eye.put_nowait(b"e" * 100)
+    scene.put_nowait(b"s" * 50)
+    # the scene queue has room of its own, the shared budget has none
+    with pytest.raises(queue.Full):
+        scene.put_nowait(b"s")
+    start = time.monotonic()
+    with pytest.raises(queue.Full):
+        scene.put(b"s", timeout=0.05)
+    assert time.monotonic() - start >= 0.05
+    # the exception for oversized items in empty queues doesn't extend to the budget
+    imu: ByteBudgetQueue[bytes] = ByteBudgetQueue(budget=budget)
+    with pytest.raises(queue.Full):
+        imu.put_nowait(b"x")
+    assert budget.usage() == (150, 150, 150)
+
+
+def test_byte_queue_put_wakes_when_other_queue_releases() -> None:
+    budget = MemoryBudget(100)
+    eye: ByteBudgetQueue[bytes] = ByteBudgetQueue(budget=budget)
+    scene: ByteBudgetQueue[bytes] = ByteBudgetQueue(budget=budget)
+    eye.put_nowait(b"e" * 100)
+
+    # getting from the eye queue doesn't notify the scene queue, the blocked put
+    # notices the released bytes by polling
+    release = threading.Timer(0.1, eye.get)
+    release.start()
+    start = time.monotonic()
+    scene.put(b"s" * 100, timeout=5)
+    waited = time.monotonic() - start
+    release.join()
+    assert 0.1 <= waited < 0.1 + 20 * BUDGET_POLL_INTERVAL
+    assert scene.nbytes == 100
+    assert eye.nbytes == 0
+    assert budget.usage().used == 100
+
+
+def test_byte_ring_evicts_oldest() -> None:
+    ring: ByteBudgetRing[bytes] = ByteBudgetRing(max_bytes=100)
+    for i in range(5):
+        assert ring.append(bytes([i]) * 40)
+    # two items fit, the oldest were evicted to make room, nothing was discarded
+    assert [item[0] for item in ring.drain()] == [3, 4]
+    assert (ring.evicted, ring.discarded) == (3, 0)
+    # an item larger than the ring is still kept, alone
+    ring.append(b"a" * 10)
+    assert ring.append(b"b" * 150)
+    assert ring.drain() == [b"b" * 150]
+    assert ring.evicted == 4
+    assert ring.usage() == (0, 150, 100)
+
+
+def test_byte_ring_discards_beyond_budget() -> None:
+    budget = MemoryBudget(100)
+    queued: ByteBudgetQueue[bytes] = ByteBudgetQueue(budget=budget)
+    ring: ByteBudgetRing[bytes] = ByteBudgetRing(max_bytes=100, budget=budget)
+    queued.put_nowait(b"q" * 40)
+    assert ring.append(b"a" * 30)
+    assert ring.append(b"b" * 30)
+    # evicting its own item makes room in the budget
+    assert ring.append(b"c" * 30)
+    assert (ring.evicted, ring.discarded) == (1, 0)
+    # the bytes of the other queue can't be evicted
+    assert not ring.append(b"d" * 70)
+    assert (ring.evicted, ring.discarded) == (3, 1)
+    assert len(ring) == 0
+    assert budget.usage().used == 40
+    assert ring.append(b"e" * 60)
+    assert ring.popleft() == b"e" * 60
+    assert budget.usage().used == 40
+
+
+def test_spill_queue_matches_deque(tmp_path: Path) -> None:
+    q: SpillQueue[Any] = SpillQueue(
+        memory_bytes=1000, disk_bytes=20_000, directory=tmp_path
+    )
+    model: deque[Any] = deque()
+    rng = np.random.default_rng(0)
+    for i in range(2000):
+        # mostly puts at first, mostly gets later, so that the spill file fills,
+        # wraps around and drains
+        if rng.random() < (0.7 if i < 1000 else 0.3):
+            item = make_item(i)
+            try:
+                q.put_nowait(item)
+            except queue.Full:
+                continue
+            model.append(item)
+        elif model:
+            assert_same(q.get_nowait(), model.popleft())
+        assert q.qsize() == len(model)
+
+    while model:
+        assert_same(q.get_nowait(), model.popleft())
+    assert q.empty()
+    assert q.spilled > 0
+    assert q.disk_usage().used == 0
+    assert q.usage().used == 0
+    q.close()
+
+
+def test_spill_file_wraps_around(tmp_path: Path) -> None:
+    q: SpillQueue[Frame] = SpillQueue(
+        memory_bytes=0, disk_bytes=2 * RECORD + 50, directory=tmp_path
+    )
+    q.put_nowait(frame(0))  # kept in memory, the queue was empty
+    q.put_nowait(frame(1))
+    q.put_nowait(frame(2))
+    assert q.disk_usage().used == 2 * RECORD
+    assert q.get_nowait().index == 0
+
+    wrapped = False
+    for i in range(3, 20):
+        assert q.get_nowait().index == i - 2
+        q.put_nowait(frame(i))
+        offsets = [offset for offset, _ in q._records]
+        wrapped |= offsets != sorted(offsets)
+        assert all(offset + RECORD <= q.disk_bytes for offset in offsets)
+    assert wrapped
+
+    assert [q.get_nowait().index for _ in range(q.qsize())] == [18, 19]
+    assert q.spilled == 19
+
+
+def test_full_spill_file_raises(tmp_path: Path) -> None:
+    q: SpillQueue[Frame] = SpillQueue(
+        memory_bytes=100, disk_bytes=2 * RECORD, directory=tmp_path
+    )
+    for i in range(3):
+        q.put_nowait(frame(i))
+    with pytest.raises(queue.Full):
+        q.put_nowait(frame(3))
+    start = time.monotonic()
+    with pytest.raises(queue.Full):
+        q.put(frame(3), timeout=0.05)
+    assert time.monotonic() - start >= 0.05
+
+    # a consumer taking an item from memory makes no room on disk
+    assert q.get_nowait().index == 0
+    with pytest.raises(queue.Full):
+        q.put_nowait(frame(3))
+    assert q.get_nowait().index == 1
+    q.put_nowait(frame(3))
+    assert [q.get_nowait().index for _ in range(2)] == [2, 3]
+
+    # items larger than the spill file never fit
+    q.put_nowait(frame(4))
+    big = Frame(np.zeros((20, 20), np.uint8), 0.0, 5)
+    with pytest.raises(queue.Full):
+        q.put_nowait(big)
+
+
+def test_put_waits_for_room(tmp_path: Path) -> None:
+    q: SpillQueue[Frame] = SpillQueue(
+        memory_bytes=100, disk_bytes=RECORD, directory=tmp_path
+    )
+    q.put_nowait(frame(0))
+    q.put_nowait(frame(1))
+    taken = []
+    consumer = threading.Timer(0.05, lambda: taken.extend([q.get(), q.get()]))
+    consumer.start()
+    q.put(frame(2), timeout=5)
+    consumer.join()
+    assert [f.index for f in taken] == [0, 1]
+    assert q.get_nowait().index == 2
+
+
+def test_close_drops_spilled_items(tmp_path: Path) -> None:
+    q: SpillQueue[Frame] = SpillQueue(
+        memory_bytes=100, disk_bytes=10 * RECORD, directory=tmp_path
+    )
+    for i in range(4):
+        q.put_nowait(frame(i))
+    assert q.disk_usage().used == 3 * RECORD
+
+    q.close()
+    assert q._map is None
+    assert q.disk_usage().used == 0
+    # the item in memory is kept
+    assert q.qsize() == 1
+    assert q.get_nowait().index == 0
+
+    # the queue stays usable, a new spill file is created
+    for i in range(4, 7):
+        q.put_nowait(frame(i))
+    assert [q.get_nowait().index for _ in range(3)] == [4, 5, 6]
+    q.close()
+    q.close()
+
+
+def test_close_finishes_dropped_items(tmp_path: Path) -> None:
+    q: SpillQueue[Frame] = SpillQueue(
+        memory_bytes=100, disk_bytes=2 * RECORD, directory=tmp_path
+    )
+    for i in range(3):
+        q.put_nowait(frame(i))
+    q.get_nowait()
+    q.task_done()
+
+    # a putter waiting for room, and a thread waiting for all items to be done
+    putter = threading.Thread(target=q.put, args=(frame(3),), daemon=True)
+    putter.start()
+    time.sleep(0.05)
+    assert putter.is_alive()
+    q.close()
+    putter.join(5)
+    assert not putter.is_alive()
+
+    joiner = threading.Thread(target=q.join, daemon=True)
+    joiner.start()
+    assert q.get_nowait().index == 3
+    q.task_done()
+    joiner.join(5)
+    assert not joiner.is_alive()
+    assert q.unfinished_tasks == 0
+
+
+def test_image_receiver_spills_while_consumer_stalls(tmp_path: Path) -> None:
+    # 200 FPS of eye frames, with room for only a few of them in memory
+    q: SpillQueue[Frame] = SpillQueue(
+        memory_bytes=4 * 384 * 192, disk_bytes=64 << 20, directory=tmp_path
+    )
+    started, stop = threading.Event(), threading.Event()
+    receiver = threading.Thread(
+        target=image_receiver,
+        args=(lambda: EyeCameraSynthetic(fps=200), q, started, stop),
+    )
+    receiver.start()
+    try:
+        assert started.wait(5)
+        # the consumer stalls
+        time.sleep(0.5)
+    finally:
+        stop.set()
+        receiver.join()
+
+    frames = [q.get_nowait() for _ in range(q.qsize())]
+    assert len(frames) >= 50
+    assert q.spilled >= len(frames) - 5
+    indices = [f.index for f in frames]
+    assert indices == list(range(indices[0], indices[0] + len(indices)))
+    timestamps = [f.timestamp for f in frames]
+    assert np.allclose(np.diff(timestamps), 1 / 200)
+    assert all(f.img.shape == (192, 384) for f in frames)
+    q.close()
@@ -0,0 +1,102 @@
+import threading
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+
+from pupil_labs.neon_usb.cameras.backend import CameraBackend, UVCBackend
+from pupil_labs.neon_usb.cameras.camera import CameraDisconnectedError, CameraSpec
+from pupil_labs.neon_usb.cameras.eye import EyeCameraV4l2
+from pupil_labs.neon_usb.cameras.scene import NEON_SCENE_CAMERA_SPEC, SceneCamera
+from pupil_labs.neon_usb.testing.fake_v4l2 import FakeV4l2Device, FakeV4l2Provider
+from pupil_labs.neon_usb.uvc_utils import XU_CTL_EXPOSURE1, XU_CTL_EXPOSURE2
+
+
+@pytest.fixture
+def device() -> Iterator[FakeV4l2Device]:
+    device = FakeV4l2Device.neon_eye()
+    with FakeV4l2Provider([device]).installed():
+        yield device
+
+
+@pytest.fixture
+def camera(device: FakeV4l2Device) -> Iterator[EyeCameraV4l2]:
+    with EyeCameraV4l2() as camera:
+        assert isinstance(camera, EyeCameraV4l2)
+        camera.exposure_algorithm = None
+        camera.reconnect_poll_interval = 0.01
+        yield camera
+
+
+def test_read_reconnects(device: FakeV4l2Device, camera: EyeCameraV4l2) -> None:
+    camera.exposure = (5, 7)
+    assert camera.get_frame() is not None
+
+    device.disconnect()
+    replug = threading.Timer(0.2, device.connect)
+    replug.start()
+    try:
+        frame = camera.get_frame()
+    finally:
+        replug.join()
+
+    assert frame.img.shape == (192, 384)
+    assert camera.reconnect_count == 1
+    assert camera.last_reconnect is not None
+    assert camera.last_reconnect.wait >= 0.1
+    # the controls were reset by replugging, _configure() restored them
+    assert device.xu_values == {XU_CTL_EXPOSURE1: 5, XU_CTL_EXPOSURE2: 7}
+    assert camera.last_exposure == (5, 7)
+
+
+def test_read_raises_if_not_back_in_time(
+    device: FakeV4l2Device, camera: EyeCameraV4l2
+) -> None:
+    camera.reconnect_timeout = 0.1
+    camera.get_frame()
+
+    device.disconnect()
+    with pytest.raises(CameraDisconnectedError):
+        camera.get_frame()
+    assert camera.reconnect_count == 0
+    assert camera.last_reconnect is None
+
+    # later reads retry, and succeed once the camera is back
+    device.connect()
+    assert camera.get_frame() is not None
+    assert camera.reconnect_count == 1
+
+
+class FakeControl:
+    def __init__(self, display_name: str) -> None:
+        self.display_name = display_name
+        self.value: Any = None
+
+
+class FakeCapture:
+    def __init__(self, names: list[str]) -> None:
+        self.controls = [FakeControl(name) for name in names]
+
+
+class FakeUVCBackend(UVCBackend):
+    """UVC backend with fake controls and no device behind it."""
+
+    def __init__(self, spec: CameraSpec, names: list[str]) -> None:
+        CameraBackend.__init__(self, spec)
+        self._uvc_capture = FakeCapture(names)
+
+    def close(self) -> None:
+        pass
+
+
+def test_scene_configure_restores_controls() -> None:
+    names = ["Gain", "Absolute Exposure Time"]
+    camera = SceneCamera(NEON_SCENE_CAMERA_SPEC, lambda s: FakeUVCBackend(s, names))
+    camera.exposure = 123
+    assert camera.uvc_controls["Gain"].value == 64
+
+    # a reopened camera comes back with its defaults
+    camera.backend = FakeUVCBackend(NEON_SCENE_CAMERA_SPEC, names)
+    camera._configure()
+    assert camera.uvc_controls["Gain"].value == 64
+    assert camera.uvc_controls["Absolute Exposure Time"].value == 123
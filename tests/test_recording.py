@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pupil_labs.neon_usb.frame import Frame
+from pupil_labs.neon_usb.recording.raw import (
+    INDEX_DTYPE,
+    INDEX_FILE,
+    RawFrameRecorder,
+    open_raw_recording,
+)
+
+SHAPE = (6, 8)
+
+
+def make_frames(count: int) -> list[Frame]:
+    rng = np.random.default_rng(0)
+    return [
+        Frame(
+            rng.integers(0, 255, SHAPE, dtype=np.uint8),
+            1000.0 + i * 0.005,
+            # a gap, like a dropped frame, must survive the round trip
+            i if i < 10 else i + 3,
+        )
+        for i in range(count)
+    ]
+
+
+def test_raw_round_trip(tmp_path: Path) -> None:
+    frames = make_frames(37)
+    # a small capacity and sync interval exercise the growth and sync paths
+    with RawFrameRecorder(
+        tmp_path, shape=SHAPE, initial_capacity=4, fsync_every=3, block=True
+    ) as recorder:
+        for frame in frames:
+            assert recorder.write(frame)
+    assert recorder.count == len(frames)
+    assert recorder.capacity == 64
+    assert recorder.dropped_count == 0
+
+    recording = open_raw_recording(tmp_path)
+    assert len(recording) == len(frames)
+    assert recording.frames.shape == (len(frames), *SHAPE)
+    for i, frame in enumerate(frames):
+        np.testing.assert_array_equal(recording.frames[i], frame.img)
+        read = recording.frame(i)
+        assert read.index == frame.index
+        assert read.timestamp == pytest.approx(frame.timestamp, abs=1e-9)
+
+    index = np.fromfile(tmp_path / INDEX_FILE, dtype=INDEX_DTYPE)
+    assert list(index["index"]) == [f.index for f in frames]
+    assert list(index["timestamp_ns"]) == [round(f.timestamp * 1e9) for f in frames]
+
+
+def test_raw_empty_recording(tmp_path: Path) -> None:
+    RawFrameRecorder(tmp_path, shape=SHAPE).close()
+    recording = open_raw_recording(tmp_path)
+    assert len(recording) == 0
+    assert recording.frames.shape == (0, *SHAPE)
+
+
+def test_raw_rejects_empty_capacity(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="initial_capacity"):
+        RawFrameRecorder(tmp_path, shape=SHAPE, initial_capacity=0)
+
+
+def test_raw_wrong_shape_fails_close(tmp_path: Path) -> None:
+    recorder = RawFrameRecorder(tmp_path, shape=SHAPE, block=True)
+    recorder.write(Frame(np.zeros((2, 2), np.uint8), 0.0, 0))
+    with pytest.raises(OSError) as excinfo:
+        recorder.close()
+    assert isinstance(excinfo.value.__cause__, ValueError)
+
+
+def test_finalize_failure_fails_close(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    recorder = RawFrameRecorder(tmp_path, shape=SHAPE, block=True)
+    finalize = recorder._finalize
+
+    def failing_finalize() -> None:
+        finalize()
+        raise RuntimeError("disk gone")
+
+    monkeypatch.setattr(recorder, "_finalize", failing_finalize)
+    recorder.write(make_frames(1)[0])
+    with pytest.raises(OSError) as excinfo:
+        recorder.close()
+    assert isinstance(excinfo.value.__cause__, RuntimeError)
@@ -0,0 +1,15 @@
+import pytest
+
+from pupil_labs.neon_usb.cameras.scene import NEON_SCENE_CAMERA_SPEC, SceneCamera
+from pupil_labs.neon_usb.cameras.synthetic import SyntheticBackend
+
+
+def test_exposure_without_uvc_controls_raises() -> None:
+    spec = NEON_SCENE_CAMERA_SPEC._replace(width=64, height=48)
+    with SceneCamera(spec, SyntheticBackend.factory(fps=0, channels=3)) as camera:
+        assert isinstance(camera, SceneCamera)
+        with pytest.raises(OSError, match="no exposure control"):
+            _ = camera.exposure
+        with pytest.raises(OSError, match="no exposure control"):
+            camera.exposure = 100
+        assert camera.get_frame().img.shape == (48, 64, 3)
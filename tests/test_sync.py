@@ -0,0 +1,145 @@
+import bisect
+import math
+
+import numpy as np
+import pytest
+from pupil_labs.neon_usb_imu import Data3D, IMUData, Quaternion
+
+from pupil_labs.neon_usb.frame import Frame
+from pupil_labs.neon_usb.sync import StreamSynchronizer, _History
+
+EYE_PERIOD = 0.005
+
+
+def frame(timestamp: float, index: int = 0) -> Frame:
+    return Frame(np.zeros((2, 2), np.uint8), timestamp, index)
+
+
+def imu(time: float, gyro: float, angle: float) -> IMUData:
+    """IMU sample rotated by `angle` radians around z."""
+    return IMUData(
+        Data3D(gyro, 2 * gyro, 3 * gyro),
+        Data3D(0.0, 0.0, 9.81),
+        Quaternion(0.0, 0.0, math.sin(angle / 2), math.cos(angle / 2)),
+        round(time * 1e9),
+    )
+
+
+def test_history_sorts_out_of_order_entries() -> None:
+    history = _History[str](capacity=4, width=1)
+    for ts in (1.0, 3.0, 2.0, 0.5):
+        history.append(ts, f"at {ts}", [10 * ts])
+    assert history.timestamps.tolist() == [0.5, 1.0, 2.0, 3.0]
+    assert history.values[:, 0].tolist() == [5.0, 10.0, 20.0, 30.0]
+    assert [history.item(i) for i in range(4)] == [
+        "at 0.5",
+        "at 1.0",
+        "at 2.0",
+        "at 3.0",
+    ]
+    assert history.newest == 3.0
+
+    # the oldest entry is forgotten when one more arrives, even an older one
+    history.append(0.1, "at 0.1", [1.0])
+    assert history.timestamps.tolist() == [0.5, 1.0, 2.0, 3.0]
+    assert history.item(0) == "at 0.5"
+
+
+def test_history_compacts_when_full() -> None:
+    capacity = 3
+    history = _History[int](capacity, width=1)
+    model: list[tuple[float, int]] = []
+    for i in range(20):
+        # every third entry arrives late, some of them right before a compaction
+        ts = i - 1.5 if i % 3 == 2 else float(i)
+        history.append(ts, i, [ts])
+        bisect.insort_right(model, (ts, i), key=lambda entry: entry[0])
+        del model[:-capacity]
+
+        assert history._end <= 2 * capacity
+        expected = [t for t, _ in model]
+        assert history.timestamps.tolist() == expected
+        assert history.values[:, 0].tolist() == expected
+        items = [history.item(j) for j in range(len(history))]
+        assert items == [item for _, item in model]
+    assert model == [(16.0, 16), (18.0, 18), (19.0, 19)]
+
+    history.drop_oldest(5)
+    assert len(history) == 0
+    assert history.newest is None
+
+
+def test_out_of_order_eye_frames_match_nearest() -> None:
+    sync = StreamSynchronizer()
+    order = [3, 1, 0, 2, 5, 4, 7, 6, 9, 8]
+    sync.add_eye(*(frame(i * EYE_PERIOD, i) for i in order))
+    sync.add_scene(frame(0.0111, 0), frame(0.0239, 1))
+    matches = sync.get_matches()
+    assert [m.scene.index for m in matches] == [0, 1]
+    assert [[f.index for f in m.eye] for m in matches] == [[2], [5]]
+    assert all(m.imu is None for m in matches)
+
+    # the window variant returns all eye frames around the scene frame
+    sync = StreamSynchronizer(eye_window=0.007)
+    sync.add_eye(*(frame(i * EYE_PERIOD, i) for i in order))
+    sync.add_scene(frame(0.0111, 0))
+    (match,) = sync.get_matches()
+    assert [f.index for f in match.eye] == [1, 2, 3]
+
+
+def test_scene_frame_without_eye_frame_in_reach() -> None:
+    sync = StreamSynchronizer(max_delay=0.2)
+    sync.add_eye(frame(0.0, 0), frame(0.1, 1), frame(0.3, 2))
+    # between two eye frames, and before the first one
+    sync.add_scene(frame(-0.01, 0), frame(0.05, 1), frame(0.099, 2))
+    matches = sync.get_matches()
+    assert [[f.index for f in m.eye] for m in matches] == [[], [], [1]]
+
+    # frames older than the emitted ones are late
+    sync.add_eye(frame(0.09, 3))
+    sync.add_scene(frame(0.07, 3))
+    assert sync.late_counts == {"eye": 1, "scene": 1, "imu": 0}
+
+
+def test_scene_frame_waits_for_lagging_stream() -> None:
+    sync = StreamSynchronizer(max_delay=0.2)
+    sync.add_eye(frame(0.0, 0))
+    sync.add_scene(frame(0.01, 0))
+    assert sync.get_matches() == []
+    # the eye stream lags for longer than max_delay
+    sync.add_scene(frame(0.22, 1))
+    (match,) = sync.get_matches()
+    assert match.scene.index == 0
+    assert match.eye == []
+
+
+def test_imu_interpolated_at_scene_time() -> None:
+    sync = StreamSynchronizer()
+    # 1 kHz, rotating by 0.2 rad per sample, the second sample with the opposite
+    # sign, which is the same rotation
+    first, second = imu(1.000, 0.0, 0.0), imu(1.001, 1.0, 0.2)
+    second = second._replace(quaternion=Quaternion(*(-q for q in second.quaternion)))
+    sync.add_imu(first, second, imu(1.002, 2.0, 0.4))
+    sync.add_scene(frame(1.00025, 0))
+    (match,) = sync.get_matches()
+    assert match.imu is not None
+
+    # a quarter of the way from the first to the second sample
+    assert match.imu.time == 1_000_250_000
+    assert tuple(match.imu.gyro_data) == pytest.approx((0.25, 0.5, 0.75))
+    assert tuple(match.imu.accel_data) == pytest.approx((0.0, 0.0, 9.81))
+    # lerp of (0, 0, 0, 1) and (0, 0, sin 0.1, cos 0.1), normalized
+    z, w = 0.25 * math.sin(0.1), 0.75 + 0.25 * math.cos(0.1)
+    norm = math.hypot(z, w)
+    assert tuple(match.imu.quaternion) == pytest.approx((0, 0, z / norm, w / norm))
+
+
+def test_imu_not_interpolated_over_gaps() -> None:
+    sync = StreamSynchronizer(imu_tolerance=0.05)
+    # timestamps passed explicitly take precedence over IMUData.time
+    samples = [imu(0.0, 0.0, 0.0)] * 3
+    sync.add_imu(*samples, timestamps=[1.0, 1.1, 1.2])
+    sync.add_scene(frame(0.9, 0), frame(1.05, 1), frame(1.15, 2))
+    matches = sync.get_matches()
+    assert [m.scene.index for m in matches] == [0, 1, 2]
+    assert [m.imu is None for m in matches] == [True, True, True]
@@ -0,0 +1,37 @@
+import threading
+
+from pupil_labs.neon_usb.tracing import TraceRing
+
+
+def test_ring_keeps_the_newest_events() -> None:
+    ring = TraceRing(capacity=4)
+    for i in range(6):
+        ring.add(f"stage{i}", i, i + 1)
+    assert [e.name for e in ring.events()] == [f"stage{i}" for i in range(2, 6)]
+    assert ring.dropped == 2
+
+
+def test_concurrent_events_are_not_torn() -> None:
+    ring = TraceRing(capacity=1000)
+    workers: dict[int, int] = {}
+
+    def write(worker: int) -> None:
+        workers[worker] = threading.get_ident()
+        for i in range(5000):
+            # every field of an event is derived from its worker
+            ring.add(f"worker{worker}", worker * 10**9 + i, worker * 10**9 + i + 1)
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    snapshots = [ring.events() for _ in range(20)]
+    for thread in threads:
+        thread.join()
+
+    assert ring.dropped == 4 * 5000 - 1000
+    for events in [*snapshots, ring.events()]:
+        for event in events:
+            worker = event.start // 10**9
+            assert event.name == f"worker{worker}"
+            assert event.thread == workers[worker]
+            assert event.end == event.start + 1
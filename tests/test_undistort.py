@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from pupil_labs.neon_usb.cameras.undistort import Undistorter
+
+CAMERA_MATRIX = np.array([[80.0, 0, 32.0], [0, 80.0, 24.0], [0, 0, 1]])
+DISTORTION = np.array([-0.13, 0.11, 0.0002, -0.0001, 0.0, 0.17, 0.05, 0.02])
+SIZE = (64, 48)
+
+
+@pytest.fixture
+def undistorter() -> Undistorter:
+    return Undistorter(CAMERA_MATRIX, DISTORTION, SIZE, scale=0.5)
+
+
+@pytest.fixture
+def img() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 255, (SIZE[1], SIZE[0], 3), dtype=np.uint8)
+
+
+def test_undistort_into_out(undistorter: Undistorter, img: np.ndarray) -> None:
+    out = undistorter.empty_output(img)
+    result = undistorter.undistort(img, out)
+    assert result is out
+    np.testing.assert_array_equal(result, undistorter.undistort(img))
+
+
+@pytest.mark.parametrize(
+    "out",
+    [
+        np.empty((48, 64, 3), np.uint8),  # input size instead of the scaled size
+        np.empty((24, 32), np.uint8),  # missing channels
+        np.empty((24, 32, 3), np.float32),
+        np.empty((32, 24, 3), np.uint8).transpose(1, 0, 2),  # not contiguous
+    ],
+)
+def test_undistort_rejects_mismatched_out(
+    undistorter: Undistorter, img: np.ndarray, out: np.ndarray
+) -> None:
+    # OpenCV would silently reallocate, leaving `out` untouched
+    with pytest.raises(ValueError):
+        undistorter.undistort(img, out)
@@ -0,0 +1,66 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from pupil_labs.neon_usb import usb_utils
+from pupil_labs.neon_usb.cache import CACHE_DIR_ENV
+from pupil_labs.neon_usb.testing.fake_usb import (
+    FakeNeonUsbDevice,
+    FakeUsbTransport,
+    make_calibration_blob,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path))
+    usb_utils.forget_calibration()
+    yield
+    usb_utils.forget_calibration()
+
+
+def serial_of(calibration: object) -> str:
+    serial = calibration["serial"]  # type: ignore[index]
+    return bytes(serial).rstrip(b"\x00").decode()
+
+
+def module(serial: str) -> FakeNeonUsbDevice:
+    return FakeNeonUsbDevice(calibration=make_calibration_blob(serial), latency=0)
+
+
+def test_calibration_kept_in_memory() -> None:
+    first = module("111111")
+    with FakeUsbTransport(first).installed():
+        assert serial_of(usb_utils.get_calibration()) == "111111"
+        transfers = first.transfer_count
+        assert serial_of(usb_utils.get_calibration()) == "111111"
+    assert first.transfer_count == transfers
+
+
+def test_swapped_module_after_forget() -> None:
+    with FakeUsbTransport(module("111111")).installed():
+        usb_utils.get_calibration()
+
+    # a reconnect forgets the copy in memory
+    usb_utils.forget_calibration()
+    with FakeUsbTransport(module("222222")).installed():
+        assert serial_of(usb_utils.get_calibration()) == "222222"
+    stats = usb_utils.get_calibration_fetch_stats()
+    assert stats is not None
+    assert stats.source == "device"
+
+
+def test_explicit_device_checked_against_memory() -> None:
+    first, second = module("111111"), module("222222")
+    usb_utils.get_calibration(first)
+
+    assert serial_of(usb_utils.get_calibration(second)) == "222222"
+    stats = usb_utils.get_calibration_fetch_stats()
+    assert stats is not None
+    assert stats.source == "device"
+
+    assert serial_of(usb_utils.get_calibration(second)) == "222222"
+    stats = usb_utils.get_calibration_fetch_stats()
+    assert stats is not None
+    assert stats.source == "memory"
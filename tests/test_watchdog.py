@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from pupil_labs.neon_usb.cameras.eye import EyeCameraSynthetic
+from pupil_labs.neon_usb.device import Device, StallPolicy, StreamCounters
+from pupil_labs.neon_usb.watchdog import StallEvent, StreamStalledError, Watchdog
+
+
+def stalling_device(on_stall: StallPolicy) -> Device:
+    # the deadline at 200 FPS is 0.1 s, every stall misses it
+    return Device(
+        eye=lambda: EyeCameraSynthetic(fps=200, stall_rate=0.02, stall_duration=0.4),
+        scene=None,
+        imu=None,
+        on_stall=on_stall,
+    )
+
+
+def capture(device: Device, duration: float) -> StreamCounters:
+    end = time.monotonic() + duration
+    with device:
+        while time.monotonic() < end:
+            device.get_batches(timeout=0.05)
+    return device.get_counters()["eye"]
+
+
+def test_stall_restarts() -> None:
+    counters = capture(stalling_device("restart"), 1.5)
+    assert counters.stalls >= 1
+    assert counters.restarts >= 1
+    assert counters.reconnects == counters.restarts
+    assert counters.received > 0
+
+
+def test_stall_raises() -> None:
+    device = stalling_device("raise")
+    with device, pytest.raises(OSError) as excinfo:
+        end = time.monotonic() + 5
+        while time.monotonic() < end:
+            device.get_batches(timeout=0.05)
+    assert isinstance(excinfo.value.__cause__, StreamStalledError)
+    assert excinfo.value.__cause__.stream == "eye"
+    assert device.get_counters()["eye"].restarts == 0
+
+
+def test_stall_ignored() -> None:
+    counters = capture(stalling_device("ignore"), 1.5)
+    assert counters.stalls >= 1
+    assert counters.restarts == 0
+    assert counters.reconnects == 0
+    # the stream resumes by itself after each stall
+    assert counters.received > 200
+
+
+def test_watchdog_feed_ends_stall() -> None:
+    events: list[StallEvent] = []
+    watchdog = Watchdog(grace=0.0)
+    deadline = watchdog.watch("eye", fps=200, actions=[events.append])
+    assert deadline == watchdog.min_deadline
+
+    watchdog.feed("eye")
+    assert watchdog.check() == []
+    time.sleep(deadline * 1.5)
+    assert [e.stream for e in watchdog.check()] == ["eye"]
+    # a stall fires once, until it ends
+    assert watchdog.check() == []
+    assert events[0].stalls == 1
+    assert events[0].stalled_for > deadline
+    assert watchdog.get_stats()["eye"].stalled
+
+    watchdog.feed("eye")
+    stats = watchdog.get_stats()["eye"]
+    assert stats.stalls == 1
+    assert not stats.stalled
+    assert 0 < stats.duration < deadline
+
+
+def test_watchdog_rearm_gives_grace() -> None:
+    watchdog = Watchdog(min_deadline=0.05, grace=0.3)
+    watchdog.watch("eye", fps=200)
+    watchdog.feed("eye")
+    time.sleep(0.1)
+    watchdog.rearm("eye")
+    assert watchdog.check() == []
+    time.sleep(0.1)
+    # past the deadline, within the grace period
+    assert watchdog.check() == []
+
+
+def test_watchdog_report() -> None:
+    events: list[StallEvent] = []
+    watchdog = Watchdog()
+    watchdog.watch("eye", fps=200, actions=[events.append])
+    assert watchdog.report("eye")
+    assert not watchdog.report("eye")
+    assert len(events) == 1
+    assert not watchdog.report("scene")
+
+    watchdog.feed("eye")
+    assert watchdog.report("eye")
+    stats = watchdog.get_stats()
+    assert list(stats) == ["eye"]
+    assert stats["eye"].stalls == 2
+    assert stats["eye"].stalled